@@ -0,0 +1,51 @@
+"""Compare two benchmark result files.
+
+Run from ``core/``::
+
+    python -m benchmarks.compare baseline.jsonl candidate.jsonl --threshold 1.25
+
+Prints the median ratio for every benchmark present in both files and exits
+non-zero when any of them slowed down by more than the threshold.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+KEY_FIELDS = ("benchmark", "rows", "method", "limit")
+
+
+def load(path: Path) -> Dict[Tuple, float]:
+    """Map each benchmark key to its median time, keeping the last run."""
+    medians = {}
+    with path.open() as file:
+        for line in file:
+            if line.strip():
+                result = json.loads(line)
+                medians[tuple(result.get(field) for field in KEY_FIELDS)] = result["median_ms"]
+    return medians
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    baseline, candidate = load(args.baseline), load(args.candidate)
+    regressions = 0
+    for key in sorted(set(baseline) & set(candidate), key=str):
+        ratio = candidate[key] / baseline[key] if baseline[key] else float("inf")
+        flag = ""
+        if ratio > args.threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        name = " ".join(str(part) for part in key if part is not None)
+        print(f"{name:<50} {baseline[key]:>10.3f} {candidate[key]:>10.3f} {ratio:>6.2f}x{flag}")
+    return int(regressions > 0)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
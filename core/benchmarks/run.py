@@ -0,0 +1,178 @@
+"""Time the to-do operations on synthetic databases of several sizes.
+
+Run from ``core/``::
+
+    PYTHONPATH=src python -m benchmarks.run --scales 10k,100k --out results.jsonl
+
+Each measurement is printed (and appended to ``--out``) as one JSON line, so
+runs from different versions can be diffed with ``benchmarks.compare``.
+"""
+import argparse
+import json
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from todo import __version__, config, database
+from todo.todo import List as TodoList, Todoer
+
+from benchmarks.synth import generate
+
+METHODS = ("task_number", "priority", "due_date", "closed_range", "overdue")
+
+# closed_range bounds inside the synthetic date span
+RANGE = ("2026-01-01", "2026-03-31")
+
+SUFFIXES = {"k": 1000, "m": 1000000}
+
+
+def parse_scale(text: str) -> int:
+    text = text.strip().lower()
+    if text[-1:] in SUFFIXES:
+        return int(float(text[:-1]) * SUFFIXES[text[-1]])
+    return int(text)
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=Path(__file__).parent).stdout.strip()
+    except OSError:
+        return ""
+
+
+def measure(func: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Run ``func`` ``repeat`` times and summarize the wall times in ms."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "repeat": repeat,
+        "min_ms": round(samples[0], 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+    }
+
+
+def _drain(chunks) -> int:
+    return sum(len(chunk) for chunk in chunks)
+
+
+def bench_scale(db_path: Path, rows: int, repeat: int, full_max: int) -> List[dict]:
+    """Return one result dict per benchmark for one database."""
+    results = []
+
+    def record(name: str, func: Callable[[], object], **extra) -> None:
+        results.append(dict(benchmark=name, rows=rows, **extra, **measure(func, repeat)))
+
+    todoer = Todoer(db_path)
+    todo_list = TodoList(db_path)
+    ids = iter(range(1, rows + 1, max(1, rows // (repeat * 8 + 1))))
+    start, end = RANGE
+    record("todoer.add", lambda: todoer.add("bench", "benchmark task", "2026-01-01", "2026-01-02"))
+    record("todoer.set_done", lambda: todoer.set_done(next(ids)))
+    record("todoer.rename", lambda: todoer.rename(next(ids), "renamed"))
+    record("todoer.remove", lambda: todoer.remove(next(ids)))
+
+    for method in METHODS:
+        record("list.first_page", lambda: todo_list.page(method, start, end, limit=100), method=method)
+        if rows <= full_max:
+            record("list.full", lambda: _drain(todo_list.stream(method, start, end)), method=method)
+
+    record("list.report", lambda: todo_list.report())
+    record("list.summary", lambda: todo_list.summary())
+
+    from todo import api
+    from todo.cache import ResultCache
+
+    # a cache that stores nothing, so every request reaches the database
+    client = api.create_app(db_path, ResultCache(max_entry_bytes=0)).test_client()
+    cached_client = api.create_app(db_path).test_client()
+    for method in METHODS:
+        url = f"/tasks/{method}/{start}/{end}"
+        record("api.first_page", lambda: client.get(url + "?limit=100").data, method=method)
+        record("api.first_page_cached", lambda: cached_client.get(url + "?limit=100").data,
+               method=method)
+        if rows <= full_max:
+            record("api.full", lambda: client.get(url).data, method=method)
+
+    from typer.testing import CliRunner
+    from todo import cli
+
+    # the CLI finds the database through a config file of its own
+    config_file = db_path.with_suffix(".ini")
+    config_file.write_text(f"[General]\ndatabase = {db_path}\n")
+    runner, config_file_path = CliRunner(), config.CONFIG_FILE_PATH
+    config.CONFIG_FILE_PATH = config_file
+
+    def list_render(limit: int) -> None:
+        result = runner.invoke(cli.app, ["list", "priority", "--limit", str(limit)])
+        if result.exit_code != 0:
+            raise RuntimeError(f"todo list failed: {result.output}") from result.exception
+
+    try:
+        for limit in (100, 10000):
+            if limit <= rows:
+                record("cli.list_render", lambda: list_render(limit), limit=limit)
+    finally:
+        config.CONFIG_FILE_PATH = config_file_path
+    database.close_all()
+    return results
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="10k,100k", help="comma separated, e.g. 10k,1m,10m")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", type=Path, default=Path(tempfile.gettempdir()) / "todo-bench",
+                        help="where generated databases are kept between runs")
+    parser.add_argument("--full-max", type=int, default=1000000,
+                        help="skip full-list benchmarks above this many rows")
+    parser.add_argument("--out", type=Path, help="append JSON lines results here")
+    args = parser.parse_args(argv)
+
+    args.data_dir.mkdir(parents=True, exist_ok=True)
+    meta = {
+        "version": __version__,
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+    }
+    out = args.out.open("a") if args.out else None
+    try:
+        for rows in map(parse_scale, args.scales.split(",")):
+            template = generate(args.data_dir / f"tasks-{rows}-{args.seed}.db", rows, args.seed)
+            with tempfile.TemporaryDirectory() as work:
+                # mutations run on a copy so the template stays reusable
+                db_path = Path(work) / "bench.db"
+                source = sqlite3.connect(template)
+                target = sqlite3.connect(db_path)
+                source.backup(target)
+                source.close()
+                target.close()
+                config_file = Path(work) / "config.ini"
+                config_file.write_text(f"[General]\ndatabase = {db_path}\n")
+                config.CONFIG_FILE_PATH = config_file
+                for result in bench_scale(db_path, rows, args.repeat, args.full_max):
+                    line = json.dumps({**meta, **result})
+                    print(line)
+                    if out:
+                        out.write(line + "\n")
+    finally:
+        if out:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""Guard the import cost of the ``todo`` command line.
+
+Run from ``core/``::
+
+    PYTHONPATH=src python -m benchmarks.startup --budget-ms 150
+
+Exits non-zero when importing ``todo.cli`` takes longer than the budget
+(median of several ``python -X importtime`` runs) or pulls in a module that
+only the API server should need.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+# Modules the hot CLI commands must never import
+FORBIDDEN = ("flask", "flask_restful", "werkzeug", "pandas", "numpy", "pyarrow")
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+
+
+def import_times(module: str) -> Dict[str, int]:
+    """Return cumulative import time in microseconds per imported module."""
+    env = dict(os.environ, PYTHONPATH=str(SRC_DIR))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="todo.cli")
+    parser.add_argument("--budget-ms", type=float, default=150.0)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    samples = []
+    imported = set()
+    for _ in range(args.runs):
+        times = import_times(args.module)
+        samples.append(times[args.module] / 1000)
+        imported.update(times)
+    median = statistics.median(samples)
+    forbidden = sorted(name for name in imported if name.split(".")[0] in FORBIDDEN)
+    print(json.dumps({
+        "benchmark": "startup",
+        "module": args.module,
+        "median_ms": round(median, 2),
+        "budget_ms": args.budget_ms,
+        "forbidden_imports": forbidden,
+    }))
+    return int(median > args.budget_ms or bool(forbidden))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
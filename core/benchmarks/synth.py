@@ -0,0 +1,78 @@
+"""Build reproducible synthetic to-do databases.
+
+Run from ``core/``::
+
+    PYTHONPATH=src python -m benchmarks.synth bench.db --rows 100000
+"""
+import argparse
+import random
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Iterator
+
+from todo import database
+from todo.todo import Todoer
+
+# Fixed anchor so that the same seed always yields the same dates
+ANCHOR = date(2026, 1, 1)
+
+WORDS = (
+    "review", "deploy", "write", "fix", "plan", "call", "email", "draft",
+    "update", "test", "design", "budget", "report", "meeting", "invoice",
+    "release", "backlog", "roadmap", "customer", "server", "docs", "hiring",
+)
+
+
+def tasks(rows: int, seed: int = 0) -> Iterator[dict]:
+    """Yield ``rows`` deterministic task dicts for ``Todoer.add_many``."""
+    rng = random.Random(seed)
+    for i in range(rows):
+        start = ANCHOR + timedelta(days=rng.randint(-365, 365))
+        due = start + timedelta(days=rng.randint(0, 60))
+        complete = int(rng.random() < 0.3)
+        yield {
+            "name": f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}",
+            "description": " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12))),
+            "start_date": start.isoformat(),
+            "due_date": due.isoformat(),
+            "priority": rng.randint(1, 3),
+            "complete": complete,
+            "deleted": int(rng.random() < 0.05),
+        }
+
+
+def generate(db_path: Path, rows: int, seed: int = 0) -> Path:
+    """Create ``db_path`` holding ``rows`` synthetic tasks, if not present.
+
+    :param db_path: database file to create
+    :type db_path: Path
+    :param rows: number of tasks
+    :type rows: int
+    :param seed: random seed, defaults to 0
+    :type seed: int, optional
+    :return: the database path
+    :rtype: Path
+    """
+    if db_path.exists():
+        return db_path
+    partial = db_path.with_suffix(".partial")
+    for leftover in partial.parent.glob(partial.name + "*"):
+        leftover.unlink()
+    database.init_database(partial)
+    Todoer(partial).add_many(tasks(rows, seed), chunk_size=50000)
+    database.close_all()
+    partial.rename(db_path)
+    return db_path
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("db_path", type=Path)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    generate(args.db_path, args.rows, args.seed)
+
+
+if __name__ == "__main__":
+    main()
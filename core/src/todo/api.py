@@ -0,0 +1,463 @@
+# Flask and flask_restful are only imported here; the CLI loads this module
+# lazily so that the everyday commands do not pay for them.
+import math
+import time
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Hashable, Iterator, Tuple
+
+from flask import Flask, Response, request, stream_with_context
+from flask_restful import Api, Resource, abort
+
+from todo import config, metrics, query
+from todo.cache import ResultCache
+from todo.todo import List, Todoer, encode_events
+from todo.writer import WriteQueue
+
+# Longest a change feed request waits for a change, in seconds. Event
+# streams end after it and the client reconnects with Last-Event-ID, so no
+# server thread is held by a client that went away.
+MAX_WAIT = 30
+
+
+def _wants_ndjson() -> bool:
+    return request.accept_mimetypes.best_match(
+        ["application/json", "application/x-ndjson"]) == "application/x-ndjson"
+
+
+def _json_body() -> dict:
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        abort(400, message="expected a JSON object")
+    return body
+
+
+def _cached_response(todo_list: List, cache: ResultCache, key: Hashable,
+                     make_body: Callable[[], Iterator[str]], ndjson: bool) -> Response:
+    """Answer from the cache or stream a fresh body, with validators.
+
+    Polls carrying a current ``If-None-Match``/``If-Modified-Since`` get a
+    304 without running the query. ETags hold the change number of the
+    data (``version``), which every server process reads from the database,
+    so a tag handed out by one worker is valid in all of them. Misses are
+    streamed as usual and stored once complete if they fit in a cache entry.
+    """
+    generation = todo_list.generation()
+    # Lists such as overdue depend on today's date as well as on the data
+    today = date.today().toordinal()
+    key = (today, key)
+    etag = f"{todo_list.version()}-{today}"
+    changed_at = todo_list.changed_at
+    # Last-Modified only has whole seconds. Round up once that second is
+    # over; until then round down, which never validates, so a change later
+    # in the same second cannot hide behind the header.
+    stamp = math.ceil(changed_at)
+    if stamp > time.time():
+        stamp = math.floor(changed_at)
+    last_modified = datetime.fromtimestamp(stamp, timezone.utc)
+    mimetype = "application/x-ndjson" if ndjson else "application/json"
+
+    not_modified = (etag in request.if_none_match if request.if_none_match
+                    else request.if_modified_since is not None
+                    and changed_at <= request.if_modified_since.timestamp())
+    if not_modified:
+        response = Response(status=304)
+    else:
+        body = cache.get(key, generation)
+        if body is None:
+            try:
+                chunks = make_body()
+            except ValueError as error:
+                abort(400, message=str(error))
+
+            def tee():
+                parts, size = [], 0
+                for chunk in chunks:
+                    yield chunk
+                    if parts is not None:
+                        parts.append(chunk)
+                        size += len(chunk)
+                        if size > cache.max_entry_bytes:
+                            parts = None
+                if parts is not None:
+                    cache.put(key, generation, "".join(parts))
+
+            body = stream_with_context(tee())
+        response = Response(body, mimetype=mimetype)
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.headers["Vary"] = "Accept"
+    return response
+
+
+class ListResource(Resource):
+    def __init__(self, db_path: Path, cache: ResultCache, writer: WriteQueue,
+                 lists: Dict[str, Path]) -> None:
+        self._list = List(db_path)
+        self._todoer = Todoer(db_path)
+        self._cache = cache
+        self._writer = writer
+        self._lists = lists
+
+    def get(self, method: str = 'priority', start: str = "none", end: str = "none") -> Response:
+        """Stream a to-do list as JSON.
+
+        ``?where=``, ``?sort=`` and ``?fields=`` refine the list (see
+        ``List.build``); ``?limit=`` and ``?after=`` page through it. Clients sending
+        ``Accept: application/x-ndjson`` get one object per line instead of
+        the ``{"data": [...], "next": ...}`` document.
+
+        ``?lists=work,home`` (or ``?lists=all``) merges those task lists
+        instead, each row naming its list in a LIST column; see ``Shards``.
+        ``?archived=1`` lists the archived to-dos, see ``archive.compact``.
+
+        :param method: type of to-do list
+        :type method: str
+        :param start: optional, start date to search
+        :type start: str
+        :param end: optional, end date to search
+        :type end: str
+        :return: streamed or cached response
+        :rtype: Response
+        """
+        ndjson = _wants_ndjson()
+        limit = request.args.get("limit", type=int)
+        after = request.args.get("after")
+        where = request.args.get("where")
+        sort = request.args.get("sort")
+        fields = request.args.get("fields")
+        lists = request.args.get("lists")
+        if request.args.get("archived", 0, type=int):
+            from todo import archive
+
+            path = archive.archive_path(self._list.db_path)
+            if not path.exists():
+                abort(404, message="nothing has been archived yet")
+            archived = List(path)
+            return _cached_response(
+                archived, self._cache,
+                ("archived", method, start, end, limit, after, ndjson, where, sort, fields),
+                lambda: archived.stream(method, start, end, limit, after, ndjson, where, sort, fields),
+                ndjson)
+        if lists:
+            from todo.shards import Shards
+
+            names = list(self._lists) if lists == "all" else lists.split(",")
+            unknown = [name for name in names if name not in self._lists]
+            if unknown:
+                abort(404, message=f"unknown list {unknown[0]!r}")
+            shards = Shards({name: self._lists[name] for name in names})
+            return _cached_response(
+                shards, self._cache,
+                ("lists", tuple(names), method, start, end, limit, after, ndjson, where, sort, fields),
+                lambda: shards.stream(List.build(method, start, end, where, sort, fields, limit),
+                                      after, ndjson),
+                ndjson)
+        return _cached_response(
+            self._list, self._cache,
+            ("list", method, start, end, limit, after, ndjson, where, sort, fields),
+            lambda: self._list.stream(method, start, end, limit, after, ndjson, where, sort, fields),
+            ndjson)
+
+    def post(self, **path: str) -> Tuple[dict, int]:
+        """Add a to-do from ``{"name": ..., "description": ...}``.
+
+        ``start_date``, ``due_date``, ``priority``, ``complete`` and
+        ``deleted`` are optional as for ``todo add``. The answer comes once
+        the to-do is committed, see ``WriteQueue``.
+
+        :return: the new to-do, with its ID, and 201
+        :rtype: Tuple[dict, int]
+        """
+        from todo import ingest
+
+        if path:
+            abort(405, message="to-dos are added with POST /tasks")
+        try:
+            task = ingest.validate_row(_json_body(), date.today().isoformat())
+        except (TypeError, ValueError) as error:
+            abort(400, message=f"invalid request: {error}")
+        return self._writer.submit(lambda: self._todoer.add(**task)), 201
+
+
+class TaskResource(Resource):
+    def __init__(self, db_path: Path, cache: ResultCache, writer: WriteQueue) -> None:
+        self._todoer = Todoer(db_path)
+        self._writer = writer
+
+    def patch(self, todo_id: int) -> dict:
+        """Change some fields of a to-do, e.g. ``{"complete": 1}``.
+
+        Accepts the fields of ``ListResource.post``; the answer comes once
+        the change is committed.
+
+        :param todo_id: to-do ID
+        :type todo_id: int
+        :return: ``{"updated": 1}``, or 404 for an unknown ID
+        :rtype: dict
+        """
+        from todo import ingest
+
+        try:
+            changes = ingest.validate_changes(_json_body())
+        except (TypeError, ValueError) as error:
+            abort(400, message=f"invalid request: {error}")
+        return self._updated(todo_id, changes)
+
+    def delete(self, todo_id: int) -> dict:
+        """Remove a to-do, like ``todo remove``.
+
+        :param todo_id: to-do ID
+        :type todo_id: int
+        :return: ``{"updated": 1}``, or 404 for an unknown ID
+        :rtype: dict
+        """
+        return self._updated(todo_id, {"DELETED": 1})
+
+    def _updated(self, todo_id: int, changes: dict) -> dict:
+        if not self._writer.submit(lambda: self._todoer.update(todo_id, changes)):
+            abort(404, message=f"to-do {todo_id} does not exist")
+        return {"updated": 1}
+
+
+class SearchResource(Resource):
+    def __init__(self, db_path: Path, cache: ResultCache) -> None:
+        self._list = List(db_path)
+        self._cache = cache
+
+    def get(self) -> Response:
+        """Stream ranked full-text search results for ``?q=``.
+
+        Paging and content negotiation work as for ``ListResource``.
+
+        :return: streamed or cached response
+        :rtype: Response
+        """
+        ndjson = _wants_ndjson()
+        text = request.args.get("q", "")
+        limit = request.args.get("limit", type=int)
+        after = request.args.get("after")
+        return _cached_response(
+            self._list, self._cache, ("search", text, limit, after, ndjson),
+            lambda: self._list.stream_search(text, limit, after, ndjson), ndjson)
+
+
+class ReportResource(Resource):
+    def __init__(self, db_path: Path, cache: ResultCache) -> None:
+        self._list = List(db_path)
+        self._cache = cache
+
+    def get(self) -> Response:
+        """Return the to-do report for ``?weeks=`` weeks (default 12) as JSON.
+
+        :return: cached or freshly computed response
+        :rtype: Response
+        """
+        import json
+
+        weeks = request.args.get("weeks", 12, type=int)
+        return _cached_response(
+            self._list, self._cache, ("report", weeks),
+            lambda: iter([json.dumps(self._list.report(weeks))]), False)
+
+
+class SummaryResource(Resource):
+    def __init__(self, db_path: Path, cache: ResultCache) -> None:
+        self._list = List(db_path)
+        self._cache = cache
+
+    def get(self) -> Response:
+        """Return the to-do counts of ``List.summary`` as JSON.
+
+        :return: cached or freshly read response
+        :rtype: Response
+        """
+        import json
+
+        return _cached_response(self._list, self._cache, ("summary",),
+                                lambda: iter([json.dumps(self._list.summary())]), False)
+
+
+class ChangesResource(Resource):
+    def __init__(self, db_path: Path, cache: ResultCache) -> None:
+        self._list = List(db_path)
+
+    def get(self) -> Response:
+        """Stream the to-dos changed after ``?since=``, see ``List.changes``.
+
+        ``?limit=`` caps the rows and ``?wait=`` (seconds, at most MAX_WAIT)
+        holds the request open until something changes, so a mirror can
+        long-poll. The body is the ``{"data": [...], "next": seq}`` document,
+        or NDJSON as for ``ListResource``. Clients accepting
+        ``text/event-stream`` get server-sent events instead, one per row,
+        for up to MAX_WAIT seconds; ``Last-Event-ID`` replaces ``since``.
+
+        :return: streamed response
+        :rtype: Response
+        """
+        since = request.args.get("since", 0, type=int)
+        limit = request.args.get("limit", type=int)
+        wait = min(max(request.args.get("wait", 0, type=float), 0), MAX_WAIT)
+        best = request.accept_mimetypes.best_match(
+            ["application/json", "application/x-ndjson", "text/event-stream"])
+        if best == "text/event-stream":
+            last_event = request.headers.get("Last-Event-ID", "")
+            if last_event.isdigit():
+                since = int(last_event)
+            body, mimetype = self._events(since, limit), "text/event-stream"
+        else:
+            if wait and self._list.last_change() <= since:
+                self._list.wait_for_change(since, wait)
+            ndjson = best == "application/x-ndjson"
+            try:
+                body = self._list.stream_changes(since, limit, ndjson)
+            except ValueError as error:
+                abort(400, message=str(error))
+            mimetype = "application/x-ndjson" if ndjson else "application/json"
+        response = Response(stream_with_context(body), mimetype=mimetype)
+        response.headers["Cache-Control"] = "no-store"
+        return response
+
+    def _events(self, since: int, limit: int) -> Iterator[str]:
+        try:
+            page = self._list.changes(since, limit)
+        except ValueError as error:
+            abort(400, message=str(error))
+
+        def stream():
+            names, rows, state = page
+            deadline = time.monotonic() + MAX_WAIT
+            yield "retry: 1000\n\n"
+            while True:
+                yield from encode_events(names, rows)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._list.wait_for_change(state["next"], remaining):
+                    return
+                names, rows, state = self._list.changes(state["next"], limit)
+
+        return stream()
+
+
+class ExportResource(Resource):
+    def __init__(self, db_path: Path, cache: ResultCache) -> None:
+        self._list = List(db_path)
+
+    def get(self) -> Response:
+        """Stream the to-dos as a file download, in constant memory.
+
+        ``?format=`` is csv (default), jsonl, parquet or feather and
+        ``?compression=`` one of ``export.COMPRESSION[format]``. The rows are
+        chosen with ``?method=``, ``?start=``, ``?end=``, ``?where=``,
+        ``?sort=`` and ``?fields=`` as for ``ListResource``.
+
+        :return: streamed response
+        :rtype: Response
+        """
+        from todo import export
+
+        args = request.args
+        fmt = args.get("format", "csv")
+        compression = args.get("compression")
+        try:
+            query = self._list.build(args.get("method", "task_number"), args.get("start", "none"),
+                                     args.get("end", "none"), args.get("where"), args.get("sort"),
+                                     args.get("fields"))
+            names, rows, _ = self._list.rows(query)
+            if query.columns:
+                names = names[:len(query.columns)]
+                rows = (row[:len(names)] for row in rows)
+            body = export.stream(rows, names, fmt, compression)
+        except ValueError as error:
+            abort(400, message=str(error))
+        suffix = {"gzip": ".gz", "bz2": ".bz2", "xz": ".xz"}.get(compression, "") \
+            if fmt in ("csv", "jsonl") else ""
+        response = Response(stream_with_context(body), mimetype=export.MIMETYPES[fmt])
+        response.headers["Content-Disposition"] = f'attachment; filename="tasks.{fmt}{suffix}"'
+        return response
+
+
+class BulkResource(Resource):
+    def __init__(self, db_path: Path, cache: ResultCache, writer: WriteQueue) -> None:
+        self._todoer = Todoer(db_path)
+        self._writer = writer
+
+    def post(self, action: str) -> dict:
+        """Change many to-dos in one transaction.
+
+        ``complete`` and ``remove`` take ``{"ids": [1, "5-40"], "where":
+        "due<2026-01-01 and done"}`` (either key may be left out);
+        ``rename`` and ``redescribe`` take ``{"items": [{"id": 1, "name":
+        ...}]}`` with ``description`` instead of ``name`` for the latter.
+
+        :param action: complete, remove, rename or redescribe
+        :type action: str
+        :return: the number of to-dos changed, as ``{"updated": n}``
+        :rtype: dict
+        """
+        body = _json_body()
+        try:
+            if action in ("complete", "remove"):
+                spans = query.parse_ids(body.get("ids") or ())
+                where = query.parse_where(body["where"]) if body.get("where") else None
+                update = self._todoer.set_done_many if action == "complete" else self._todoer.remove_many
+                changed = self._writer.submit(lambda: update(spans, where))
+            elif action in ("rename", "redescribe"):
+                field = "name" if action == "rename" else "description"
+                pairs = [(int(item["id"]), str(item[field])) for item in body.get("items") or ()]
+                update = self._todoer.rename_many if action == "rename" else self._todoer.redescribe_many
+                changed = self._writer.submit(lambda: update(pairs))
+            else:
+                abort(404, message=f"unknown bulk action {action!r}")
+        except (KeyError, TypeError, ValueError) as error:
+            abort(400, message=f"invalid request: {error}")
+        return {"updated": changed}
+
+
+def create_app(db_path: Path, cache: ResultCache = None, writer: WriteQueue = None,
+               lists: Dict[str, Path] = None) -> Flask:
+    """Build the Flask application serving one to-do database.
+
+    The write queue is kept in ``app.extensions["todo_writer"]`` so the
+    server can close it, committing what is queued, when it stops.
+
+    :param db_path: path to the to-do database
+    :type db_path: Path
+    :param cache: result cache shared by the resources, defaults to a new one
+    :type cache: ResultCache, optional
+    :param writer: group commit queue for the writes, defaults to a new one
+    :type writer: WriteQueue, optional
+    :param lists: task lists ``?lists=`` may merge, defaults to those of the
+        config file with ``db_path`` as the default list
+    :type lists: Dict[str, Path], optional
+    :return: the configured application
+    :rtype: Flask
+    """
+    app = Flask(__name__)
+    api = Api(app)
+    if cache is None:
+        cache = ResultCache()
+    if writer is None:
+        writer = WriteQueue(db_path)
+    app.extensions["todo_writer"] = writer
+    if lists is None:
+        lists = config.get_lists(config.CONFIG_FILE_PATH)
+        lists[config.DEFAULT_LIST] = Path(db_path)
+    resource_kwargs = {"db_path": db_path, "cache": cache}
+    write_kwargs = {**resource_kwargs, "writer": writer}
+    api.add_resource(ListResource, "/tasks", "/tasks/<method>/<start>/<end>",
+                     resource_class_kwargs={**write_kwargs, "lists": lists})
+    api.add_resource(TaskResource, "/tasks/<int:todo_id>", resource_class_kwargs=write_kwargs)
+    api.add_resource(SearchResource, "/tasks/search",
+                     resource_class_kwargs=resource_kwargs)
+    api.add_resource(ReportResource, "/tasks/report", resource_class_kwargs=resource_kwargs)
+    api.add_resource(SummaryResource, "/tasks/summary", resource_class_kwargs=resource_kwargs)
+    api.add_resource(ChangesResource, "/tasks/changes", resource_class_kwargs=resource_kwargs)
+    api.add_resource(ExportResource, "/export", resource_class_kwargs=resource_kwargs)
+    api.add_resource(BulkResource, "/tasks/bulk/<action>",
+                     resource_class_kwargs=write_kwargs)
+
+    @app.route("/metrics")
+    def prometheus_metrics() -> Response:
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    return app
@@ -0,0 +1,180 @@
+import sqlite3
+import sys
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from todo import SUCCESS, database, metrics
+
+# Rows moved per transaction, so writers are never held up for long
+BATCH_ROWS = 5000
+
+
+class Policy(NamedTuple):
+    """Which tasks ``compact`` moves to the archive, and how often.
+
+    Tasks do not record when they were completed, so a completed task
+    counts as closed for as long as its due date lies in the past.
+    """
+    deleted: bool = True
+    # completed tasks due this many days ago or earlier; None keeps them
+    closed_days: Optional[int] = 90
+    # hours between background compactions of a served database; 0 for never
+    interval_hours: float = 24
+
+
+class Compaction(NamedTuple):
+    archived: int
+    freed_pages: int
+    # change log entries superseded by a later change of the same task
+    trimmed: int = 0
+
+
+def archive_path(db_path: Path) -> Path:
+    """Return the archive database kept next to a to-do database."""
+    db_path = Path(db_path)
+    return db_path.with_name(db_path.stem + ".archive" + (db_path.suffix or ".db"))
+
+
+def _attach(conn: sqlite3.Connection, target: Path) -> None:
+    if "archive" not in [row[1] for row in conn.execute("PRAGMA database_list")]:
+        conn.execute("ATTACH DATABASE ? AS archive", (str(target),))
+
+
+def compact(db_path: Path, policy: Policy = Policy(), batch_rows: int = BATCH_ROWS,
+            full: bool = False, today: date = None) -> Compaction:
+    """Move dead tasks to the archive database and give their space back.
+
+    The archive is an ordinary to-do database (see ``archive_path``), so
+    archived tasks can be listed and searched like live ones. Rows move in
+    ID order, ``batch_rows`` per transaction, each copied before it is
+    deleted: an interrupted run leaves at worst a copy in both places,
+    which the next run replaces.
+
+    The change log behind ``List.changes`` is then trimmed to the latest
+    entry of each task, which loses nothing a feed client can observe.
+
+    The pages freed are returned with an incremental vacuum. Databases
+    created before incremental auto-vacuum was enabled need one full
+    VACUUM first, which rewrites the file and only runs with ``full``.
+
+    :param db_path: path to the to-do database
+    :type db_path: Path
+    :param policy: which tasks to archive, defaults to Policy()
+    :type policy: Policy, optional
+    :param batch_rows: rows moved per transaction, defaults to BATCH_ROWS
+    :type batch_rows: int, optional
+    :param full: convert the database to incremental vacuum if needed
+    :type full: bool, optional
+    :param today: reference date for ``policy.closed_days``
+    :type today: date, optional
+    :raises OSError: when the archive database cannot be created
+    :return: the number of tasks archived, of pages freed and of change
+        log entries trimmed
+    :rtype: Compaction
+    """
+    conditions, params = [], []
+    if policy.deleted:
+        conditions.append("DELETED = 1")
+    if policy.closed_days is not None:
+        cutoff = (today or date.today()) - timedelta(days=policy.closed_days)
+        conditions.append("(COMPLETE = 1 AND DUE_DATE <= ?)")
+        params.append(cutoff.isoformat())
+    if batch_rows < 1:
+        raise ValueError("batch_rows must be at least 1")
+
+    handler = database.get_handler(db_path)
+    archived = 0
+    if conditions:
+        target = archive_path(db_path)
+        if database.init_database(target) != SUCCESS:
+            raise OSError(f"cannot open archive database {target}")
+        condition = " OR ".join(conditions)
+        conn = handler.connection()
+        _attach(conn, target)
+        try:
+            low = 0
+            while True:
+                with handler.transaction() as conn, metrics.QUERY_SECONDS.time("compact"):
+                    # the ID closing this batch, or None when the rest fits
+                    row = conn.execute(f"SELECT ID FROM TASKS WHERE ({condition}) AND ID > ? "
+                                       "ORDER BY ID LIMIT 1 OFFSET ?",
+                                       (*params, low, batch_rows - 1)).fetchone()
+                    high = row[0] if row else None
+                    bounds = "ID > ?" if high is None else "ID > ? AND ID <= ?"
+                    args = (*params, low) + (() if high is None else (high,))
+                    # REPLACE would drop the stale copies without running the
+                    # archive's delete triggers, leaving them in its index
+                    conn.execute(f"DELETE FROM archive.TASKS WHERE ID IN "
+                                 f"(SELECT ID FROM TASKS WHERE ({condition}) AND {bounds})", args)
+                    conn.execute(f"INSERT INTO archive.TASKS "
+                                 f"SELECT * FROM TASKS WHERE ({condition}) AND {bounds}", args)
+                    archived += conn.execute(f"DELETE FROM TASKS WHERE ({condition}) AND {bounds}",
+                                             args).rowcount
+                if high is None:
+                    break
+                low = high
+        finally:
+            conn.execute("DETACH DATABASE archive")
+        metrics.observe_rows("compact", archived)
+    trimmed = _trim_changes(handler, batch_rows)
+    return Compaction(archived, _vacuum(handler, full), trimmed)
+
+
+def _trim_changes(handler: database.DatabaseHandler, batch_rows: int) -> int:
+    trimmed, low = 0, 0
+    while True:
+        with handler.transaction() as conn, metrics.QUERY_SECONDS.time("trim_changes"):
+            row = conn.execute("SELECT SEQ FROM TASKS_CHANGES WHERE SEQ > ? "
+                               "ORDER BY SEQ LIMIT 1 OFFSET ?", (low, batch_rows - 1)).fetchone()
+            high = row[0] if row else None
+            bounds = "SEQ > ?" if high is None else "SEQ > ? AND SEQ <= ?"
+            trimmed += conn.execute(
+                f"DELETE FROM TASKS_CHANGES WHERE {bounds} AND EXISTS (SELECT 1 FROM TASKS_CHANGES "
+                "AS L WHERE L.ID = TASKS_CHANGES.ID AND L.SEQ > TASKS_CHANGES.SEQ)",
+                (low,) + (() if high is None else (high,))).rowcount
+        if high is None:
+            return trimmed
+        low = high
+
+
+def _vacuum(handler: database.DatabaseHandler, full: bool) -> int:
+    conn = handler.connection()
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        if not full:
+            # free pages are still reused by later inserts
+            return 0
+        # VACUUM cannot run in a transaction but still writes
+        with database.write_locked(), metrics.QUERY_SECONDS.time("vacuum"):
+            freed = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        return freed
+    with handler.transaction() as conn, metrics.QUERY_SECONDS.time("vacuum"):
+        freed = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        # each step of the pragma frees one page; fetchall steps to the end
+        conn.execute("PRAGMA incremental_vacuum").fetchall()
+    # the file shrinks once the WAL is checkpointed
+    conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+    return freed
+
+
+class Compactor(threading.Thread):
+    """Daemon thread compacting one database every ``policy.interval_hours``."""
+
+    def __init__(self, db_path: Path, policy: Policy) -> None:
+        super().__init__(name="todo-compactor", daemon=True)
+        self._db_path = db_path
+        self._policy = policy
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self._policy.interval_hours * 3600):
+            try:
+                compact(self._db_path, self._policy)
+            except (OSError, sqlite3.Error) as error:
+                print(f"todo: compaction of {self._db_path} failed: {error}", file=sys.stderr)
+
+    def stop(self) -> None:
+        self._stopped.set()
@@ -0,0 +1,56 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class ResultCache():
+    """Size-bounded LRU cache of encoded query results.
+
+    Entries are tagged with the data generation they were computed at and
+    are dropped as soon as a lookup sees a newer generation.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, max_entry_bytes: int = 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, generation: int) -> Optional[str]:
+        """Return the cached body for ``key`` if it is still current.
+
+        :param key: (method, start, end, page, ...) of the request
+        :type key: Hashable
+        :param generation: current data generation
+        :type generation: int
+        :return: the cached body, or None on a miss
+        :rtype: str, optional
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] != generation:
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Hashable, generation: int, body: str) -> None:
+        """Store a body, evicting least recently used entries to fit."""
+        if len(body) > self.max_entry_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (generation, body)
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: Hashable) -> None:
+        self._size -= len(self._entries.pop(key)[1])
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,10 +1,10 @@
 from pathlib import Path
-from typing import List, Optional
-import sqlite3
-from datetime import date, timedelta, datetime
-from flask import Flask
-from flask_restful import Resource, Api
-from flask import jsonify
+import os
+from typing import Optional
+import typing
+import time
+from itertools import chain
+from datetime import datetime
 import typer
 
 from todo import ERRORS, __app_name__, __version__, config, database, todo
@@ -15,6 +15,15 @@ from todo.todo import Todoer, List
 ##############################################################################
 
 app = typer.Typer()
+lists_app = typer.Typer(help="Manage named task lists, each in its own database.")
+app.add_typer(lists_app, name="lists")
+
+# Task list chosen with todo --list NAME, None for the [General] database
+_selected_list: Optional[str] = None
+# Database of each list already looked up, with the mtime of the config file
+# it was read from, so todo shell and todo run read the config file again
+# only after it changes
+_db_paths: typing.Dict[Optional[str], typing.Tuple[int, Path]] = {}
 
 def to_date(s):
     return datetime.strptime(s, '%Y-%m-%d')
@@ -35,6 +44,7 @@ def init(
     :raises typer.Exit: config directory error
     :raises typer.Exit: config directory error
     """
+    _db_paths.clear()
     app_init_error = config.init_app(db_path)
     if app_init_error:
         typer.secho(
@@ -53,9 +63,20 @@ def init(
         typer.secho(f"The to-do database is {db_path}", fg=typer.colors.GREEN)
 
 
-def get_todoer() -> todo.Todoer:
-    if config.CONFIG_FILE_PATH.exists():
-        db_path = database.get_database_path(config.CONFIG_FILE_PATH)
+def get_db_path() -> Path:
+    try:
+        config_mtime = config.CONFIG_FILE_PATH.stat().st_mtime_ns
+    except OSError:
+        config_mtime = None
+    cached = _db_paths.pop(_selected_list, None)
+    if cached is not None and cached[0] == config_mtime and cached[1].exists():
+        _db_paths[_selected_list] = cached
+        return cached[1]
+    if config_mtime is not None:
+        if _selected_list is None:
+            db_path = database.get_database_path(config.CONFIG_FILE_PATH)
+        else:
+            db_path = _get_lists([_selected_list])[_selected_list]
     else:
         typer.secho(
             'Config file not found. Please, run "todo init"',
@@ -63,7 +84,8 @@ def get_todoer() -> todo.Todoer:
         )
         raise typer.Exit(1)
     if db_path.exists():
-        return todo.Todoer()
+        _db_paths[_selected_list] = (config_mtime, db_path)
+        return db_path
 
     else:
         typer.secho(
@@ -72,83 +94,463 @@ def get_todoer() -> todo.Todoer:
         )
         raise typer.Exit(1)
 
+
+def get_todoer() -> todo.Todoer:
+    return todo.Todoer(get_db_path())
+
+
+def _get_lists(names: Optional[typing.List[str]] = None) -> typing.Dict[str, Path]:
+    """Return the registered lists, or those among them called ``names``."""
+    if not config.CONFIG_FILE_PATH.exists():
+        typer.secho('Config file not found. Please, run "todo init"', fg=typer.colors.RED)
+        raise typer.Exit(1)
+    lists = config.get_lists(config.CONFIG_FILE_PATH)
+    if names is None:
+        return lists
+    unknown = [name for name in names if name not in lists]
+    if unknown:
+        typer.secho(f'Unknown list "{unknown[0]}", see "todo lists show"', fg=typer.colors.RED)
+        raise typer.Exit(1)
+    return {name: lists[name] for name in names}
+
+
+def _get_archive(db_path: Path) -> Path:
+    from todo import archive
+
+    path = archive.archive_path(db_path)
+    if not path.exists():
+        typer.secho('Nothing has been archived yet, see "todo compact"', fg=typer.colors.RED)
+        raise typer.Exit(1)
+    return path
+
+
+@lists_app.command("add")
+def lists_add(
+    name: str = typer.Argument(..., help="letters, digits, - and _"),
+    db_path: Optional[str] = typer.Option(None, "--db-path", "-db",
+        help="defaults to NAME_todo.db next to the [General] database"),
+) -> None:
+    """Create a task list in its own database and register it."""
+    import re
+
+    lists = _get_lists()
+    if not re.fullmatch(r"[a-z0-9_-]+", name):
+        typer.secho("List names are lower-case letters, digits, - and _", fg=typer.colors.RED)
+        raise typer.Exit(1)
+    if name in lists:
+        typer.secho(f'List "{name}" already exists', fg=typer.colors.RED)
+        raise typer.Exit(1)
+    if db_path is None:
+        general = lists.get(config.DEFAULT_LIST, database.DEFAULT_DB_FILE_PATH)
+        path = general.with_name(f"{name}_todo.db")
+    else:
+        path = Path(db_path)
+    _db_paths.clear()
+    error = database.init_database(path) or config.add_list(config.CONFIG_FILE_PATH, name, path)
+    if error:
+        typer.secho(f'Creating list failed with "{ERRORS[error]}"', fg=typer.colors.RED)
+        raise typer.Exit(1)
+    typer.secho(f'List "{name}" is {path}', fg=typer.colors.GREEN)
+
+
+@lists_app.command("show")
+def lists_show() -> None:
+    """Show the task lists and their databases."""
+    for name, path in _get_lists().items():
+        typer.echo(f"{name:<16} {path}")
+
 @app.command()
 def add(
     name: str = typer.Argument(...),
     description: str = typer.Argument(...),
-    start_date: str = typer.Option(str((datetime.now()).date()), "--startdate", "-sd"),
-    due_date: str = typer.Option(str((datetime.now()).date()), "--duedate", "-dd"),
+    start_date: Optional[str] = typer.Option(None, "--startdate", "-sd", help="defaults to today"),
+    due_date: Optional[str] = typer.Option(None, "--duedate", "-dd", help="defaults to today"),
     priority: int = typer.Option(2, "--priority", "-p", min=1, max=3),
     complete: int = typer.Option(0, "--complete", "-c", min=0, max=1),
     deleted: int = typer.Option(0, "--deleted", "-d", min=0, max=1)
 ) -> None:
     """Add a new to-do with a DESCRIPTION."""
+    # today when the command runs, not when a long todo shell started
+    today = str((datetime.now()).date())
+    start_date = start_date or today
+    due_date = due_date or today
     todoer = get_todoer()
     todo = todoer.add(name, description, start_date, due_date, priority, complete, deleted)
+    typer.secho(f"""to-do "{name}" added""", fg=typer.colors.GREEN)
     return todo
 
+@app.command(name="import")
+def import_tasks(
+    path: Path = typer.Argument(..., help="CSV or JSONL file, - for stdin"),
+    fmt: Optional[str] = typer.Option(None, "--format", "-f", help="csv or jsonl"),
+    chunk_size: int = typer.Option(10000, "--chunk-size", min=1),
+    skip_invalid: bool = typer.Option(False, "--skip-invalid"),
+) -> None:
+    """Bulk import to-dos from a CSV or JSONL file."""
+    from todo import ingest
+
+    todoer = get_todoer()
+    errors = [] if skip_invalid else None
+    rows = ingest.validated(
+        ingest.read_rows(path, fmt), str((datetime.now()).date()), errors
+    )
+    started = time.perf_counter()
+    try:
+        count = todoer.add_many(rows, chunk_size)
+    except (OSError, ValueError) as error:
+        typer.secho(
+            f"Import stopped, earlier chunks were kept: {error}",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    elapsed = time.perf_counter() - started
+    for message in errors or ():
+        typer.secho(f"skipped {message}", fg=typer.colors.YELLOW)
+    typer.secho(
+        f"{count} to-dos imported in {elapsed:.2f}s",
+        fg=typer.colors.GREEN,
+    )
+
+@app.command(name="export")
+def export_tasks(
+    path: Path = typer.Argument(..., help="file to write, - for stdout"),
+    method: str = typer.Option("task_number", "--method", "-m", help="to-do list to export"),
+    start: str = typer.Option('none', "--start", "-s"),
+    end: str = typer.Option('none', "--end", "-e"),
+    where: Optional[str] = typer.Option(None, "--where", "-w"),
+    sort: Optional[str] = typer.Option(None, "--sort", "-o"),
+    columns: Optional[str] = typer.Option(None, "--columns", "-c"),
+    fmt: Optional[str] = typer.Option(None, "--format", "-f",
+        help="csv, jsonl, parquet or feather, defaults to a guess from the suffix"),
+    compression: Optional[str] = typer.Option(None, "--compression", "-z",
+        help="gzip, bz2 or xz for csv/jsonl; snappy, zstd... for parquet; lz4 or zstd for feather"),
+) -> None:
+    """Export to-dos to CSV, JSONL, Parquet or Feather in constant memory."""
+    from todo import export
+
+    fmt = fmt or export.detect_format(path)
+    if compression is None and fmt in ("csv", "jsonl"):
+        compression = export.detect_compression(path)
+    todo_list = List(get_db_path())
+    started = time.perf_counter()
+    try:
+        export.check(fmt, compression)
+        query = todo_list.build(method, start, end, where, sort, columns)
+        names, rows, _ = todo_list.rows(query)
+        if query.columns:
+            names = names[:len(query.columns)]
+            rows = (row[:len(names)] for row in rows)
+        with export.open_output(path) as file:
+            count = export.write(rows, names, file, fmt, compression)
+    except BrokenPipeError:
+        # the reader, e.g. head, has seen enough
+        raise typer.Exit()
+    except (OSError, ValueError) as error:
+        typer.secho(f"Export failed: {error}", fg=typer.colors.RED, err=True)
+        raise typer.Exit(1)
+    typer.secho(
+        f"{count} to-dos exported in {time.perf_counter() - started:.2f}s",
+        fg=typer.colors.GREEN, err=str(path) == "-",
+    )
+
+def _print_table(todo_list, names, pager: Optional[bool] = None) -> None:
+    from todo import render
+
+    typer.secho("\nto-do list:\n", fg=typer.colors.BLUE, bold=True)
+    render.write(render.table(todo_list, names), pager)
+
+
 @app.command(name="list")
 def list_all(
     method: str = typer.Argument(...),
     start: str = typer.Option('none', "--start", "-s"),
     end: str = typer.Option('none', "--end", "-e"),
-    api_bool: int = typer.Option(0,"--api", "-a",min=0, max=1)
+    api_bool: int = typer.Option(0,"--api", "-a",min=0, max=1),
+    limit: Optional[int] = typer.Option(None, "--limit", "-l", min=1),
+    after: Optional[str] = typer.Option(None, "--after", help="cursor printed by the previous page"),
+    where: Optional[str] = typer.Option(None, "--where", "-w",
+        help='extra filter, e.g. "priority=3 and due<=today+7"'),
+    sort: Optional[str] = typer.Option(None, "--sort", "-o",
+        help='sort order replacing the list\'s own, e.g. "due" or "-priority,due"'),
+    columns: Optional[str] = typer.Option(None, "--columns", "-c",
+        help='columns to show, e.g. "id,name,due"'),
+    pager: Optional[bool] = typer.Option(None, "--pager/--no-pager",
+        help="page long output, by default when it does not fit the terminal"),
+    all_lists: bool = typer.Option(False, "--all-lists", help="merge every task list"),
+    lists: Optional[str] = typer.Option(None, "--lists",
+        help='task lists to merge, e.g. "work,home"'),
+    archived: bool = typer.Option(False, "--archived", help="list archived to-dos, see todo compact"),
 ) -> None:
     """List all to-dos."""
-    app = Flask(__name__)
-    api = Api(app)
-    with app.app_context():
-        todoer = List()
-        todo_list = todoer.get(method,start,end,api_bool)
-        if not todo_list:
+    if all_lists or lists:
+        from todo.shards import Shards
+
+        todoer = Shards(_get_lists(None if all_lists else lists.split(",")))
+    elif archived:
+        todoer = List(_get_archive(get_db_path()))
+    else:
+        db_path = get_db_path()
+        if int(api_bool) == 1:
+            serve(host=None, port=None, threads=None, workers=None, db_path=str(db_path),
+                  collect_metrics=None, commit_batch=None, commit_delay_ms=None)
+            return
+        todoer = List(db_path)
+    try:
+        query = List.build(method, start, end, where, sort, columns, limit)
+        names, rows, state = todoer.rows(query, after)
+    except ValueError as error:
+        typer.secho(str(error), fg=typer.colors.RED)
+        raise typer.Exit(1)
+    first = next(rows, None)
+    if first is None:
+        typer.secho(
+            "There are no tasks in the to-do list yet", fg=typer.colors.RED
+        )
+        raise typer.Exit()
+    if query.columns:
+        names = names[:len(query.columns) + (names[0] == "LIST")]
+    _print_table(chain((first,), rows), names, pager)
+    if state.get("next"):
+        typer.secho(f"next page: --after {state['next']}", fg=typer.colors.BLUE)
+
+
+@app.command()
+def search(
+    text: str = typer.Argument(..., help="words to find in names and descriptions"),
+    limit: Optional[int] = typer.Option(20, "--limit", "-l", min=1),
+    after: Optional[str] = typer.Option(None, "--after", help="cursor printed by the previous page"),
+) -> None:
+    """Full-text search to-dos, best match first."""
+    try:
+        names, rows, state = List(get_db_path()).search_rows(text, limit, after)
+        todo_list, next_cursor = list(rows), state.get("next")
+    except ValueError as error:
+        typer.secho(str(error), fg=typer.colors.RED)
+        raise typer.Exit(1)
+    if not todo_list:
+        typer.secho("No to-dos match", fg=typer.colors.RED)
+        raise typer.Exit()
+    # leave out the trailing RANK column
+    _print_table(todo_list, names[:-1])
+    if next_cursor:
+        typer.secho(f"next page: --after {next_cursor}", fg=typer.colors.BLUE)
+
+
+@app.command()
+def serve(
+    host: Optional[str] = typer.Option(None, "--host"),
+    port: Optional[int] = typer.Option(None, "--port", "-p"),
+    threads: Optional[int] = typer.Option(None, "--threads", "-t", min=1),
+    workers: Optional[int] = typer.Option(None, "--workers", "-w", min=1,
+        help="processes sharing the database, each with --threads threads"),
+    db_path: Optional[str] = typer.Option(None, "--db-path", "-db"),
+    collect_metrics: Optional[bool] = typer.Option(None, "--metrics/--no-metrics"),
+    commit_batch: Optional[int] = typer.Option(None, "--commit-batch", min=1,
+        help="most writes committed together"),
+    commit_delay_ms: Optional[float] = typer.Option(None, "--commit-delay-ms", min=0,
+        help="milliseconds a write may wait for others to commit with"),
+) -> None:
+    """Serve the to-do API; defaults come from the [Server] section of config.ini."""
+    from todo import server
+
+    if not config.CONFIG_FILE_PATH.exists():
+        typer.secho(
+            'Config file not found. Please, run "todo init"',
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    settings = config.get_server_config(config.CONFIG_FILE_PATH)
+    db_path = Path(db_path) if db_path else settings.database
+    db_init_error = database.init_database(db_path)
+    if db_init_error:
+        typer.secho(
+            f'Opening database failed with "{ERRORS[db_init_error]}"',
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    host = host or settings.host
+    port = port or settings.port
+    threads = threads or settings.threads
+    workers = workers or settings.workers
+    if collect_metrics is None:
+        collect_metrics = settings.metrics
+    archive_policy = config.get_archive_policy(config.CONFIG_FILE_PATH)
+    commit_batch = commit_batch or settings.commit_batch
+    if commit_delay_ms is None:
+        commit_delay_ms = settings.commit_delay_ms
+    if workers > 1 and not hasattr(os, "fork"):
+        typer.secho("Several workers need os.fork, serving from one process", fg=typer.colors.YELLOW)
+        workers = 1
+    typer.secho(
+        f"Serving {db_path} on http://{host}:{port} with "
+        + (f"{workers} workers of " if workers > 1 else "") + f"{threads} threads",
+        fg=typer.colors.GREEN,
+    )
+    if workers > 1:
+        try:
+            server.serve_prefork(db_path, host, port, threads, workers, collect_metrics,
+                                 commit_batch, commit_delay_ms, archive_policy)
+        except OSError as error:
+            typer.secho(str(error), fg=typer.colors.RED)
+            raise typer.Exit(1)
+    else:
+        server.serve(db_path, host, port, threads, collect_metrics, commit_batch, commit_delay_ms,
+                     archive_policy)
+
+
+@app.command()
+def stats(
+    url: Optional[str] = typer.Option(None, "--url", help="defaults to the [Server] address"),
+    raw: bool = typer.Option(False, "--raw", help="print the Prometheus text as is"),
+) -> None:
+    """Show query latency and row statistics of a running todo server."""
+    import urllib.request
+    from todo import metrics
+
+    if url is None:
+        if not config.CONFIG_FILE_PATH.exists():
             typer.secho(
-                "There are no tasks in the to-do list yet", fg=typer.colors.RED
+                'Config file not found. Please, run "todo init"',
+                fg=typer.colors.RED,
             )
-            raise typer.Exit()
-        if int(api_bool) == 1:
-            api.add_resource(List, "/tasks/<method>/<start>/<end>")
-            app.run(port="5000")
+            raise typer.Exit(1)
+        settings = config.get_server_config(config.CONFIG_FILE_PATH)
+        url = f"http://{settings.host}:{settings.port}/metrics"
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            text = response.read().decode()
+    except OSError as error:
+        typer.secho(f"Could not read {url}: {error}", fg=typer.colors.RED)
+        raise typer.Exit(1)
+    if raw:
+        typer.echo(text, nl=False)
+        return
+    rows = metrics.summarize(text)
+    if not rows:
+        typer.secho("No statistics recorded yet", fg=typer.colors.RED)
+        raise typer.Exit()
+    typer.secho(f"{'metric':<24}{'label':<16}{'count':>10}{'mean':>12}{'p95 <=':>12}",
+                fg=typer.colors.BLUE, bold=True)
+    for name, label, count, mean, p95 in rows:
+        if name.endswith("_seconds"):
+            mean, p95 = f"{mean * 1000:.3f}ms", f"{p95 * 1000:.3f}ms"
         else:
-            typer.secho("\nto-do list:\n", fg=typer.colors.BLUE, bold=True)
-            columns = (
-                "ID.  ",
-                "| Name         ",
-                "| Description                ",
-                "| Start Date         ",
-                "| Due Date           ",
-                "| Priority  ",
-                "| Done  ",
-                "| Deleted  ",
-            )
-            headers = "".join(columns)
-            typer.secho(headers, fg=typer.colors.BLUE, bold=True)
-            typer.secho("-" * len(headers), fg=typer.colors.BLUE)
-            for todo in todo_list:
-                id,name,desc,sd,dd,pr,done,deleted = list(todo)
-                typer.secho(
-                    f"{id}{(len(columns[0]) - len(str(id))) * ' '}"
-                    f"| {name}{(len(columns[1]) - len(str(name)) - 2) * ' '}"
-                    f"| {desc}{(len(columns[2]) - len(str(desc)) - 2) * ' '}"
-                    f"| {sd}{(len(columns[3]) - len(str(sd)) - 2) * ' '}"
-                    f"| {dd}{(len(columns[4]) - len(str(dd)) - 2) * ' '}"
-                    f"| {pr}{(len(columns[5]) - len(str(pr)) - 2) * ' '}"
-                    f"| {done}{(len(columns[6]) - len(str(done)) - 2) * ' '}"
-                    f"| {deleted}",
-                    fg=typer.colors.BLUE,
-                )
-            typer.secho("-" * len(headers) + "\n", fg=typer.colors.BLUE)
+            mean, p95 = f"{mean:.1f}", f"{p95:g}"
+        typer.echo(f"{name[len('todo_'):]:<24}{label:<16}{count:>10}{mean:>12}{p95:>12}")
 
 
-@app.command(name="complete")
-def set_done(todo_id: int = typer.Argument(...)) -> None:
-    """Complete a to-do by setting it as done using its TODO_ID."""
-    todoer = get_todoer()
-    todo = todoer.set_done(todo_id)
+def _selection(todo_ids: Optional[typing.List[str]], where: Optional[str]) -> tuple:
+    """Parse the IDs, ID ranges and filter naming the to-dos to change."""
+    from todo import query
+
+    try:
+        spans = query.parse_ids(todo_ids or ())
+        predicate = query.parse_where(where) if where else None
+    except ValueError as error:
+        typer.secho(str(error), fg=typer.colors.RED)
+        raise typer.Exit(1)
+    if not spans and predicate is None:
+        typer.secho("Give to-do IDs (e.g. 1 2 5-40) or --where", fg=typer.colors.RED)
+        raise typer.Exit(1)
+    return spans, predicate
+
+@app.command()
+def report(
+    weeks: int = typer.Option(12, "--weeks", "-w", min=1, help="weeks of throughput and burndown"),
+    as_json: bool = typer.Option(False, "--json", help="print the report as JSON"),
+) -> None:
+    """Report completion rates, overdue aging, throughput and burndown."""
+    from todo import render
+    from todo import report as reports
+
+    result = List(get_db_path()).report(weeks)
+    if as_json:
+        import json
+
+        typer.echo(json.dumps(result, indent=2))
+        return
+    for title, names, rows in reports.tables(result):
+        typer.secho(f"\n{title}:\n", fg=typer.colors.BLUE, bold=True)
+        render.write(render.table(rows, names), pager=False)
+
+@app.command()
+def summary(
+    as_json: bool = typer.Option(False, "--json", help="print the counts as JSON"),
+    rebuild: bool = typer.Option(False, "--rebuild", help="recount from the tasks to repair drift"),
+) -> None:
+    """Count open, done, deleted and overdue to-dos, instantly."""
+    from todo import render
+
+    db_path = get_db_path()
+    if rebuild:
+        fixed = Todoer(db_path).rebuild_summary()
+        typer.secho(f"Summary rebuilt, {fixed} counter(s) corrected", fg=typer.colors.GREEN)
+    result = List(db_path).summary()
+    if as_json:
+        import json
+
+        typer.echo(json.dumps(result, indent=2))
+        return
+    totals = [(name, result[name]) for name in ("tasks", "open", "done", "deleted", "overdue")]
+    render.write(render.table(totals, ["Count", "To-dos"]), pager=False)
+    typer.echo()
+    render.write(render.table([(p["priority"], p["open"], p["done"]) for p in result["priority"]],
+                              ["Priority", "Open", "Done"]), pager=False)
+
+@app.command()
+def compact(
+    closed_days: Optional[int] = typer.Option(None, "--closed-days", min=0,
+        help="archive completed tasks due this many days ago; defaults to [Archive] closed_days"),
+    keep_closed: bool = typer.Option(False, "--keep-closed", help="do not archive completed tasks"),
+    keep_deleted: bool = typer.Option(False, "--keep-deleted", help="do not archive deleted tasks"),
+    batch_rows: int = typer.Option(5000, "--batch", min=1, help="tasks moved per transaction"),
+    full: bool = typer.Option(False, "--full",
+        help="rewrite the file once so later compactions can shrink it"),
+) -> None:
+    """Move deleted and long-closed to-dos to the archive database."""
+    import sqlite3
+    from todo import archive
+
+    db_path = get_db_path()
+    policy = config.get_archive_policy(config.CONFIG_FILE_PATH)
+    if closed_days is not None:
+        policy = policy._replace(closed_days=closed_days)
+    if keep_closed:
+        policy = policy._replace(closed_days=None)
+    if keep_deleted:
+        policy = policy._replace(deleted=False)
+    started = time.perf_counter()
+    try:
+        result = archive.compact(db_path, policy, batch_rows, full)
+    except (OSError, sqlite3.Error) as error:
+        typer.secho(str(error), fg=typer.colors.RED)
+        raise typer.Exit(1)
     typer.secho(
-        f"""to-do # {todo_id} completed!""",
+        f"{result.archived} to-do(s) archived to {archive.archive_path(db_path)}, "
+        f"{result.trimmed} change log entries trimmed, "
+        f"{result.freed_pages} page(s) freed in {time.perf_counter() - started:.2f}s",
         fg=typer.colors.GREEN,
     )
 
+@app.command(name="complete")
+def set_done(
+    todo_ids: Optional[typing.List[str]] = typer.Argument(None, help="IDs or ranges such as 5-40"),
+    where: Optional[str] = typer.Option(None, "--where", "-w",
+        help='filter, e.g. "due<2026-01-01 and open"'),
+) -> None:
+    """Complete to-dos by setting them as done using their TODO_IDS or a filter."""
+    spans, predicate = _selection(todo_ids, where)
+    todoer = get_todoer()
+    if predicate is None and len(spans) == 1 and spans[0][0] == spans[0][1]:
+        todoer.set_done(spans[0][0])
+        typer.secho(
+            f"""to-do # {spans[0][0]} completed!""",
+            fg=typer.colors.GREEN,
+        )
+        return
+    changed = todoer.set_done_many(spans, predicate)
+    typer.secho(f"{changed} to-do(s) completed!", fg=typer.colors.GREEN)
+
 @app.command(name="rename")
 def rename_task(
     todo_id: int = typer.Argument(...),
@@ -177,26 +579,69 @@ def redescribe(
 
 @app.command()
 def remove(
-    todo_id: int = typer.Argument(...)
+    todo_ids: Optional[typing.List[str]] = typer.Argument(None, help="IDs or ranges such as 5-40"),
+    where: Optional[str] = typer.Option(None, "--where", "-w",
+        help='filter, e.g. "due<2026-01-01 and done"'),
+    yes: bool = typer.Option(False, "--yes", "-y", help="do not ask for confirmation"),
 ) -> None:
-    """Remove a to-do using its TODO_ID."""
+    """Remove to-dos using their TODO_IDS or a filter."""
+    spans, predicate = _selection(todo_ids, where)
     todoer = get_todoer()
+    single = predicate is None and len(spans) == 1 and spans[0][0] == spans[0][1]
 
     def _remove():
-        todo = todoer.remove(todo_id)
-        typer.secho(
-            f"""to-do # {todo_id}' was removed""",
-            fg=typer.colors.GREEN,
-        )
+        if single:
+            todoer.remove(spans[0][0])
+            typer.secho(
+                f"""to-do # {spans[0][0]}' was removed""",
+                fg=typer.colors.GREEN,
+            )
+        else:
+            changed = todoer.remove_many(spans, predicate)
+            typer.secho(f"{changed} to-do(s) removed", fg=typer.colors.GREEN)
 
-    delete = typer.confirm(
-        f"Delete to-do # {todo_id}?"
-    )
-    if delete:
+    if single:
+        prompt = f"Delete to-do # {spans[0][0]}?"
+    else:
+        selected = [" ".join(f"{low}-{high}" if low != high else str(low) for low, high in spans)]
+        if where:
+            selected.append(f'where "{where}"')
+        prompt = f"Delete to-dos {' and '.join(part for part in selected if part)}?"
+    if yes or typer.confirm(prompt):
         _remove()
     else:
         typer.echo("Operation canceled")
 
+@app.command()
+def shell() -> None:
+    """Run todo commands interactively in one process, with begin/commit/rollback."""
+    from todo import shell as session
+
+    get_db_path()
+    raise typer.Exit(session.interact(session.Session(_selected_list)))
+
+@app.command(name="run")
+def run_script(
+    path: Path = typer.Argument(..., help="file with one todo command per line, - for stdin"),
+    keep_going: bool = typer.Option(False, "--keep-going", "-k",
+        help="run the remaining lines after a failure"),
+    atomic: bool = typer.Option(False, "--atomic",
+        help="run the script in one transaction, committed only if every line succeeds"),
+) -> None:
+    """Run a script of todo commands in one process, e.g. "complete 5" per line."""
+    import sys
+    from contextlib import nullcontext
+    from todo import shell as session
+
+    get_db_path()
+    try:
+        with (open(path, encoding="utf-8") if str(path) != "-" else nullcontext(sys.stdin)) as lines:
+            status = session.run(session.Session(_selected_list), lines, keep_going, atomic)
+    except OSError as error:
+        typer.secho(f"Cannot read the script: {error}", fg=typer.colors.RED)
+        raise typer.Exit(1)
+    raise typer.Exit(status)
+
 def _version_callback(value: bool) -> None:
     if value:
         typer.echo(f"{__app_name__} v{__version__}")
@@ -212,6 +657,9 @@ def main(
         help="Show the application's version and exit.",
         callback=_version_callback,
         is_eager=True,
-    )
+    ),
+    task_list: Optional[str] = typer.Option(
+        None, "--list", "-L", help="Task list to work on, see todo lists."),
 ) -> None:
-    return
\ No newline at end of file
+    global _selected_list
+    _selected_list = task_list
\ No newline at end of file
@@ -1,13 +1,30 @@
 import configparser
 from pathlib import Path
+from typing import Dict, NamedTuple
 
 import typer
 
 from todo import DB_WRITE_ERROR, DIR_ERROR, FILE_ERROR, SUCCESS, __app_name__
+from todo.archive import Policy
+from todo.writer import MAX_BATCH, MAX_DELAY_MS
 
 CONFIG_DIR_PATH = Path(typer.get_app_dir(__app_name__))
 CONFIG_FILE_PATH = CONFIG_DIR_PATH / "config.ini"
 
+# Name of the task list kept in the [General] database
+DEFAULT_LIST = "default"
+
+
+class ServerConfig(NamedTuple):
+    host: str
+    port: int
+    threads: int
+    database: Path
+    metrics: bool
+    workers: int
+    commit_batch: int
+    commit_delay_ms: float
+
 
 def init_app(db_path: str) -> int:
     """Initialize the application."""
@@ -33,11 +50,113 @@ def _init_config_file() -> int:
 
 
 def _create_database(db_path: str) -> int:
+    # keep [Lists], [Server] and [Archive] when init runs again
     config_parser = configparser.ConfigParser()
-    config_parser["General"] = {"database": db_path}
+    config_parser.read(CONFIG_FILE_PATH)
+    if not config_parser.has_section("General"):
+        config_parser.add_section("General")
+    config_parser["General"]["database"] = db_path
     try:
         with CONFIG_FILE_PATH.open("w") as file:
             config_parser.write(file)
     except OSError:
         return DB_WRITE_ERROR
-    return SUCCESS
\ No newline at end of file
+    return SUCCESS
+
+
+def get_lists(config_file: Path) -> Dict[str, Path]:
+    """Return the named task lists, each stored in its own database.
+
+    Lists are registered in the [Lists] section::
+
+        [Lists]
+        work = /home/me/work_todo.db
+        home = /home/me/home_todo.db
+
+    The [General] database is the list named DEFAULT_LIST.
+    """
+    config_parser = configparser.ConfigParser()
+    config_parser.read(config_file)
+    lists = {}
+    if config_parser.has_option("General", "database"):
+        lists[DEFAULT_LIST] = Path(config_parser["General"]["database"])
+    if config_parser.has_section("Lists"):
+        lists.update((name, Path(path)) for name, path in config_parser["Lists"].items())
+    return lists
+
+
+def add_list(config_file: Path, name: str, db_path: Path) -> int:
+    """Register a task list in the [Lists] section of the config file."""
+    config_parser = configparser.ConfigParser()
+    config_parser.read(config_file)
+    if not config_parser.has_section("Lists"):
+        config_parser.add_section("Lists")
+    config_parser["Lists"][name] = str(db_path)
+    try:
+        with config_file.open("w") as file:
+            config_parser.write(file)
+    except OSError:
+        return FILE_ERROR
+    return SUCCESS
+
+
+def get_archive_policy(config_file: Path) -> Policy:
+    """Read the optional [Archive] section of the config file.
+
+    Example::
+
+        [Archive]
+        deleted = yes
+        closed_days = 90
+        interval_hours = 24
+
+    ``closed_days = never`` keeps completed tasks and ``interval_hours = 0``
+    turns background compaction off. Missing keys take the Policy defaults.
+    """
+    config_parser = configparser.ConfigParser()
+    config_parser.read(config_file)
+    if not config_parser.has_section("Archive"):
+        return Policy()
+    section, defaults = config_parser["Archive"], Policy()
+    closed_days = section.get("closed_days", str(defaults.closed_days))
+    return Policy(
+        deleted=section.getboolean("deleted", defaults.deleted),
+        closed_days=None if closed_days.lower() == "never" else int(closed_days),
+        interval_hours=float(section.get("interval_hours", defaults.interval_hours)),
+    )
+
+
+def get_server_config(config_file: Path) -> ServerConfig:
+    """Read the optional [Server] section of the config file.
+
+    Example::
+
+        [Server]
+        host = 0.0.0.0
+        port = 5000
+        threads = 8
+        workers = 4
+        database = /srv/todo.db
+        metrics = yes
+        commit_batch = 64
+        commit_delay_ms = 2
+
+    Missing keys fall back to localhost:5000, 8 threads, one process, the
+    [General] database, metrics enabled and the ``writer`` defaults for
+    group commit (see ``WriteQueue``).
+    """
+    config_parser = configparser.ConfigParser()
+    config_parser.read(config_file)
+    general = config_parser["General"] if config_parser.has_section("General") else {}
+    server = config_parser["Server"] if config_parser.has_section("Server") else {}
+    database = server.get("database") or general.get("database") or ""
+    return ServerConfig(
+        host=server.get("host", "127.0.0.1"),
+        port=int(server.get("port", 5000)),
+        threads=int(server.get("threads", 8)),
+        database=Path(database),
+        metrics=server.getboolean("metrics", True) if server else True,
+        workers=int(server.get("workers", 1)),
+        commit_batch=int(server.get("commit_batch", MAX_BATCH)),
+        commit_delay_ms=float(server.get("commit_delay_ms", MAX_DELAY_MS)),
+    )
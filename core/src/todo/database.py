@@ -1,15 +1,213 @@
 import configparser
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from flask import Flask
-from flask_restful import Resource, Api
+from typing import Dict, Iterator, Tuple
 import sqlite3
 
-from todo import DB_WRITE_ERROR, SUCCESS
+from todo import DB_WRITE_ERROR, SUCCESS, metrics
 
 DEFAULT_DB_FILE_PATH = Path.cwd().joinpath(
     "." + Path.cwd().stem + "_todo.db"
 )
 
+# Milliseconds a connection waits on a locked database before giving up
+BUSY_TIMEOUT_MS = 5000
+
+# Applied once to every pooled connection when it is opened
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA mmap_size = 268435456",
+)
+
+# Recount the trigger-maintained counters of migration 6 from TASKS
+SUMMARY_REBUILD = (
+    "DELETE FROM TASKS_SUMMARY;",
+    """INSERT INTO TASKS_SUMMARY (PRIORITY, COMPLETE, DELETED, N)
+     SELECT IFNULL(PRIORITY, 0), IFNULL(COMPLETE, 0), IFNULL(DELETED, 0), COUNT(*)
+     FROM TASKS GROUP BY 1, 2, 3;""",
+    "DELETE FROM TASKS_OPEN_DUE;",
+    """INSERT INTO TASKS_OPEN_DUE (DUE_DATE, N)
+     SELECT DUE_DATE, COUNT(*) FROM TASKS
+     WHERE COMPLETE = 0 AND DELETED = 0 AND DUE_DATE IS NOT NULL GROUP BY DUE_DATE;""",
+)
+
+# Bulk loads stage their rows in a temporary table and copy them into TASKS
+# with one statement, which costs far less per row than an executemany into
+# a table with insert triggers. While TASKS_BULK_LOAD holds a row the insert
+# triggers of migration 8 skip each row and the load runs BULK_INSERTED
+# instead. The row is written and deleted inside the loading transaction, so
+# other connections never see it.
+BULK_STAGE = """CREATE TEMP TABLE IF NOT EXISTS TASKS_STAGE
+     (NAME, DESCRIPTION, START_DATE, DUE_DATE, PRIORITY, COMPLETE, DELETED);"""
+BULK_COPY = """INSERT INTO TASKS (NAME, DESCRIPTION, START_DATE, DUE_DATE, PRIORITY, COMPLETE, DELETED)
+     SELECT NAME, DESCRIPTION, START_DATE, DUE_DATE, PRIORITY, COMPLETE, DELETED
+     FROM temp.TASKS_STAGE ORDER BY rowid;"""
+
+# What the insert triggers do, set-wise for every row after ID ?
+BULK_INSERTED = (
+    """INSERT INTO TASKS_FTS (rowid, NAME, DESCRIPTION)
+     SELECT ID, NAME, DESCRIPTION FROM TASKS WHERE ID > ?;""",
+    """INSERT INTO TASKS_SUMMARY (PRIORITY, COMPLETE, DELETED, N)
+     SELECT IFNULL(PRIORITY, 0), IFNULL(COMPLETE, 0), IFNULL(DELETED, 0), COUNT(*)
+     FROM TASKS WHERE ID > ? GROUP BY 1, 2, 3
+     ON CONFLICT (PRIORITY, COMPLETE, DELETED) DO UPDATE SET N = N + excluded.N;""",
+    """INSERT INTO TASKS_OPEN_DUE (DUE_DATE, N)
+     SELECT DUE_DATE, COUNT(*) FROM TASKS WHERE ID > ?
+     AND COMPLETE = 0 AND DELETED = 0 AND DUE_DATE IS NOT NULL GROUP BY DUE_DATE
+     ON CONFLICT (DUE_DATE) DO UPDATE SET N = N + excluded.N;""",
+    "INSERT INTO TASKS_CHANGES (ID) SELECT ID FROM TASKS WHERE ID > ? ORDER BY ID;",
+)
+
+# Schema migrations; migration N brings a database to PRAGMA user_version N.
+# Append new steps, never edit released ones.
+MIGRATIONS: Tuple[Tuple[str, ...], ...] = (
+    # 1: base table (IF NOT EXISTS adopts databases created before versioning)
+    (
+        """CREATE TABLE IF NOT EXISTS TASKS
+         (ID INTEGER PRIMARY KEY AUTOINCREMENT,
+         NAME TEXT NOT NULL,
+         DESCRIPTION TEXT NOT NULL,
+         START_DATE DATE,
+         DUE_DATE DATE,
+         PRIORITY INT,
+         COMPLETE INT,
+         DELETED INT);""",
+    ),
+    # 2: one index per List.get access path
+    (
+        "CREATE INDEX IF NOT EXISTS IX_TASKS_PRIORITY ON TASKS (PRIORITY);",
+        "CREATE INDEX IF NOT EXISTS IX_TASKS_OPEN_DUE ON TASKS (DELETED, COMPLETE, DUE_DATE);",
+        "CREATE INDEX IF NOT EXISTS IX_TASKS_CLOSED_DUE ON TASKS (DUE_DATE) WHERE COMPLETE = 1;",
+    ),
+    # 3: dates were stored as 'YYYY-MM-DD HH:MM:SS'; keep only the ISO date
+    (
+        "UPDATE TASKS SET START_DATE = substr(START_DATE, 1, 10) WHERE length(START_DATE) > 10;",
+        "UPDATE TASKS SET DUE_DATE = substr(DUE_DATE, 1, 10) WHERE length(DUE_DATE) > 10;",
+    ),
+    # 4: FTS5 index over NAME and DESCRIPTION, kept in sync by triggers
+    (
+        """CREATE VIRTUAL TABLE IF NOT EXISTS TASKS_FTS USING fts5(
+         NAME, DESCRIPTION, content='TASKS', content_rowid='ID');""",
+        """CREATE TRIGGER IF NOT EXISTS TASKS_FTS_INSERT AFTER INSERT ON TASKS BEGIN
+         INSERT INTO TASKS_FTS (rowid, NAME, DESCRIPTION)
+         VALUES (new.ID, new.NAME, new.DESCRIPTION);
+         END;""",
+        """CREATE TRIGGER IF NOT EXISTS TASKS_FTS_DELETE AFTER DELETE ON TASKS BEGIN
+         INSERT INTO TASKS_FTS (TASKS_FTS, rowid, NAME, DESCRIPTION)
+         VALUES ('delete', old.ID, old.NAME, old.DESCRIPTION);
+         END;""",
+        """CREATE TRIGGER IF NOT EXISTS TASKS_FTS_UPDATE AFTER UPDATE OF NAME, DESCRIPTION ON TASKS BEGIN
+         INSERT INTO TASKS_FTS (TASKS_FTS, rowid, NAME, DESCRIPTION)
+         VALUES ('delete', old.ID, old.NAME, old.DESCRIPTION);
+         INSERT INTO TASKS_FTS (rowid, NAME, DESCRIPTION)
+         VALUES (new.ID, new.NAME, new.DESCRIPTION);
+         END;""",
+        "INSERT INTO TASKS_FTS (TASKS_FTS) VALUES ('rebuild');",
+    ),
+    # 5: covering index for the grouped scan behind todo report
+    (
+        "CREATE INDEX IF NOT EXISTS IX_TASKS_REPORT ON TASKS (DELETED, DUE_DATE, PRIORITY, COMPLETE);",
+    ),
+    # 6: counters behind todo summary, kept current by triggers: tasks per
+    # (priority, complete, deleted) and open tasks per due date
+    (
+        """CREATE TABLE IF NOT EXISTS TASKS_SUMMARY
+         (PRIORITY INT NOT NULL,
+         COMPLETE INT NOT NULL,
+         DELETED INT NOT NULL,
+         N INT NOT NULL,
+         PRIMARY KEY (PRIORITY, COMPLETE, DELETED)) WITHOUT ROWID;""",
+        """CREATE TABLE IF NOT EXISTS TASKS_OPEN_DUE
+         (DUE_DATE DATE NOT NULL PRIMARY KEY,
+         N INT NOT NULL) WITHOUT ROWID;""",
+        """CREATE TRIGGER IF NOT EXISTS TASKS_SUMMARY_INSERT AFTER INSERT ON TASKS BEGIN
+         INSERT INTO TASKS_SUMMARY (PRIORITY, COMPLETE, DELETED, N)
+         VALUES (IFNULL(new.PRIORITY, 0), IFNULL(new.COMPLETE, 0), IFNULL(new.DELETED, 0), 1)
+         ON CONFLICT (PRIORITY, COMPLETE, DELETED) DO UPDATE SET N = N + 1;
+         INSERT INTO TASKS_OPEN_DUE (DUE_DATE, N) SELECT new.DUE_DATE, 1
+         WHERE new.COMPLETE = 0 AND new.DELETED = 0 AND new.DUE_DATE IS NOT NULL
+         ON CONFLICT (DUE_DATE) DO UPDATE SET N = N + 1;
+         END;""",
+        """CREATE TRIGGER IF NOT EXISTS TASKS_SUMMARY_DELETE AFTER DELETE ON TASKS BEGIN
+         UPDATE TASKS_SUMMARY SET N = N - 1 WHERE PRIORITY = IFNULL(old.PRIORITY, 0)
+         AND COMPLETE = IFNULL(old.COMPLETE, 0) AND DELETED = IFNULL(old.DELETED, 0);
+         UPDATE TASKS_OPEN_DUE SET N = N - 1 WHERE DUE_DATE = old.DUE_DATE
+         AND old.COMPLETE = 0 AND old.DELETED = 0;
+         END;""",
+        """CREATE TRIGGER IF NOT EXISTS TASKS_SUMMARY_UPDATE
+         AFTER UPDATE OF PRIORITY, COMPLETE, DELETED, DUE_DATE ON TASKS
+         WHEN old.PRIORITY IS NOT new.PRIORITY OR old.COMPLETE IS NOT new.COMPLETE
+         OR old.DELETED IS NOT new.DELETED OR old.DUE_DATE IS NOT new.DUE_DATE BEGIN
+         UPDATE TASKS_SUMMARY SET N = N - 1 WHERE PRIORITY = IFNULL(old.PRIORITY, 0)
+         AND COMPLETE = IFNULL(old.COMPLETE, 0) AND DELETED = IFNULL(old.DELETED, 0);
+         INSERT INTO TASKS_SUMMARY (PRIORITY, COMPLETE, DELETED, N)
+         VALUES (IFNULL(new.PRIORITY, 0), IFNULL(new.COMPLETE, 0), IFNULL(new.DELETED, 0), 1)
+         ON CONFLICT (PRIORITY, COMPLETE, DELETED) DO UPDATE SET N = N + 1;
+         UPDATE TASKS_OPEN_DUE SET N = N - 1 WHERE DUE_DATE = old.DUE_DATE
+         AND old.COMPLETE = 0 AND old.DELETED = 0;
+         INSERT INTO TASKS_OPEN_DUE (DUE_DATE, N) SELECT new.DUE_DATE, 1
+         WHERE new.COMPLETE = 0 AND new.DELETED = 0 AND new.DUE_DATE IS NOT NULL
+         ON CONFLICT (DUE_DATE) DO UPDATE SET N = N + 1;
+         END;""",
+    ) + SUMMARY_REBUILD,
+    # 7: change log behind /tasks/changes, one row per write to a task in
+    # commit order, seeded with every existing task
+    (
+        """CREATE TABLE IF NOT EXISTS TASKS_CHANGES
+         (SEQ INTEGER PRIMARY KEY AUTOINCREMENT,
+         ID INT NOT NULL);""",
+        "CREATE INDEX IF NOT EXISTS IX_TASKS_CHANGES_ID ON TASKS_CHANGES (ID, SEQ);",
+        """CREATE TRIGGER IF NOT EXISTS TASKS_CHANGES_INSERT AFTER INSERT ON TASKS BEGIN
+         INSERT INTO TASKS_CHANGES (ID) VALUES (new.ID);
+         END;""",
+        """CREATE TRIGGER IF NOT EXISTS TASKS_CHANGES_DELETE AFTER DELETE ON TASKS BEGIN
+         INSERT INTO TASKS_CHANGES (ID) VALUES (old.ID);
+         END;""",
+        """CREATE TRIGGER IF NOT EXISTS TASKS_CHANGES_UPDATE AFTER UPDATE ON TASKS
+         WHEN old.NAME IS NOT new.NAME OR old.DESCRIPTION IS NOT new.DESCRIPTION
+         OR old.START_DATE IS NOT new.START_DATE OR old.DUE_DATE IS NOT new.DUE_DATE
+         OR old.PRIORITY IS NOT new.PRIORITY OR old.COMPLETE IS NOT new.COMPLETE
+         OR old.DELETED IS NOT new.DELETED BEGIN
+         INSERT INTO TASKS_CHANGES (ID) VALUES (new.ID);
+         END;""",
+        "INSERT INTO TASKS_CHANGES (ID) SELECT ID FROM TASKS ORDER BY ID;",
+    ),
+    # 8: the insert triggers stand aside while a bulk load holds a row in
+    # TASKS_BULK_LOAD (see BULK_STAGE)
+    (
+        "CREATE TABLE IF NOT EXISTS TASKS_BULK_LOAD (ACTIVE INTEGER PRIMARY KEY);",
+        "DROP TRIGGER IF EXISTS TASKS_FTS_INSERT;",
+        """CREATE TRIGGER TASKS_FTS_INSERT AFTER INSERT ON TASKS
+         WHEN NOT EXISTS (SELECT 1 FROM TASKS_BULK_LOAD) BEGIN
+         INSERT INTO TASKS_FTS (rowid, NAME, DESCRIPTION)
+         VALUES (new.ID, new.NAME, new.DESCRIPTION);
+         END;""",
+        "DROP TRIGGER IF EXISTS TASKS_SUMMARY_INSERT;",
+        """CREATE TRIGGER TASKS_SUMMARY_INSERT AFTER INSERT ON TASKS
+         WHEN NOT EXISTS (SELECT 1 FROM TASKS_BULK_LOAD) BEGIN
+         INSERT INTO TASKS_SUMMARY (PRIORITY, COMPLETE, DELETED, N)
+         VALUES (IFNULL(new.PRIORITY, 0), IFNULL(new.COMPLETE, 0), IFNULL(new.DELETED, 0), 1)
+         ON CONFLICT (PRIORITY, COMPLETE, DELETED) DO UPDATE SET N = N + 1;
+         INSERT INTO TASKS_OPEN_DUE (DUE_DATE, N) SELECT new.DUE_DATE, 1
+         WHERE new.COMPLETE = 0 AND new.DELETED = 0 AND new.DUE_DATE IS NOT NULL
+         ON CONFLICT (DUE_DATE) DO UPDATE SET N = N + 1;
+         END;""",
+        "DROP TRIGGER IF EXISTS TASKS_CHANGES_INSERT;",
+        """CREATE TRIGGER TASKS_CHANGES_INSERT AFTER INSERT ON TASKS
+         WHEN NOT EXISTS (SELECT 1 FROM TASKS_BULK_LOAD) BEGIN
+         INSERT INTO TASKS_CHANGES (ID) VALUES (new.ID);
+         END;""",
+    ),
+)
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
 
 def get_database_path(config_file: Path) -> Path:
     """Return the current path to the to-do database."""
@@ -18,28 +216,276 @@ def get_database_path(config_file: Path) -> Path:
     return Path(config_parser["General"]["database"])
 
 
+def migrate(conn: sqlite3.Connection) -> int:
+    """Bring a database up to SCHEMA_VERSION in place.
+
+    Pending migrations run in a single write transaction, so concurrent
+    callers serialize on the lock and a failed step leaves the database at
+    its previous version.
+
+    :param conn: connection in autocommit mode
+    :type conn: sqlite3.Connection
+    :return: the schema version the database started at
+    :rtype: int
+    """
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        # already current: do not queue every process behind the write lock
+        return SCHEMA_VERSION
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        current = conn.execute("PRAGMA user_version").fetchone()[0]
+        for version in range(current, SCHEMA_VERSION):
+            for statement in MIGRATIONS[version]:
+                conn.execute(statement)
+        if current < SCHEMA_VERSION:
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    if current < SCHEMA_VERSION:
+        conn.execute("PRAGMA optimize")
+    return current
+
+
 def init_database(db_path: Path) -> int:
-    """Create the to-do database."""
+    """Create the to-do database, or upgrade an existing one."""
     conn = None
     try:
-        conn = sqlite3.connect(db_path) # Empty to-do database
-        conn.execute("""CREATE TABLE TASKS
-         (ID INTEGER PRIMARY KEY AUTOINCREMENT,
-         NAME TEXT NOT NULL,
-         DESCRIPTION TEXT NOT NULL,
-         START_DATE DATE,
-         DUE_DATE DATE,
-         PRIORITY INT,
-         COMPLETE INT,
-         DELETED INT);""")
-        print('sqlite3.version') 
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        # only takes effect on a new, empty file; see archive.compact
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        migrate(conn)
         return SUCCESS
-    except OSError:
+    except (OSError, sqlite3.Error):
         return DB_WRITE_ERROR
     finally:
         if conn:
             conn.close()
 
-class DatabaseHandler(Resource):
+
+class DatabaseHandler():
+    """Pool of thread-local connections to one to-do database.
+
+    Each thread borrows a single long-lived connection that is opened and
+    configured (WAL journal, busy timeout, pragmas) the first time it is
+    needed, so callers never pay for connect/close per operation.
+    """
+
     def __init__(self, db_path: Path) -> None:
-        self._db_path = db_path
\ No newline at end of file
+        self._db_path = db_path
+        self._label = Path(db_path).name
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._migrated = False
+        self._generation = 0
+        self._changed_at = time.time()
+
+    @property
+    def db_path(self) -> Path:
+        return self._db_path
+
+    def _connect(self) -> sqlite3.Connection:
+        with metrics.CONNECT_SECONDS.time(self._label):
+            conn = self._open()
+        with self._lock:
+            if not self._migrated:
+                migrate(conn)
+                self._migrated = True
+            self._connections.append(conn)
+        return conn
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            f"{self._db_path}",
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=256,
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it if needed.
+
+        :return: connection owned by the current thread
+        :rtype: sqlite3.Connection
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.depth = 0
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run the enclosed block in a write transaction.
+
+        The outermost block takes the write lock up front (BEGIN IMMEDIATE)
+        and commits on exit; nested blocks become savepoints, so a failing
+        inner block only rolls back its own changes.
+
+        :raises sqlite3.OperationalError: when the database stays locked for
+            longer than BUSY_TIMEOUT_MS
+        :return: connection to execute statements on
+        :rtype: sqlite3.Connection
+        """
+        conn = self.connection()
+        depth = self._local.depth
+        if depth == 0:
+            with metrics.LOCK_WAIT_SECONDS.time(self._label):
+                _acquire_write_lock()
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                except BaseException:
+                    if _write_lock is not None:
+                        _write_lock.release()
+                    raise
+        else:
+            conn.execute(f"SAVEPOINT sp{depth}")
+        self._local.depth = depth + 1
+        try:
+            yield conn
+        except BaseException:
+            self._local.depth = depth
+            if depth == 0:
+                try:
+                    conn.execute("ROLLBACK")
+                finally:
+                    if _write_lock is not None:
+                        _write_lock.release()
+            else:
+                conn.execute(f"ROLLBACK TO sp{depth}")
+                conn.execute(f"RELEASE sp{depth}")
+            raise
+        self._local.depth = depth
+        if depth == 0:
+            try:
+                with metrics.COMMIT_SECONDS.time(self._label):
+                    conn.execute("COMMIT")
+            finally:
+                if _write_lock is not None:
+                    _write_lock.release()
+            self._bump()
+        else:
+            conn.execute(f"RELEASE sp{depth}")
+
+    def _bump(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._changed_at = time.time()
+
+    def generation(self) -> int:
+        """Return a counter that moves whenever the database may have changed.
+
+        Commits made through ``transaction`` bump it directly; commits from
+        other connections or processes are noticed through
+        ``PRAGMA data_version``, which only costs a look at the file header.
+
+        :return: the current data generation of this database
+        :rtype: int
+        """
+        conn = self.connection()
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if getattr(self._local, "data_version", None) != data_version:
+            self._local.data_version = data_version
+            self._bump()
+        return self._generation
+
+    @property
+    def changed_at(self) -> float:
+        """Epoch time of the last generation change."""
+        return self._changed_at
+
+    def close(self) -> None:
+        """Close every connection handed out by this pool."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+# Process-shared lock taken around every write transaction when several
+# server processes share the database, see ``set_write_lock``.
+_write_lock = None
+
+
+def set_write_lock(lock) -> None:
+    """Queue the write transactions of this process on a shared lock.
+
+    SQLite's busy handler retries a locked database after growing sleeps,
+    so under contention a writer can starve while others keep winning.
+    Server workers forked from one parent pass a process-shared lock here
+    so writers instead wait their turn on the lock, and the SQLite write
+    lock is then free when they reach it. Like the busy handler, a writer
+    gives up after BUSY_TIMEOUT_MS.
+
+    :param lock: object with ``acquire(timeout=...)``/``release``, or None
+        to stop
+    """
+    global _write_lock
+    _write_lock = lock
+
+
+def _acquire_write_lock() -> None:
+    # wait no longer than sqlite's busy handler would for the database
+    if _write_lock is not None and not _write_lock.acquire(timeout=BUSY_TIMEOUT_MS / 1000):
+        raise sqlite3.OperationalError("database is locked")
+
+
+@contextmanager
+def write_locked() -> Iterator[None]:
+    """Hold the shared write lock, if one is set, around the enclosed block.
+
+    For writes that cannot run in ``transaction``, such as VACUUM.
+
+    :raises sqlite3.OperationalError: when the lock is not free within
+        BUSY_TIMEOUT_MS
+    """
+    _acquire_write_lock()
+    try:
+        yield
+    finally:
+        if _write_lock is not None:
+            _write_lock.release()
+
+
+_handlers: Dict[str, DatabaseHandler] = {}
+_handlers_lock = threading.Lock()
+
+
+def get_handler(db_path: Path) -> DatabaseHandler:
+    """Return the shared connection pool for a database file.
+
+    :param db_path: path to the to-do database
+    :type db_path: Path
+    :return: the pool for that database, created on first use
+    :rtype: DatabaseHandler
+    """
+    # absolute paths seen before skip resolve(), which costs a few
+    # syscalls per call and shows in todo shell and todo run
+    handler = _handlers.get(str(db_path))
+    if handler is not None:
+        return handler
+    key = str(Path(db_path).resolve())
+    with _handlers_lock:
+        handler = _handlers.get(key)
+        if handler is None:
+            handler = _handlers[key] = DatabaseHandler(Path(db_path))
+        if Path(db_path).is_absolute():
+            _handlers[str(db_path)] = handler
+        return handler
+
+
+def close_all() -> None:
+    """Close every pooled connection in this process."""
+    with _handlers_lock:
+        handlers = {id(handler): handler for handler in _handlers.values()}
+        _handlers.clear()
+    for handler in handlers.values():
+        handler.close()
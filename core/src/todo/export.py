@@ -0,0 +1,232 @@
+import bz2
+import csv
+import gzip
+import io
+import lzma
+import sys
+from contextlib import nullcontext
+from itertools import islice
+from pathlib import Path
+from typing import IO, ContextManager, Iterable, Iterator, List, Optional, Sequence
+
+from todo.todo import row_encoder
+
+FORMATS = ("csv", "jsonl", "parquet", "feather")
+
+# Compression accepted per format; text formats are wrapped in a stream
+# compressor, columnar formats compress inside the file
+COMPRESSION = {
+    "csv": ("gzip", "bz2", "xz"),
+    "jsonl": ("gzip", "bz2", "xz"),
+    "parquet": ("snappy", "gzip", "brotli", "zstd", "lz4"),
+    "feather": ("lz4", "zstd"),
+}
+
+MIMETYPES = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+    "feather": "application/vnd.apache.arrow.file",
+}
+
+_OPENERS = {"gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+
+# Rows written per batch; one parquet row group or feather record batch each
+BATCH_ROWS = 65536
+
+
+def detect_format(path: Path) -> str:
+    """Guess the export format from a file suffix, ignoring ``.gz`` and the like."""
+    suffixes = [suffix.lower().lstrip(".") for suffix in path.suffixes]
+    if suffixes and suffixes[-1] in ("gz", "bz2", "xz"):
+        suffixes.pop()
+    suffix = suffixes[-1] if suffixes else ""
+    if suffix in ("jsonl", "ndjson", "json"):
+        return "jsonl"
+    if suffix in ("parquet", "pq"):
+        return "parquet"
+    if suffix in ("feather", "arrow"):
+        return "feather"
+    return "csv"
+
+
+def detect_compression(path: Path) -> Optional[str]:
+    """Guess stream compression from a ``.gz``/``.bz2``/``.xz`` suffix."""
+    return {".gz": "gzip", ".bz2": "bz2", ".xz": "xz"}.get(path.suffix.lower())
+
+
+def check(fmt: str, compression: Optional[str]) -> None:
+    """Reject an unknown format or a compression the format does not support.
+
+    :raises ValueError: for an unsupported combination
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown export format {fmt!r}")
+    if compression and compression not in COMPRESSION[fmt]:
+        raise ValueError(f"{fmt} supports compression {', '.join(COMPRESSION[fmt])}, "
+                         f"not {compression!r}")
+
+
+class _TextWriter():
+    """CSV or JSONL, optionally through a stream compressor."""
+
+    def __init__(self, file: IO[bytes], names: List[str], fmt: str, compression: Optional[str]) -> None:
+        self._raw = _OPENERS[compression](file, "wb") if compression else None
+        self._text = io.TextIOWrapper(self._raw or file, encoding="utf-8", newline="")
+        self._csv = csv.writer(self._text) if fmt == "csv" else None
+        self._encode = row_encoder(names)
+        if self._csv:
+            self._csv.writerow(names)
+
+    def write(self, batch: List[Sequence]) -> None:
+        if self._csv:
+            self._csv.writerows(batch)
+        else:
+            encode = self._encode
+            self._text.write("".join(encode(row) + "\n" for row in batch))
+        self._text.flush()
+
+    def close(self) -> None:
+        self._text.flush()
+        # closing the wrapper would close the caller's file as well
+        self._text.detach()
+        if self._raw:
+            self._raw.close()
+
+
+class _ColumnarWriter():
+    """Parquet or Feather (Arrow IPC), one record batch per write."""
+
+    def __init__(self, file: IO[bytes], names: List[str], fmt: str, compression: Optional[str]) -> None:
+        try:
+            import pyarrow as pa
+            import pyarrow.ipc
+            import pyarrow.parquet
+        except ImportError:
+            raise ValueError(f"{fmt} export needs pyarrow, install it with pip install pyarrow") from None
+        self._pa = pa
+        types = {"ID": pa.int64(), "PRIORITY": pa.int64(), "COMPLETE": pa.int64(),
+                 "DELETED": pa.int64(), "RANK": pa.float64()}
+        self._schema = pa.schema([(name, types.get(name, pa.string())) for name in names])
+        if fmt == "parquet":
+            self._writer = pyarrow.parquet.ParquetWriter(file, self._schema,
+                                                         compression=compression or "snappy")
+        else:
+            options = pyarrow.ipc.IpcWriteOptions(compression=compression)
+            self._writer = pyarrow.ipc.new_file(file, self._schema, options=options)
+
+    def write(self, batch: List[Sequence]) -> None:
+        columns = zip(*batch)
+        arrays = [self._pa.array(values, type=field.type)
+                  for field, values in zip(self._schema, columns)]
+        self._writer.write_table(self._pa.Table.from_arrays(arrays, schema=self._schema))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+def _open_writer(file: IO[bytes], names: List[str], fmt: str, compression: Optional[str]):
+    check(fmt, compression)
+    if fmt in ("parquet", "feather"):
+        return _ColumnarWriter(file, names, fmt, compression)
+    return _TextWriter(file, names, fmt, compression)
+
+
+def _batches(rows: Iterable[Sequence], size: int) -> Iterator[List[Sequence]]:
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def write(rows: Iterable[Sequence], names: List[str], file: IO[bytes], fmt: str,
+          compression: Optional[str] = None) -> int:
+    """Write rows to a binary file in constant memory.
+
+    Rows are consumed ``BATCH_ROWS`` at a time, so memory use depends on
+    the batch size and not on the number of rows.
+
+    :param rows: the rows, e.g. a streaming cursor
+    :type rows: Iterable[Sequence]
+    :param names: column names
+    :type names: List[str]
+    :param file: binary file or stream to write to
+    :type file: IO[bytes]
+    :param fmt: one of FORMATS
+    :type fmt: str
+    :param compression: one of ``COMPRESSION[fmt]``, defaults to none
+    :type compression: str, optional
+    :raises ValueError: for an unsupported format or compression
+    :return: number of rows written
+    :rtype: int
+    """
+    writer = _open_writer(file, names, fmt, compression)
+    count = 0
+    try:
+        for batch in _batches(rows, BATCH_ROWS):
+            writer.write(batch)
+            count += len(batch)
+    finally:
+        writer.close()
+    return count
+
+
+def open_output(path: Path) -> ContextManager[IO[bytes]]:
+    """Open ``path`` for a binary export, ``-`` meaning standard output."""
+    if str(path) == "-":
+        return nullcontext(sys.stdout.buffer)
+    return open(path, "wb")
+
+
+class _Spool(io.RawIOBase):
+    """Write-only file whose contents are taken out piecewise by ``drain``."""
+
+    def __init__(self) -> None:
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def stream(rows: Iterable[Sequence], names: List[str], fmt: str,
+           compression: Optional[str] = None, batch_rows: int = BATCH_ROWS) -> Iterator[bytes]:
+    """Produce an export incrementally, e.g. as an HTTP response body.
+
+    The format and compression are checked before the first chunk.
+
+    :raises ValueError: for an unsupported format or compression
+    :return: the file contents, one chunk per batch of rows
+    :rtype: Iterator[bytes]
+    """
+    spool = _Spool()
+    writer = _open_writer(spool, names, fmt, compression)
+
+    def chunks() -> Iterator[bytes]:
+        try:
+            for batch in _batches(rows, batch_rows):
+                writer.write(batch)
+                data = spool.drain()
+                if data:
+                    yield data
+        finally:
+            writer.close()
+        yield spool.drain()
+
+    return chunks()
@@ -0,0 +1,167 @@
+import csv
+import json
+import sys
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+FORMATS = ("csv", "jsonl")
+
+
+def detect_format(path: Path) -> str:
+    """Guess the import format from a file suffix."""
+    suffix = path.suffix.lower().lstrip(".")
+    if suffix in ("jsonl", "ndjson", "json"):
+        return "jsonl"
+    return "csv"
+
+
+def read_rows(path: Path, fmt: Optional[str] = None) -> Iterator[Tuple[int, dict]]:
+    """Stream raw rows from a CSV or JSONL file.
+
+    :param path: file to read, ``-`` reads standard input
+    :type path: Path
+    :param fmt: ``csv`` or ``jsonl``, defaults to a guess from the suffix
+    :type fmt: str, optional
+    :return: (line number, row) pairs
+    :rtype: Iterator[Tuple[int, dict]]
+    """
+    fmt = fmt or detect_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown import format {fmt!r}")
+    file = sys.stdin if str(path) == "-" else open(path, newline="", encoding="utf-8")
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(file)
+            for row in reader:
+                yield reader.line_num, {k.strip().lower(): v for k, v in row.items() if k}
+        else:
+            for line_num, line in enumerate(file, 1):
+                if line.strip():
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError as error:
+                        raise ValueError(f"line {line_num}: {error.msg}") from None
+                    if not isinstance(row, dict):
+                        raise ValueError(f"line {line_num}: expected a JSON object")
+                    yield line_num, {k.lower(): v for k, v in row.items()}
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+
+def _flag(row: dict, field: str, default: int, low: int, high: int) -> int:
+    value = row.get(field)
+    if value in (None, ""):
+        return default
+    value = int(value)
+    if not low <= value <= high:
+        raise ValueError(f"{field} must be between {low} and {high}")
+    return value
+
+
+@lru_cache(maxsize=4096)
+def _check_date(value: str) -> str:
+    datetime.strptime(value, "%Y-%m-%d")
+    return value
+
+
+def _date(row: dict, field: str, default: str) -> str:
+    value = row.get(field)
+    if value in (None, ""):
+        return default
+    return _check_date(str(value))
+
+
+def validate_row(row: dict, default_date: str) -> dict:
+    """Check one raw row and fill in the optional fields.
+
+    :param row: raw row keyed by lower-case field name
+    :type row: dict
+    :param default_date: date used for missing start/due dates
+    :type default_date: str
+    :raises ValueError: when a mandatory field is missing or a value is invalid
+    :return: keyword arguments for ``Todoer.add``
+    :rtype: dict
+    """
+    for field in ("name", "description"):
+        if not str(row.get(field) or "").strip():
+            raise ValueError(f"{field} is mandatory")
+    return {
+        "name": str(row["name"]),
+        "description": str(row["description"]),
+        "start_date": _date(row, "start_date", default_date),
+        "due_date": _date(row, "due_date", default_date),
+        "priority": _flag(row, "priority", 2, 1, 3),
+        "complete": _flag(row, "complete", 0, 0, 1),
+        "deleted": _flag(row, "deleted", 0, 0, 1),
+    }
+
+
+# field -> TASKS column of the fields a partial update may set
+CHANGEABLE = {
+    "name": "NAME",
+    "description": "DESCRIPTION",
+    "start_date": "START_DATE",
+    "due_date": "DUE_DATE",
+    "priority": "PRIORITY",
+    "complete": "COMPLETE",
+    "deleted": "DELETED",
+}
+
+
+def validate_changes(row: dict) -> dict:
+    """Check a partial update of one to-do, e.g. a PATCH body.
+
+    :param row: new values keyed by lower-case field name, see CHANGEABLE
+    :type row: dict
+    :raises ValueError: for no or unknown fields and invalid values
+    :return: new values keyed by TASKS column, for ``Todoer.update``
+    :rtype: dict
+    """
+    unknown = sorted(set(row) - set(CHANGEABLE))
+    if unknown:
+        raise ValueError(f"unknown field {unknown[0]!r}")
+    if not row:
+        raise ValueError("nothing to change")
+    changes = {}
+    for field, value in row.items():
+        if field in ("name", "description"):
+            if not str(value or "").strip():
+                raise ValueError(f"{field} is mandatory")
+            value = str(value)
+        elif field in ("start_date", "due_date"):
+            value = _check_date(str(value))
+        else:
+            low, high = (1, 3) if field == "priority" else (0, 1)
+            value = _flag(row, field, None, low, high)
+            if value is None:
+                raise ValueError(f"{field} must be between {low} and {high}")
+        changes[CHANGEABLE[field]] = value
+    return changes
+
+
+def validated(rows: Iterator[Tuple[int, dict]], default_date: str,
+              errors: Optional[list] = None) -> Iterator[dict]:
+    """Validate a row stream lazily.
+
+    :param rows: (line number, row) pairs from ``read_rows``
+    :type rows: Iterator[Tuple[int, dict]]
+    :param default_date: date used for missing start/due dates
+    :type default_date: str
+    :param errors: when given, invalid rows are skipped and their messages
+        appended here instead of raising
+    :type errors: list, optional
+    :raises ValueError: on the first invalid row when ``errors`` is None
+    :return: valid rows ready for ``Todoer.add_many``
+    :rtype: Iterator[dict]
+    """
+    for line_num, row in rows:
+        try:
+            yield validate_row(row, default_date)
+        except (TypeError, ValueError) as error:
+            message = f"line {line_num}: {error}"
+            if errors is None:
+                raise ValueError(message) from None
+            errors.append(message)
@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Tuple
+
+# Off unless a server enables it or TODO_METRICS=1; when off every probe is a
+# single attribute check returning a shared no-op context manager.
+enabled = os.environ.get("TODO_METRICS", "") not in ("", "0")
+
+_NOOP = nullcontext()
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+
+
+class Histogram():
+    """Cumulative histogram with one series per label value."""
+
+    def __init__(self, name: str, help: str, label: str, buckets: Tuple[float, ...]) -> None:
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = buckets
+        self._series: Dict[str, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label: str, value: float) -> None:
+        with self._lock:
+            series = self._series.get(label)
+            if series is None:
+                # per-bucket counts (last one is +Inf), sum, count
+                series = self._series[label] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, label: str):
+        """Context manager observing the duration of its block in seconds."""
+        if not enabled:
+            return _NOOP
+        return self._timer(label)
+
+    @contextmanager
+    def _timer(self, label: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(label, time.perf_counter() - started)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = {label: (list(counts), total, count)
+                      for label, (counts, total, count) in self._series.items()}
+        for label, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f'{self.name}_bucket{{{self.label}="{label}",le="{le}"}} {cumulative}'
+            yield f'{self.name}_sum{{{self.label}="{label}"}} {total!r}'
+            yield f'{self.name}_count{{{self.label}="{label}"}} {count}'
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+QUERY_SECONDS = Histogram("todo_query_seconds", "Time to execute a database statement.",
+                          "query", LATENCY_BUCKETS)
+QUERY_ROWS = Histogram("todo_query_rows", "Rows returned or changed by a statement.",
+                       "query", ROW_BUCKETS)
+CONNECT_SECONDS = Histogram("todo_connect_seconds", "Time to open and configure a pooled connection.",
+                            "database", LATENCY_BUCKETS)
+LOCK_WAIT_SECONDS = Histogram("todo_lock_wait_seconds", "Time waiting for the database write lock.",
+                              "database", LATENCY_BUCKETS)
+COMMIT_SECONDS = Histogram("todo_commit_seconds", "Time to commit a write transaction.",
+                           "database", LATENCY_BUCKETS)
+
+COMMIT_BATCH = Histogram("todo_commit_batch_size", "Writes committed together by the write queue.",
+                         "database", (1, 2, 4, 8, 16, 32, 64, 128, 256, 512))
+WRITE_SECONDS = Histogram("todo_write_seconds", "Time from queueing a write to its commit.",
+                          "database", LATENCY_BUCKETS)
+
+HISTOGRAMS = (QUERY_SECONDS, QUERY_ROWS, CONNECT_SECONDS, LOCK_WAIT_SECONDS, COMMIT_SECONDS,
+              COMMIT_BATCH, WRITE_SECONDS)
+
+
+def observe_rows(label: str, rows: int) -> None:
+    if enabled:
+        QUERY_ROWS.observe(label, rows)
+
+
+def render() -> str:
+    """Return every metric in the Prometheus text exposition format."""
+    return "\n".join(line for histogram in HISTOGRAMS for line in histogram.render()) + "\n"
+
+
+def reset() -> None:
+    for histogram in HISTOGRAMS:
+        histogram.reset()
+
+
+def summarize(text: str) -> List[Tuple[str, str, int, float, float]]:
+    """Condense Prometheus histogram text into one row per series.
+
+    :param text: output of ``render``, e.g. fetched from ``/metrics``
+    :type text: str
+    :return: (metric, label, count, mean, estimated p95) per series
+    :rtype: List[Tuple[str, str, int, float, float]]
+    """
+    series: Dict[Tuple[str, str], Dict] = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        sample, value = line.rsplit(" ", 1)
+        name, _, labels = sample.partition("{")
+        fields = dict(part.split("=", 1) for part in labels.rstrip("}").split(",") if part)
+        le = fields.pop("le", None)
+        label = next(iter(fields.values()), '""').strip('"')
+        for suffix in ("_bucket", "_sum", "_count"):
+            if name.endswith(suffix):
+                entry = series.setdefault((name[:-len(suffix)], label), {"buckets": []})
+                if suffix == "_bucket":
+                    entry["buckets"].append((float(le.strip('"')), int(float(value))))
+                else:
+                    entry[suffix] = float(value)
+                break
+    rows = []
+    for (name, label), entry in sorted(series.items()):
+        count = int(entry.get("_count", 0))
+        if not count:
+            continue
+        p95 = next((bound for bound, cumulative in entry["buckets"]
+                    if cumulative >= 0.95 * count), float("inf"))
+        rows.append((name, label, count, entry.get("_sum", 0.0) / count, p95))
+    return rows
@@ -0,0 +1,310 @@
+import re
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+
+@lru_cache(maxsize=4096)
+def to_date(s: str) -> str:
+    """Validate a YYYY-MM-DD string and return it in storage form.
+
+    Dates are stored as ISO-8601 text, which sorts chronologically, so range
+    predicates on the raw column can use an index.
+    """
+    return datetime.strptime(s, '%Y-%m-%d').date().isoformat()
+
+
+def relative_date(s: str) -> str:
+    """Like ``to_date`` but also accept ``today``, ``today+7`` or ``today-30``."""
+    match = re.fullmatch(r"today(?:([+-])(\d+))?", s.strip().lower())
+    if not match:
+        return to_date(s)
+    days = int(match.group(2) or 0) * (-1 if match.group(1) == "-" else 1)
+    return (date.today() + timedelta(days=days)).isoformat()
+
+
+class Predicate(NamedTuple):
+    """A parameterized SQL condition on TASKS."""
+    sql: str
+    params: tuple = ()
+
+
+# name in filter expressions -> (column, value parser)
+FIELDS: Dict[str, Tuple[str, Callable]] = {
+    "id": ("ID", int),
+    "name": ("NAME", str),
+    "description": ("DESCRIPTION", str),
+    "start": ("START_DATE", relative_date),
+    "due": ("DUE_DATE", relative_date),
+    "priority": ("PRIORITY", int),
+    "done": ("COMPLETE", int),
+    "deleted": ("DELETED", int),
+}
+
+FLAGS: Dict[str, str] = {
+    "done": "COMPLETE = 1",
+    "open": "COMPLETE = 0 AND DELETED = 0",
+    "deleted": "DELETED = 1",
+    "live": "DELETED = 0",
+}
+
+# columns declared NOT NULL, which need no NULL branch when seeking
+NOT_NULL = frozenset({"ID", "NAME", "DESCRIPTION"})
+
+_COMPARISON = re.compile(r"^(\w+)\s*(<=|>=|!=|=|<|>|~)\s*(.*)$")
+# a quoted value, skipped over, or an "and" joining two clauses
+_CLAUSE_SPLIT = re.compile(r"""("[^"]*"|'[^']*')|\s+and\s+""", re.IGNORECASE)
+
+
+def _clauses(text: str) -> List[str]:
+    """Split a filter expression on ``and``, except inside quoted values."""
+    clauses, start = [], 0
+    for match in _CLAUSE_SPLIT.finditer(text):
+        if match.group(1) is None:
+            clauses.append(text[start:match.start()])
+            start = match.end()
+    clauses.append(text[start:])
+    return clauses
+
+
+def parse_where(text: str) -> Predicate:
+    """Compile a filter expression into a parameterized predicate.
+
+    An expression is clauses joined by ``and``. A clause is a flag
+    (``done``, ``open``, ``deleted``, ``live``, optionally preceded by
+    ``not``) or a comparison ``field op value`` with a field from FIELDS and
+    op one of ``= != < <= > >=``, or ``~`` for "name contains". Values may
+    be quoted, and ``and`` inside quotes is part of the value. Dates may
+    be given relative to today. Example::
+
+        due<=today+7 and open and priority>=2 and name~"salt and pepper"
+
+    :param text: the filter expression
+    :type text: str
+    :raises ValueError: for an unknown field, operator or invalid value
+    :return: the predicate
+    :rtype: Predicate
+    """
+    clauses, params = [], []
+    for clause in _clauses(text.strip()):
+        clause = clause.strip()
+        negate = clause.lower().startswith("not ")
+        flag = clause[4:].strip().lower() if negate else clause.lower()
+        if flag in FLAGS:
+            clauses.append(f"NOT ({FLAGS[flag]})" if negate else f"({FLAGS[flag]})")
+            continue
+        match = _COMPARISON.match(clause)
+        if not match or match.group(1).lower() not in FIELDS:
+            raise ValueError(f"cannot understand filter {clause!r}")
+        field, op, value = match.group(1).lower(), match.group(2), match.group(3).strip()
+        if len(value) > 1 and value[0] == value[-1] and value[0] in "'\"":
+            value = value[1:-1]
+        column, parse = FIELDS[field]
+        if op == "~":
+            if parse is not str:
+                raise ValueError(f"~ only applies to text fields, not {field!r}")
+            clauses.append(f"{column} LIKE ? ESCAPE '\\'")
+            value = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append("%" + value + "%")
+            continue
+        try:
+            params.append(parse(value))
+        except ValueError:
+            raise ValueError(f"invalid value {value!r} for {field!r}") from None
+        clauses.append(f"{column} {op} ?")
+    return Predicate(" AND ".join(clauses), tuple(params))
+
+
+def parse_ids(items: Iterable) -> List[Tuple[int, int]]:
+    """Turn IDs and inclusive ranges such as ``5-40`` into (low, high) spans.
+
+    :param items: ints or strings like ``"7"`` and ``"5-40"``
+    :type items: Iterable
+    :raises ValueError: for anything that is not an ID or a range
+    :return: spans suitable for ``ID BETWEEN ? AND ?``
+    :rtype: List[Tuple[int, int]]
+    """
+    spans = []
+    for item in items:
+        low, _, high = str(item).strip().partition("-")
+        try:
+            low, high = int(low), int(high or low)
+        except ValueError:
+            raise ValueError(f"invalid to-do id {item!r}") from None
+        if low > high:
+            low, high = high, low
+        spans.append((low, high))
+    return spans
+
+
+def parse_sort(text: str) -> Tuple[Tuple[str, str], ...]:
+    """Parse sort keys such as ``"-priority,due"`` (``-`` for descending).
+
+    :raises ValueError: for an unknown field
+    :return: (column, direction) pairs
+    :rtype: Tuple[Tuple[str, str], ...]
+    """
+    order = []
+    for key in text.split(","):
+        key = key.strip()
+        descending = key.startswith("-")
+        field = key.lstrip("+-").lower()
+        if field not in FIELDS:
+            raise ValueError(f"cannot sort by {key!r}")
+        order.append((FIELDS[field][0], "DESC" if descending else "ASC"))
+    return tuple(order)
+
+
+def parse_fields(text: str) -> Tuple[str, ...]:
+    """Parse a projection such as ``"id,name,due"`` into column names.
+
+    :raises ValueError: for an unknown field
+    """
+    columns = []
+    for field in text.split(","):
+        field = field.strip().lower()
+        if field not in FIELDS:
+            raise ValueError(f"unknown field {field!r}")
+        columns.append(FIELDS[field][0])
+    return tuple(columns)
+
+
+@lru_cache(maxsize=256)
+def _statement(source: str, clauses: Tuple[str, ...], columns: Tuple[str, ...],
+               order: Tuple[Tuple[str, str], ...], limited: bool) -> str:
+    """Assemble the SQL text for one query shape.
+
+    Values never appear in the text, so every execution of a shape reuses
+    both this string and sqlite's prepared statement for it.
+    """
+    sql = f"SELECT {', '.join(columns) if columns else '*'} FROM {source}"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY " + ", ".join(f"{column} {direction}" for column, direction in order)
+    if limited:
+        sql += " LIMIT ?"
+    return sql
+
+
+def _seek(order: Tuple[Tuple[str, str], ...], values: list) -> Predicate:
+    """Condition selecting the rows sorted strictly after ``values``.
+
+    SQLite sorts NULL before every value, so NULLs come first in an
+    ascending key and last in a descending one.
+    """
+    directions = {direction for _, direction in order}
+    nullable = [column for column, _ in order if column not in NOT_NULL]
+    if len(directions) == 1 and None not in values and (directions == {"ASC"} or not nullable):
+        # a single row-value comparison can be answered with an index seek;
+        # rows with a NULL key sort before the cursor, where it skips them
+        operator = "<" if directions == {"DESC"} else ">"
+        keys = ", ".join(column for column, _ in order)
+        return Predicate(f"({keys}) {operator} ({', '.join('?' * len(order))})", tuple(values))
+    branches, params = [], []
+    for i, (column, direction) in enumerate(order):
+        value = values[i]
+        if direction == "DESC" and value is None:
+            continue  # nothing sorts after NULL in a descending key
+        terms, branch_params = [], []
+        for (key, _), earlier in zip(order[:i], values[:i]):
+            if earlier is None:
+                terms.append(f"{key} IS NULL")
+            else:
+                terms.append(f"{key} = ?")
+                branch_params.append(earlier)
+        if value is None:
+            terms.append(f"{column} IS NOT NULL")
+        elif direction == "ASC":
+            terms.append(f"{column} > ?")
+            branch_params.append(value)
+        elif column in NOT_NULL:
+            terms.append(f"{column} < ?")
+            branch_params.append(value)
+        else:
+            terms.append(f"({column} < ? OR {column} IS NULL)")
+            branch_params.append(value)
+        branches.append("(" + " AND ".join(terms) + ")")
+        params.extend(branch_params)
+    if not branches:
+        return Predicate("0")
+    return Predicate("(" + " OR ".join(branches) + ")", tuple(params))
+
+
+class Query(NamedTuple):
+    """A composable, parameterized SELECT over TASKS.
+
+    Builder methods return new queries, so a preset can be refined without
+    being changed::
+
+        Query().filter("open and priority=3").filter("due<=today+7").order_by("due")
+
+    ``compile`` always appends ID to the sort key, which makes the order
+    total and lets pages resume with a keyset seek.
+    """
+    where: Tuple[Predicate, ...] = ()
+    order: Tuple[Tuple[str, str], ...] = ()
+    columns: Tuple[str, ...] = ()
+    limit: Optional[int] = None
+    source: Predicate = Predicate("TASKS")
+    label: str = "query"
+
+    def filter(self, where: Union[str, Predicate]) -> "Query":
+        """Add a condition, given as a filter expression or a Predicate."""
+        if isinstance(where, str):
+            where = parse_where(where)
+        return self._replace(where=self.where + (where,))
+
+    def order_by(self, sort: Union[str, Tuple[Tuple[str, str], ...]]) -> "Query":
+        """Replace the sort key, given as ``"-priority,due"`` or pairs."""
+        if isinstance(sort, str):
+            sort = parse_sort(sort)
+        return self._replace(order=tuple(sort))
+
+    def select(self, fields: Union[str, Tuple[str, ...]]) -> "Query":
+        """Restrict the columns returned, given as ``"id,name"`` or column names."""
+        if isinstance(fields, str):
+            fields = parse_fields(fields)
+        return self._replace(columns=tuple(fields))
+
+    def take(self, limit: Optional[int]) -> "Query":
+        """Return at most ``limit`` rows per page (None for all)."""
+        if limit is not None and limit < 1:
+            raise ValueError("limit must be at least 1")
+        return self._replace(limit=limit)
+
+    @property
+    def keys(self) -> Tuple[Tuple[str, str], ...]:
+        """The full sort key: the requested order followed by ID."""
+        if any(column == "ID" for column, _ in self.order):
+            return self.order
+        return self.order + (("ID", self.order[-1][1] if self.order else "ASC"),)
+
+    def compile(self, after: list = None) -> Tuple[str, tuple]:
+        """Return the SQL and parameters for the page after sort key ``after``.
+
+        Sort key columns missing from a projection are appended to it so the
+        next page cursor can be taken from the last row. One row more than
+        ``limit`` is requested to tell whether another page follows.
+
+        :param after: sort key values of the last row of the previous page
+        :type after: list, optional
+        :raises ValueError: when ``after`` does not match the sort key
+        :return: the statement and its parameters
+        :rtype: Tuple[str, tuple]
+        """
+        keys = self.keys
+        clauses = tuple(predicate.sql for predicate in self.where)
+        params = self.source.params + tuple(value for predicate in self.where
+                                            for value in predicate.params)
+        if after is not None:
+            if len(after) != len(keys):
+                raise ValueError("cursor does not match the sort order")
+            seek = _seek(keys, after)
+            clauses += (seek.sql,)
+            params += seek.params
+        columns = self.columns
+        if columns:
+            columns += tuple(column for column, _ in keys if column not in columns)
+        if self.limit is not None:
+            params += (self.limit + 1,)
+        return _statement(self.source.sql, clauses, columns, keys, self.limit is not None), params
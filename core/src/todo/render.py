@@ -0,0 +1,114 @@
+import shutil
+import sys
+from itertools import chain, islice
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+import click
+import typer
+
+# Column headings for the TASKS columns; anything else is shown as named
+HEADINGS = {
+    "LIST": "List",
+    "ID": "ID.",
+    "NAME": "Name",
+    "DESCRIPTION": "Description",
+    "START_DATE": "Start Date",
+    "DUE_DATE": "Due Date",
+    "PRIORITY": "Priority",
+    "COMPLETE": "Done",
+    "DELETED": "Deleted",
+    "RANK": "Rank",
+}
+
+# Rows inspected to size the columns before anything is written
+SAMPLE_ROWS = 200
+# Rows formatted into one string per write
+BLOCK_ROWS = 1000
+# Longer values are cut to this width
+MAX_WIDTH = 40
+
+
+def table(rows: Iterable[Sequence], names: Sequence[str], sample: int = SAMPLE_ROWS,
+          max_width: int = MAX_WIDTH) -> Iterator[str]:
+    """Format rows as an aligned text table, a block of lines at a time.
+
+    Column widths come from the headings and the first ``sample`` rows, so
+    the rows are consumed lazily and output starts before the query is
+    exhausted. Text wider than its column is cut. Only the first
+    ``len(names)`` values of each row are shown.
+
+    :param rows: the rows, e.g. a streaming cursor
+    :type rows: Iterable[Sequence]
+    :param names: column names, see HEADINGS
+    :type names: Sequence[str]
+    :param sample: rows used to size the columns, defaults to SAMPLE_ROWS
+    :type sample: int, optional
+    :param max_width: widest column allowed, defaults to MAX_WIDTH
+    :type max_width: int, optional
+    :return: chunks of the table, each ending in a newline
+    :rtype: Iterator[str]
+    """
+    rows = iter(rows)
+    head = list(islice(rows, sample))
+    headings = [HEADINGS.get(name, name) for name in names]
+    widths = [len(heading) for heading in headings]
+    for row in head:
+        for i, value in enumerate(row[:len(names)]):
+            widths[i] = max(widths[i], len(str(value)))
+    widths = [min(width, max_width) for width in widths]
+    # text is cut to the column; numbers are never cut, a later and longer
+    # one just pushes the rest of its line to the right
+    numeric = ([isinstance(value, (int, float)) for value in head[0][:len(names)]]
+               if head else [False] * len(names))
+    cells = [f"{{:<{width}}}" if number else f"{{:<{width}.{width}}}"
+             for width, number in zip(widths, numeric)]
+    # the last column is not padded
+    cells[-1] = "{}" if numeric[-1] else f"{{:.{widths[-1]}}}"
+    line = " | ".join(cells) + "\n"
+    header = line.format(*headings)
+    yield header + "-" * (len(header) - 1) + "\n"
+    count = len(names)
+    for block in _blocks(chain(head, rows), BLOCK_ROWS):
+        yield "".join(line.format(*map(str, row[:count])) for row in block)
+
+
+def _blocks(rows: Iterator[Sequence], size: int) -> Iterator[List[Sequence]]:
+    while True:
+        block = list(islice(rows, size))
+        if not block:
+            return
+        yield block
+
+
+def write(chunks: Iterable[str], pager: Optional[bool] = None, color: str = typer.colors.BLUE) -> None:
+    """Write table chunks to the terminal, through a pager if it is long.
+
+    :param chunks: output of ``table``
+    :type chunks: Iterable[str]
+    :param pager: force the pager on or off; by default it is used when
+        stdout is a terminal and the table is taller than it
+    :type pager: bool, optional
+    :param color: foreground color of the table
+    :type color: str, optional
+    """
+    chunks = iter(chunks)
+    if pager is None:
+        pager = sys.stdout.isatty()
+        if pager:
+            # look ahead until the table is known to overflow the screen
+            height = shutil.get_terminal_size().lines
+            seen, lines = [], 0
+            for chunk in chunks:
+                seen.append(chunk)
+                lines += chunk.count("\n")
+                if lines >= height:
+                    break
+            else:
+                pager = False
+            chunks = chain(seen, chunks)
+    styled = (typer.style(chunk, fg=color) for chunk in chunks)
+    if pager:
+        click.echo_via_pager(styled)
+    else:
+        for chunk in styled:
+            typer.echo(chunk, nl=False)
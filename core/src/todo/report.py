@@ -0,0 +1,140 @@
+# pandas and NumPy are only imported here; the CLI and the API load this
+# module lazily so that the everyday commands do not pay for them.
+import sqlite3
+from datetime import date
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+# SQLite collapses the live tasks into one row per (due date, priority,
+# state) using the covering IX_TASKS_REPORT index; everything else is
+# computed on those counts.
+AGGREGATE = ("SELECT DUE_DATE, PRIORITY, COMPLETE, COUNT(*) AS N FROM TASKS "
+             "WHERE DELETED = 0 GROUP BY DUE_DATE, PRIORITY, COMPLETE")
+
+CHUNK_ROWS = 50000
+
+# Upper bounds in days of the overdue aging buckets; the last is open ended
+AGING_BOUNDS = (7, 30, 90)
+AGING_LABELS = ("1-7", "8-30", "31-90", "90+")
+
+
+def load(conn: sqlite3.Connection) -> pd.DataFrame:
+    """Read the grouped task counts in chunks.
+
+    :return: columns due (datetime64, NaT when missing), priority,
+        complete and n
+    :rtype: pd.DataFrame
+    """
+    chunks = pd.read_sql_query(AGGREGATE, conn, chunksize=CHUNK_ROWS)
+    frame = pd.concat(list(chunks), ignore_index=True)
+    return pd.DataFrame({
+        "due": pd.to_datetime(frame["DUE_DATE"], format="%Y-%m-%d", errors="coerce"),
+        "priority": frame["PRIORITY"].fillna(0).astype(np.int64),
+        "complete": frame["COMPLETE"].fillna(0).astype(np.int64) == 1,
+        "n": frame["N"].astype(np.int64),
+    })
+
+
+def _rate(done: int, total: int) -> float:
+    return round(float(done) / float(total), 4) if total else 0.0
+
+
+def build(frame: pd.DataFrame, today: date, weeks: int = 12) -> Dict[str, object]:
+    """Compute the report from the counts returned by ``load``.
+
+    Throughput and burndown are bucketed by the Monday-based week of the
+    due date, as tasks do not record when they were completed. Burndown
+    shows the scope due and the part of it completed, cumulative up to each
+    of the last ``weeks`` weeks.
+
+    :param frame: output of ``load``
+    :type frame: pd.DataFrame
+    :param today: reference date for overdue aging and the week window
+    :type today: date
+    :param weeks: number of weeks of throughput and burndown, defaults to 12
+    :type weeks: int, optional
+    :return: JSON-serializable report sections
+    :rtype: Dict[str, object]
+    """
+    n = frame["n"].to_numpy()
+    complete = frame["complete"].to_numpy()
+    done_n = np.where(complete, n, 0)
+    today64 = np.datetime64(today, "D")
+    due = frame["due"].to_numpy().astype("datetime64[D]")
+    has_due = ~np.isnat(due)
+
+    overdue = has_due & ~complete & (due < today64)
+    age = (today64 - due[overdue]).astype(np.int64)
+    aging = np.bincount(np.searchsorted(AGING_BOUNDS, age, side="left"),
+                        weights=n[overdue], minlength=len(AGING_LABELS))
+
+    total, done = int(n.sum()), int(done_n.sum())
+    summary = {
+        "tasks": total,
+        "complete": done,
+        "open": total - done,
+        "completion_rate": _rate(done, total),
+        "overdue": int(n[overdue].sum()),
+    }
+
+    by_priority = (pd.DataFrame({"priority": frame["priority"], "tasks": n, "complete": done_n})
+                   .groupby("priority", sort=True).sum())
+    priority = [{"priority": int(p), "tasks": int(row.tasks), "complete": int(row.complete),
+                 "completion_rate": _rate(row.complete, row.tasks)}
+                for p, row in by_priority.iterrows()]
+
+    # Monday of the week of each due date; 1970-01-01 was a Thursday
+    week = due[has_due] - ((due[has_due].astype(np.int64) + 3) % 7).astype("timedelta64[D]")
+    this_week = today64 - np.timedelta64((today64.astype(np.int64) + 3) % 7, "D")
+    window = this_week - np.arange(weeks - 1, -1, -1).astype("timedelta64[W]")
+
+    weekly = pd.DataFrame({"week": week, "priority": frame["priority"].to_numpy()[has_due],
+                           "tasks": n[has_due], "complete": done_n[has_due]})
+    throughput_table = (weekly.pivot_table(index="week", columns="priority", values="complete",
+                                           aggfunc="sum", fill_value=0)
+                        .reindex(pd.DatetimeIndex(window), fill_value=0))
+    throughput = [{"week": str(ts.date()), **{str(p): int(v) for p, v in row.items()}}
+                  for ts, row in throughput_table.iterrows()]
+
+    per_week = weekly.groupby("week")[["tasks", "complete"]].sum().sort_index()
+    cumulative = per_week.cumsum()
+    # carry the totals of earlier weeks forward into weeks without due tasks
+    cumulative = cumulative.reindex(cumulative.index.union(pd.DatetimeIndex(window))).ffill().fillna(0)
+    burndown = [{"week": str(ts.date()), "scope": int(row.tasks), "completed": int(row.complete),
+                 "remaining": int(row.tasks - row.complete)}
+                for ts, row in cumulative.loc[pd.DatetimeIndex(window)].iterrows()]
+
+    return {
+        "date": today.isoformat(),
+        "summary": summary,
+        "priority": priority,
+        "aging": [{"days": label, "tasks": int(count)}
+                  for label, count in zip(AGING_LABELS, aging)],
+        "throughput": throughput,
+        "burndown": burndown,
+    }
+
+
+def report(conn: sqlite3.Connection, today: date = None, weeks: int = 12) -> Dict[str, object]:
+    """Load the task counts and compute the report, see ``build``."""
+    if weeks < 1:
+        raise ValueError("weeks must be at least 1")
+    return build(load(conn), today or date.today(), weeks)
+
+
+def tables(result: Dict[str, object]) -> List[tuple]:
+    """Lay a report out as (title, column names, rows) tables for printing."""
+    out = [("Summary", ["Metric", "Value"], list(result["summary"].items()))]
+    out.append(("By priority", ["Priority", "Tasks", "Done", "Rate"],
+                [(p["priority"], p["tasks"], p["complete"], p["completion_rate"])
+                 for p in result["priority"]]))
+    out.append(("Overdue aging", ["Days overdue", "Tasks"],
+                [(a["days"], a["tasks"]) for a in result["aging"]]))
+    priorities = sorted({key for row in result["throughput"] for key in row if key != "week"})
+    out.append(("Completed per week by priority (due week)", ["Week"] + priorities,
+                [[row["week"]] + [row.get(p, 0) for p in priorities] for row in result["throughput"]]))
+    out.append(("Burndown (cumulative by due week)", ["Week", "Scope", "Completed", "Remaining"],
+                [(b["week"], b["scope"], b["completed"], b["remaining"]) for b in result["burndown"]]))
+    return out
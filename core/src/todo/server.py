@@ -0,0 +1,300 @@
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+from pathlib import Path
+from typing import Dict
+
+import waitress
+
+from todo import SUCCESS, api, archive, database, metrics, writer
+
+# Seconds a stopping worker may spend finishing requests in flight
+GRACE_SECONDS = 10
+# Minimum lifetime of a worker; one dying sooner is respawned after a pause
+MIN_UPTIME_SECONDS = 1
+
+
+class _WriteLock():
+    """Process-shared write lock that records which process holds it.
+
+    A process killed while holding a ``multiprocessing.Lock`` leaves it
+    locked for good; the supervisor uses ``owner`` to notice that.
+    """
+
+    def __init__(self) -> None:
+        context = multiprocessing.get_context("fork")
+        self._lock = context.Lock()
+        self._owner = context.Value("i", 0, lock=False)
+
+    @property
+    def owner(self) -> int:
+        """Pid of the process holding the lock, 0 when it is free."""
+        return self._owner.value
+
+    def acquire(self, block: bool = True, timeout: float = None) -> bool:
+        if not self._lock.acquire(block, timeout):
+            return False
+        self._owner.value = os.getpid()
+        return True
+
+    def release(self) -> None:
+        self._owner.value = 0
+        self._lock.release()
+
+
+def _replace_orphaned_lock(state: dict, pid: int) -> bool:
+    """Replace ``state["write_lock"]`` when process ``pid`` exited holding it.
+
+    The other processes would time out on the orphaned lock forever, so the
+    caller must restart every worker with the new one; ``state["reload"]``
+    is set to ask for that.
+
+    :param state: supervisor state holding "write_lock" and "reload"
+    :type state: dict
+    :param pid: a child process that has exited
+    :type pid: int
+    :return: whether the lock was replaced
+    :rtype: bool
+    """
+    if not pid or state["write_lock"].owner != pid:
+        return False
+    print(f"todo: process {pid} died holding the write lock; restarting the workers",
+          file=sys.stderr)
+    state["write_lock"] = _WriteLock()
+    state["reload"] = True
+    return True
+
+
+def serve(db_path: Path, host: str = "127.0.0.1", port: int = 5000, threads: int = 8,
+          collect_metrics: bool = True, commit_batch: int = writer.MAX_BATCH,
+          commit_delay_ms: float = writer.MAX_DELAY_MS,
+          archive_policy: archive.Policy = None) -> None:
+    """Serve the to-do API on a multi-threaded WSGI server.
+
+    Requests are handled by a pool of ``threads`` waitress workers. Each worker
+    thread borrows its own pooled sqlite connection, and sqlite releases the
+    GIL while it runs a query, so concurrent readers overlap. Writes are
+    group committed by one ``WriteQueue``. A background thread compacts the
+    database every ``archive_policy.interval_hours``.
+
+    :param db_path: path to the to-do database
+    :type db_path: Path
+    :param host: address to bind, defaults to "127.0.0.1"
+    :type host: str, optional
+    :param port: port to bind, defaults to 5000
+    :type port: int, optional
+    :param threads: number of worker threads, defaults to 8
+    :type threads: int, optional
+    :param collect_metrics: record query metrics for ``/metrics``, defaults to True
+    :type collect_metrics: bool, optional
+    :param commit_batch: most writes per group commit, defaults to writer.MAX_BATCH
+    :type commit_batch: int, optional
+    :param commit_delay_ms: longest wait for a group commit to fill, defaults
+        to writer.MAX_DELAY_MS
+    :type commit_delay_ms: float, optional
+    :param archive_policy: what background compaction archives, defaults to none
+    :type archive_policy: archive.Policy, optional
+    """
+    metrics.enabled = collect_metrics
+    app = api.create_app(db_path, writer=writer.WriteQueue(db_path, commit_batch, commit_delay_ms))
+    compactor = None
+    if archive_policy is not None and archive_policy.interval_hours > 0:
+        compactor = archive.Compactor(db_path, archive_policy)
+        compactor.start()
+    try:
+        waitress.serve(app, host=host, port=port, threads=threads, ident="todo")
+    finally:
+        if compactor is not None:
+            compactor.stop()
+        app.extensions["todo_writer"].close()
+        database.close_all()
+
+
+def _run_worker(sock: socket.socket, db_path: Path, threads: int, collect_metrics: bool,
+                write_lock, commit: tuple) -> None:
+    """Body of a forked worker; never returns."""
+    code = 0
+    app = None
+    try:
+        # the parent decides about reloads and interrupts
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        # SystemExit raised inside the event loop makes waitress stop
+        # accepting and let the requests in flight finish
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        database.set_write_lock(write_lock)
+        metrics.enabled = collect_metrics
+        app = api.create_app(db_path, writer=writer.WriteQueue(db_path, *commit))
+        server = waitress.create_server(app, sockets=[sock], threads=threads, ident="todo")
+        server.run()
+    except SystemExit as exit:
+        code = exit.code or 0
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        if app is not None:
+            app.extensions["todo_writer"].close()
+        database.close_all()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def _run_compaction(db_path: Path, policy: archive.Policy, write_lock) -> None:
+    """Body of a forked compaction process; never returns."""
+    code = 0
+    try:
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        database.set_write_lock(write_lock)
+        archive.compact(db_path, policy)
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        database.close_all()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def serve_prefork(db_path: Path, host: str = "127.0.0.1", port: int = 5000, threads: int = 8,
+                  workers: int = 2, collect_metrics: bool = True,
+                  commit_batch: int = writer.MAX_BATCH,
+                  commit_delay_ms: float = writer.MAX_DELAY_MS,
+                  archive_policy: archive.Policy = None) -> None:
+    """Serve the to-do API from several forked processes sharing one database.
+
+    The parent migrates the database once, binds the listening socket and
+    forks ``workers`` processes that accept from it, each running ``threads``
+    request threads on its own connections. Reads scale with the processes;
+    writes queue on one shared lock (see ``database.set_write_lock``).
+
+    The parent only supervises: a worker that exits is replaced, SIGHUP
+    replaces the workers one at a time so the socket is never left without
+    one, and SIGTERM/SIGINT stop them all gracefully. When a process dies
+    holding the write lock, the lock is replaced and every worker with it. Each worker keeps its
+    own metrics, result cache and write queue. Every
+    ``archive_policy.interval_hours`` the parent forks one more process to
+    compact the database. Needs ``os.fork``, so POSIX only.
+
+    :param db_path: path to the to-do database
+    :type db_path: Path
+    :param host: address to bind, defaults to "127.0.0.1"
+    :type host: str, optional
+    :param port: port to bind, defaults to 5000
+    :type port: int, optional
+    :param threads: request threads per worker, defaults to 8
+    :type threads: int, optional
+    :param workers: number of worker processes, defaults to 2
+    :type workers: int, optional
+    :param collect_metrics: record query metrics for ``/metrics``, defaults to True
+    :type collect_metrics: bool, optional
+    :param commit_batch: most writes per group commit, defaults to writer.MAX_BATCH
+    :type commit_batch: int, optional
+    :param commit_delay_ms: longest wait for a group commit to fill, defaults
+        to writer.MAX_DELAY_MS
+    :type commit_delay_ms: float, optional
+    :param archive_policy: what background compaction archives, defaults to none
+    :type archive_policy: archive.Policy, optional
+    :raises OSError: when the database cannot be prepared or the port bound
+    """
+    if not hasattr(os, "fork"):
+        raise OSError("multi-process serving needs os.fork; use a single worker")
+    # Migrate before forking so no worker ever does, then drop the
+    # connection: sqlite connections must not cross a fork.
+    if database.init_database(db_path) != SUCCESS:
+        raise OSError(f"cannot open database {db_path}")
+    database.close_all()
+
+    sock = socket.create_server((host, port), backlog=1024)
+    children: Dict[int, float] = {}
+    state = {"stopping": False, "reload": False, "compactor": 0, "write_lock": _WriteLock()}
+    interval = archive_policy.interval_hours * 3600 if archive_policy is not None else 0
+    next_compaction = time.monotonic() + interval
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(sock, db_path, threads, collect_metrics, state["write_lock"],
+                        (commit_batch, commit_delay_ms))
+        children[pid] = time.monotonic()
+
+    def reap(block: bool) -> int:
+        """Collect one exited worker, returning its pid or 0."""
+        try:
+            pid, _ = os.waitpid(-1, 0 if block else os.WNOHANG)
+        except ChildProcessError:
+            return 0
+        _replace_orphaned_lock(state, pid)
+        if pid == state["compactor"]:
+            state["compactor"] = 0
+            return pid
+        started = children.pop(pid, None)
+        if started is not None and time.monotonic() - started < MIN_UPTIME_SECONDS \
+                and not state["stopping"]:
+            # do not spin on a worker that cannot start
+            time.sleep(MIN_UPTIME_SECONDS)
+        return pid
+
+    def terminate(pids: list) -> None:
+        """Stop ``pids`` gracefully, killing any still running after GRACE_SECONDS."""
+        def running() -> list:
+            return [pid for pid in pids if pid in children or pid == state["compactor"]]
+
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                children.pop(pid, None)
+        deadline = time.monotonic() + GRACE_SECONDS
+        while running() and time.monotonic() < deadline:
+            if not reap(block=False):
+                time.sleep(0.1)
+        for pid in running():
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            while pid in children or pid == state["compactor"]:
+                if not reap(block=True):
+                    break
+
+    def stop(signum, frame) -> None:
+        state["stopping"] = True
+
+    def reload(signum, frame) -> None:
+        state["reload"] = True
+
+    previous = {sig: signal.signal(sig, handler) for sig, handler in
+                ((signal.SIGTERM, stop), (signal.SIGINT, stop), (signal.SIGHUP, reload))}
+    try:
+        while not state["stopping"]:
+            if state["reload"]:
+                state["reload"] = False
+                for pid in list(children):
+                    if state["stopping"]:
+                        break
+                    # start the replacement first so requests keep flowing
+                    spawn()
+                    terminate([pid])
+            while reap(block=False):
+                pass
+            while len(children) < workers and not state["stopping"]:
+                spawn()
+            if interval > 0 and not state["compactor"] and time.monotonic() >= next_compaction:
+                next_compaction = time.monotonic() + interval
+                pid = os.fork()
+                if pid == 0:
+                    _run_compaction(db_path, archive_policy, state["write_lock"])
+                state["compactor"] = pid
+            time.sleep(0.2)
+    finally:
+        terminate(list(children) + ([state["compactor"]] if state["compactor"] else []))
+        sock.close()
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
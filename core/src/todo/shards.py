@@ -0,0 +1,203 @@
+import heapq
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from todo.query import Query
+from todo.todo import FETCH_SIZE, decode_cursor, encode_cursor, encode_rows
+from todo.todo import List as TodoList
+
+# Threads shared by every fan-out in the process
+FANOUT_THREADS = 8
+# Rows fetched per shard round trip; later rounds double up to the maximum
+FIRST_CHUNK = FETCH_SIZE
+MAX_CHUNK = 32 * FETCH_SIZE
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(FANOUT_THREADS, thread_name_prefix="todo-shard")
+        return _pool
+
+
+class _Descending():
+    """Sort key wrapper inverting the order of the value it holds."""
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+    def __lt__(self, other: "_Descending") -> bool:
+        return other.value < self.value
+
+    def __eq__(self, other: "_Descending") -> bool:
+        return self.value == other.value
+
+
+def _sqlite_key(value: Any) -> tuple:
+    # sqlite orders NULL before numbers before text before blobs
+    if value is None:
+        return (0,)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    return (3, value)
+
+
+def _sort_key(order: Tuple[Tuple[str, str], ...], positions: Tuple[int, ...]) -> Tuple[Callable, bool]:
+    """Return a key function giving rows the order of ``ORDER BY order``.
+
+    :return: the key and whether to merge in reverse, which is used when
+        every column is descending so only mixed orders pay for _Descending
+    """
+    reverse = all(direction == "DESC" for _, direction in order)
+    # IDs are never NULL and need no conversion
+    converters = [(i, None if column == "ID" else _sqlite_key,
+                   direction == "DESC" and not reverse)
+                  for (column, direction), i in zip(order, positions)]
+
+    def key(item: Tuple[int, Sequence]) -> tuple:
+        row = item[1]
+        values = []
+        for i, convert, descending in converters:
+            value = row[i] if convert is None else convert(row[i])
+            values.append(_Descending(value) if descending else value)
+        return tuple(values)
+
+    return key, reverse
+
+
+def _chunk(todo_list: TodoList, query: Query, after: Optional[str]) -> Tuple[List[str], List[tuple], Optional[str]]:
+    """Fetch one page of one shard; runs on the fan-out pool."""
+    names, rows, state = todo_list.rows(query, after)
+    return names, list(rows), state.get("next")
+
+
+def _tagged(index: int, rows: Iterator[tuple]) -> Iterator[Tuple[int, tuple]]:
+    for row in rows:
+        yield index, row
+
+
+class Shards():
+    """Several task lists, each in its own database, queried as one.
+
+    A query is sent to every shard on a shared thread pool and the sorted
+    per-shard results are merged into one stream. Shards are read in
+    keyset pages that grow from FIRST_CHUNK to MAX_CHUNK rows, the next
+    page being requested while the current one is merged, so no pool
+    thread ever waits on a slow consumer and memory stays bounded.
+
+    Rows are prefixed with the name of their list in a LIST column. The
+    cursor of a merged page holds the position reached in every shard.
+    """
+
+    def __init__(self, lists: Dict[str, Path]) -> None:
+        if not lists:
+            raise ValueError("no task lists selected")
+        self._lists = {name: TodoList(path) for name, path in lists.items()}
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._lists)
+
+    def generation(self) -> int:
+        """Return a counter that moves whenever any shard may have changed."""
+        return sum(todo_list.generation() for todo_list in self._lists.values())
+
+    def version(self) -> int:
+        """Return the sum of the shards' ``version``, which only grows."""
+        return sum(todo_list.version() for todo_list in self._lists.values())
+
+    @property
+    def changed_at(self) -> float:
+        return max(todo_list.changed_at for todo_list in self._lists.values())
+
+    def rows(self, query: Query, after: str = None) -> Tuple[List[str], Iterator[tuple], dict]:
+        """Stream one page of ``query`` merged over every shard.
+
+        The first page of each shard is fetched before returning, so bad
+        queries and cursors fail here and not while streaming.
+
+        :param query: the query to run on each shard
+        :type query: Query
+        :param after: cursor returned with the previous merged page
+        :type after: str, optional
+        :raises ValueError: for a bad query or cursor
+        :return: the column names (LIST first), the lazily merged rows and a
+            dict whose ``"next"`` holds the next page cursor once the rows
+            are exhausted
+        :rtype: Tuple[List[str], Iterator[tuple], dict]
+        """
+        positions = self._positions(after)
+        pool = _executor()
+        # one row past the page tells whether another page follows
+        wanted = query.limit + 1 if query.limit is not None else None
+        size = min(wanted or FIRST_CHUNK, FIRST_CHUNK)
+        firsts = {name: pool.submit(_chunk, todo_list, query.take(size), positions.get(name))
+                  for name, todo_list in self._lists.items()}
+        names = None
+        for future in firsts.values():
+            names = future.result()[0]
+        keys = tuple(names.index(column) for column, _ in query.keys)
+        state = {}
+        return ["LIST"] + names, self._merge(query, firsts, size, positions, keys, state), state
+
+    def _positions(self, after: Optional[str]) -> Dict[str, Optional[str]]:
+        if not after:
+            return {}
+        positions = {}
+        for entry in decode_cursor(after):
+            if not (isinstance(entry, list) and len(entry) == 2 and entry[0] in self._lists):
+                raise ValueError(f"cursor does not match the lists {', '.join(self._lists)}")
+            positions[entry[0]] = encode_cursor(entry[1]) if entry[1] is not None else None
+        return positions
+
+    def _shard(self, name: str, query: Query, first: Future, size: int) -> Iterator[tuple]:
+        """Yield the rows of one shard, prefetching its next page."""
+        todo_list = self._lists[name]
+        future, fetched = first, 0
+        while future is not None:
+            _, rows, following = future.result()
+            fetched += len(rows)
+            future = None
+            remaining = query.limit + 1 - fetched if query.limit is not None else None
+            if following and remaining != 0:
+                size = min(size * 2, MAX_CHUNK)
+                if remaining is not None:
+                    size = min(size, remaining)
+                future = _executor().submit(_chunk, todo_list, query.take(size), following)
+            yield from rows
+
+    def _merge(self, query: Query, firsts: Dict[str, Future], size: int,
+               positions: Dict[str, Optional[str]], keys: Tuple[int, ...],
+               state: dict) -> Iterator[tuple]:
+        order = list(firsts)
+        streams = [_tagged(index, self._shard(name, query, firsts[name], size))
+                   for index, name in enumerate(order)]
+        key, reverse = _sort_key(query.keys, keys)
+        merged = heapq.merge(*streams, key=key, reverse=reverse)
+        last: Dict[int, tuple] = {}
+        count = 0
+        for index, row in merged:
+            if query.limit is not None and count == query.limit:
+                # another row follows: resume every shard where it stopped
+                state["next"] = encode_cursor(
+                    [[name, [last[i][k] for k in keys] if i in last else
+                      (decode_cursor(positions[name]) if positions.get(name) else None)]
+                     for i, name in enumerate(order)])
+                return
+            last[index] = row
+            count += 1
+            yield (order[index],) + row
+
+    def stream(self, query: Query, after: str = None, ndjson: bool = False) -> Iterator[str]:
+        """Serialize one merged page incrementally, like ``List.stream``."""
+        names, rows, state = self.rows(query, after)
+        return encode_rows(names, rows, state, ndjson)
@@ -0,0 +1,192 @@
+import shlex
+from typing import Iterable, Iterator, List, Optional
+
+import typer
+
+from todo import __app_name__, cli, database
+
+try:
+    from typer import TyperException as _UsageError
+except ImportError:
+    # older typer reports bad command lines with click's exceptions
+    from click import ClickException as _UsageError
+
+# Lines handled by the session itself rather than by a todo command
+TRANSACTION_COMMANDS = ("begin", "commit", "rollback")
+# Commands that make no sense inside a session
+NESTED_COMMANDS = ("shell", "run")
+
+
+class _Rollback(Exception):
+    """Thrown into an open transaction to roll it back."""
+
+
+class Session():
+    """Run todo commands one after another in a single warm process.
+
+    The command tree is built once, the database path is read from the
+    config file once per list and again only when the file changes (see
+    ``cli.get_db_path``), and commands share the pooled connection with its
+    cached prepared statements, so a command costs its own work and the
+    argument parsing.
+
+    ``begin`` opens a transaction on the database of the session's list,
+    ``commit`` and ``rollback`` end it. The commands in between run inside
+    it, each write in its own savepoint, so a failing command does not
+    undo the others and nothing is durable until ``commit``.
+    """
+
+    def __init__(self, task_list: Optional[str] = None) -> None:
+        self._command = typer.main.get_command(cli.app)
+        self._prefix = ["--list", task_list] if task_list is not None else []
+        self._transaction = None
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._transaction is not None
+
+    def execute(self, line: str) -> int:
+        """Run one command line, such as ``complete 5-40``.
+
+        Blank lines and ``#`` comments do nothing.
+
+        :param line: the command and its arguments, quoted as in a shell
+        :type line: str
+        :return: the exit status of the command, 0 for success
+        :rtype: int
+        """
+        try:
+            args = shlex.split(line, comments=True)
+        except ValueError as error:
+            typer.secho(f"Cannot parse the line: {error}", fg=typer.colors.RED, err=True)
+            return 2
+        if not args:
+            return 0
+        try:
+            if args[0] in TRANSACTION_COMMANDS:
+                return self._control(args)
+            if args[0] in NESTED_COMMANDS:
+                typer.secho(f'"{args[0]}" cannot run inside a session', fg=typer.colors.RED, err=True)
+                return 2
+            with self._command.make_context(__app_name__, self._prefix + args) as ctx:
+                self._command.invoke(ctx)
+        except typer.Exit as exit:
+            return exit.exit_code
+        except _UsageError as error:
+            error.show()
+            return error.exit_code
+        except typer.Abort:
+            typer.secho("Aborted", fg=typer.colors.RED, err=True)
+            return 1
+        except Exception as error:
+            typer.secho(f"{args[0]} failed: {error}", fg=typer.colors.RED, err=True)
+            return 1
+        return 0
+
+    def _control(self, args: List[str]) -> int:
+        word = args[0]
+        if len(args) > 1:
+            typer.secho(f'"{word}" takes no arguments', fg=typer.colors.RED, err=True)
+            return 2
+        if word == "begin":
+            if self._transaction is not None:
+                typer.secho("A transaction is already open", fg=typer.colors.RED, err=True)
+                return 1
+            transaction = database.get_handler(cli.get_db_path()).transaction()
+            transaction.__enter__()
+            self._transaction = transaction
+            return 0
+        if self._transaction is None:
+            typer.secho("No transaction is open", fg=typer.colors.RED, err=True)
+            return 1
+        transaction, self._transaction = self._transaction, None
+        if word == "commit":
+            transaction.__exit__(None, None, None)
+        else:
+            transaction.__exit__(_Rollback, _Rollback(), None)
+        return 0
+
+    def close(self) -> bool:
+        """Roll back the open transaction, if any.
+
+        :return: whether a transaction was open
+        :rtype: bool
+        """
+        if self._transaction is None:
+            return False
+        self.execute("rollback")
+        return True
+
+
+def _lines(session: Session) -> Iterator[str]:
+    while True:
+        try:
+            yield input("todo* > " if session.in_transaction else "todo> ")
+        except EOFError:
+            typer.echo()
+            return
+        except KeyboardInterrupt:
+            typer.echo()
+
+
+def interact(session: Session) -> int:
+    """Read commands from the terminal until ``exit`` or end of input.
+
+    :param session: the session running the commands
+    :type session: Session
+    :return: 0
+    :rtype: int
+    """
+    try:
+        # line editing and history, where the platform has it
+        import readline  # noqa: F401
+    except ImportError:
+        pass
+    for line in _lines(session):
+        if line.strip() in ("exit", "quit"):
+            break
+        try:
+            session.execute(line)
+        except KeyboardInterrupt:
+            typer.secho("\nInterrupted", fg=typer.colors.RED, err=True)
+    if session.close():
+        typer.secho("The open transaction was rolled back", fg=typer.colors.YELLOW, err=True)
+    return 0
+
+
+def run(session: Session, lines: Iterable[str], keep_going: bool = False,
+        atomic: bool = False) -> int:
+    """Run a script of commands, one per line.
+
+    :param session: the session running the commands
+    :type session: Session
+    :param lines: the script
+    :type lines: Iterable[str]
+    :param keep_going: run the remaining lines after a failure
+    :type keep_going: bool, optional
+    :param atomic: run the script in one transaction, committed only when
+        every line succeeds
+    :type atomic: bool, optional
+    :return: 0, or 1 when a line failed or a transaction was left open
+    :rtype: int
+    """
+    failed = False
+    if atomic and session.execute("begin"):
+        return 1
+    for number, line in enumerate(lines, 1):
+        status = session.execute(line)
+        if status:
+            failed = True
+            typer.secho(f"line {number}: exit status {status}", fg=typer.colors.RED, err=True)
+            if not keep_going:
+                break
+    if atomic and not failed and session.in_transaction:
+        failed = session.execute("commit") != 0
+    if session.close():
+        if not atomic:
+            failed = True
+            typer.secho("The script left a transaction open; it was rolled back",
+                        fg=typer.colors.RED, err=True)
+        else:
+            typer.secho("Nothing was committed", fg=typer.colors.RED, err=True)
+    return 1 if failed else 0
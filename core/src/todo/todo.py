@@ -1,24 +1,99 @@
-from datetime import date, timedelta, datetime
+from datetime import date
 from pathlib import Path
-from typing import Any, Dict, List, NamedTuple, Tuple
-from flask import Flask
-from flask_restful import Resource, Api
-from flask import jsonify
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+import base64
+import json
+from json.encoder import encode_basestring_ascii as _escape
 import sqlite3
+import time
+from sys import intern as _intern
 
-from todo.database import DatabaseHandler
+from todo import config, metrics
+from todo.database import (BULK_COPY, BULK_INSERTED, BULK_STAGE, SUMMARY_REBUILD, get_database_path,
+                           get_handler)
+from todo.query import Predicate, Query, to_date
 
-def to_date(s):
-    return datetime.strptime(s, '%Y-%m-%d')
+# Rows pulled from sqlite per fetchmany call when streaming a list
+FETCH_SIZE = 500
 
-class CurrentTodo(NamedTuple):
-    todo: Dict[str, Any]
-    error: int
+# Seconds between looks at the database while waiting for a change
+CHANGES_POLL_SECONDS = 0.05
+
+# Column order of SELECT * FROM TASKS
+TASK_COLUMNS = ("ID", "NAME", "DESCRIPTION", "START_DATE", "DUE_DATE", "PRIORITY", "COMPLETE", "DELETED")
+
+
+def _json_int(value: Any) -> str:
+    return "null" if value is None else str(value)
+
+
+def _json_text(value: Any) -> str:
+    return "null" if value is None else _escape(value)
+
+
+# JSON encoder per known column, anything else goes through json.dumps
+_COLUMN_ENCODERS = {
+    "SEQ": _json_int, "OP": _json_text,
+    "ID": _json_int, "PRIORITY": _json_int, "COMPLETE": _json_int, "DELETED": _json_int,
+    "NAME": _json_text, "DESCRIPTION": _json_text, "START_DATE": _json_text, "DUE_DATE": _json_text,
+}
+
+
+def row_encoder(names: Sequence[str]) -> Callable[[Sequence], str]:
+    """Return a function serializing rows with these columns as JSON objects.
+
+    The output is the same as ``json.dumps(dict(zip(names, row)))`` but the
+    keys are encoded once into a template instead of building a dict per row.
+    """
+    template = "{" + ", ".join(json.dumps(name).replace("%", "%%") + ": %s" for name in names) + "}"
+    encoders = [_COLUMN_ENCODERS.get(name, json.dumps) for name in names]
+
+    def encode(row: Sequence) -> str:
+        return template % tuple([encoder(value) for encoder, value in zip(encoders, row)])
+
+    return encode
+
+
+class Task(NamedTuple):
+    """One TASKS row.
+
+    Built straight from sqlite by ``task_factory``. Being a tuple it has no
+    per-instance dict and still unpacks, slices and renders like the raw row.
+    """
+    id: int
+    name: str
+    description: str
+    start_date: str
+    due_date: str
+    priority: int
+    complete: int
+    deleted: int
+
+    def to_json(self) -> str:
+        return _encode_task(self)
+
+
+_encode_task = row_encoder(TASK_COLUMNS)
+
+
+_new = tuple.__new__
+
+
+def task_factory(cursor: sqlite3.Cursor, row: tuple) -> Task:
+    """sqlite row factory for queries returning exactly TASK_COLUMNS.
+
+    Dates are interned: a long list holds few distinct dates, so its rows
+    share them instead of each carrying two copies.
+    """
+    id, name, description, start_date, due_date, priority, complete, deleted = row
+    return _new(Task, (id, name, description, start_date and _intern(start_date),
+                       due_date and _intern(due_date), priority, complete, deleted))
 
 
 class Todoer(): 
     def __init__(self, db_path: Path) -> None:
-       self._db_handler = DatabaseHandler(db_path)
+       self._db_handler = get_handler(db_path)
        
     def add(self, name: str, description: str, start_date:str = None, due_date:str = None, priority: int = 2, complete: int = 0, deleted: int = 0) -> dict:
         """Add a new to-do to the database.
@@ -37,11 +112,9 @@ class Todoer():
         :type complete: int, optional
         :param deleted: boolean for deleted task, defaults to 0
         :type deleted: int, optional
-        :return: returns the values last input to the database
+        :return: returns the values last input to the database, with the new ID
         :rtype: dict
         """
-        conn = sqlite3.connect(f"{self._db_handler._db_path}")
-        print("Opened database successfully")
         query = ('INSERT INTO TASKS (NAME,DESCRIPTION,START_DATE,DUE_DATE,PRIORITY,COMPLETE,DELETED) '
             'VALUES (:NAME, :DESCRIPTION, :START_DATE, :DUE_DATE, :PRIORITY, :COMPLETE, :DELETED );')
         
@@ -54,12 +127,52 @@ class Todoer():
             'COMPLETE': complete,
             'DELETED': deleted 
         }
-        conn.execute(query, params)
-        conn.commit()
-        print("Records created successfully")
-        conn.close()
+        with self._db_handler.transaction() as conn, metrics.QUERY_SECONDS.time("add"):
+            todo_id = conn.execute(query, params).lastrowid
+
+        return {'ID': todo_id, **params}
+
+    def add_many(self, tasks: Iterable[dict], chunk_size: int = 10000) -> int:
+        """Add many to-dos using chunked executemany transactions.
 
-        return params
+        Tasks are consumed lazily, so a generator keeps memory flat no matter
+        how many rows are inserted. Each chunk is staged and copied into TASKS
+        with one statement while the per-row insert triggers stand aside, and
+        the search index, summary counters and change log are filled with one
+        statement each instead, see ``database.BULK_STAGE``.
+
+        :param tasks: dicts with the keyword arguments accepted by ``add``
+        :type tasks: Iterable[dict]
+        :param chunk_size: rows inserted per transaction, defaults to 10000
+        :type chunk_size: int, optional
+        :return: number of to-dos inserted
+        :rtype: int
+        """
+        query = 'INSERT INTO temp.TASKS_STAGE VALUES (?, ?, ?, ?, ?, ?, ?);'
+        rows = (
+            (task['name'], task['description'],
+             to_date(task['start_date']), to_date(task['due_date']),
+             task.get('priority', 2), task.get('complete', 0), task.get('deleted', 0))
+            for task in tasks
+        )
+        total = 0
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return total
+            with self._db_handler.transaction() as conn, metrics.QUERY_SECONDS.time("add_many"):
+                conn.execute(BULK_STAGE)
+                conn.execute("INSERT INTO TASKS_BULK_LOAD (ACTIVE) VALUES (1)")
+                # AUTOINCREMENT gives the new rows IDs above every existing one
+                low = conn.execute("SELECT IFNULL(MAX(ID), 0) FROM TASKS").fetchone()[0]
+                conn.executemany(query, chunk)
+                conn.execute(BULK_COPY)
+                for statement in BULK_INSERTED:
+                    conn.execute(statement, (low,))
+                conn.execute("DELETE FROM temp.TASKS_STAGE")
+                conn.execute("DELETE FROM TASKS_BULK_LOAD")
+            metrics.observe_rows("add_many", len(chunk))
+            total += len(chunk)
  
 
     def set_done(self, todo_id: int) -> None:
@@ -70,10 +183,8 @@ class Todoer():
         :return: None
         :rtype: None
         """
-        conn = sqlite3.connect(f"{self._db_handler._db_path}")
-        conn.execute(f"UPDATE TASKS set COMPLETE = 1 where ID = {todo_id}")
-        conn.commit()
-        conn.close()
+        with self._db_handler.transaction() as conn, metrics.QUERY_SECONDS.time("set_done"):
+            conn.execute("UPDATE TASKS set COMPLETE = 1 where ID = ?", (todo_id,))
 
     def rename(self, todo_id: int, new_name: str) -> None:
         """Rename a to-do
@@ -85,10 +196,8 @@ class Todoer():
         :return: None
         :rtype: None
         """
-        conn = sqlite3.connect(f"{self._db_handler._db_path}")
-        conn.execute(f"UPDATE TASKS set NAME = '{new_name}' where ID = {todo_id}")
-        conn.commit()
-        conn.close()
+        with self._db_handler.transaction() as conn, metrics.QUERY_SECONDS.time("rename"):
+            conn.execute("UPDATE TASKS set NAME = ? where ID = ?", (new_name, todo_id))
 
     def redescribe(self, todo_id: int, new_description: str) -> None:
         """Update a description for a to-do
@@ -100,10 +209,9 @@ class Todoer():
         :return: None
         :rtype: None
         """
-        conn = sqlite3.connect(f"{self._db_handler._db_path}")
-        conn.execute(f"UPDATE TASKS set DESCRIPTION = '{new_description}' where ID = {todo_id}")
-        conn.commit()
-        conn.close()
+        with self._db_handler.transaction() as conn, metrics.QUERY_SECONDS.time("redescribe"):
+            conn.execute("UPDATE TASKS set DESCRIPTION = ? where ID = ?",
+                (new_description, todo_id))
 
     def remove(self, todo_id: int) -> None:
         """Remove a to-do from the database using its id
@@ -113,99 +221,677 @@ class Todoer():
         :return: None
         :rtype: None
         """
-        conn = sqlite3.connect(f"{self._db_handler._db_path}")
-        print("Opened database successfully")
-        conn.execute(f"UPDATE TASKS set DELETED = 1 where ID = {todo_id};")
-        conn.commit()
-        conn.close()
+        with self._db_handler.transaction() as conn, metrics.QUERY_SECONDS.time("remove"):
+            conn.execute("UPDATE TASKS set DELETED = 1 where ID = ?;", (todo_id,))
 
-class List(Resource):
-    def get(self, method:str='priority', start:str="none", end:str="none", api_bool:int=1) -> List[tuple]:
-        """Get different types of to-do lists from the database
-        :param method: type of to-do list
+    def update(self, todo_id: int, changes: Dict[str, Any]) -> int:
+        """Set several columns of one to-do at once.
+
+        :param todo_id: to-do ID
+        :type todo_id: int
+        :param changes: new values keyed by TASKS column, see
+            ``ingest.validate_changes``
+        :type changes: Dict[str, Any]
+        :raises ValueError: when nothing or the ID would be changed, or a
+            column is unknown
+        :return: 1 when the to-do exists, else 0
+        :rtype: int
+        """
+        if not changes or not set(changes) <= set(TASK_COLUMNS[1:]):
+            raise ValueError("expected new values for " + ", ".join(TASK_COLUMNS[1:]))
+        columns = sorted(changes)
+        assignment = ", ".join(f"{column} = ?" for column in columns)
+        with self._db_handler.transaction() as conn, metrics.QUERY_SECONDS.time("update"):
+            return conn.execute(f"UPDATE TASKS SET {assignment} WHERE ID = ?",
+                                [changes[column] for column in columns] + [todo_id]).rowcount
+
+    def _update_many(self, assignment: str, unchanged: str, spans: Iterable[Tuple[int, int]],
+                     where: Predicate, label: str) -> int:
+        """Apply ``assignment`` to ID spans and/or a filter in one transaction.
+
+        Rows that already satisfy ``unchanged`` are skipped so the count only
+        covers rows that actually changed.
+        """
+        spans = list(spans)
+        if not spans and where is None:
+            raise ValueError("no to-dos selected")
+        changed = 0
+        with self._db_handler.transaction() as conn, metrics.QUERY_SECONDS.time(label):
+            if spans:
+                changed += conn.executemany(
+                    f"UPDATE TASKS SET {assignment} WHERE ID BETWEEN ? AND ? AND NOT ({unchanged})",
+                    spans).rowcount
+            if where is not None:
+                changed += conn.execute(
+                    f"UPDATE TASKS SET {assignment} WHERE ({where.sql}) AND NOT ({unchanged})",
+                    where.params).rowcount
+        metrics.observe_rows(label, changed)
+        return changed
+
+    def set_done_many(self, spans: Iterable[Tuple[int, int]] = (), where: Predicate = None) -> int:
+        """Set every selected to-do as done in a single transaction.
+
+        :param spans: inclusive (low, high) ID ranges, see ``query.parse_ids``
+        :type spans: Iterable[Tuple[int, int]], optional
+        :param where: filter selecting more to-dos, see ``query.parse_where``
+        :type where: Predicate, optional
+        :raises ValueError: when neither spans nor a filter is given
+        :return: number of to-dos changed
+        :rtype: int
+        """
+        return self._update_many("COMPLETE = 1", "COMPLETE = 1", spans, where, "set_done_many")
+
+    def remove_many(self, spans: Iterable[Tuple[int, int]] = (), where: Predicate = None) -> int:
+        """Remove every selected to-do in a single transaction.
+
+        :param spans: inclusive (low, high) ID ranges, see ``query.parse_ids``
+        :type spans: Iterable[Tuple[int, int]], optional
+        :param where: filter selecting more to-dos, see ``query.parse_where``
+        :type where: Predicate, optional
+        :raises ValueError: when neither spans nor a filter is given
+        :return: number of to-dos changed
+        :rtype: int
+        """
+        return self._update_many("DELETED = 1", "DELETED = 1", spans, where, "remove_many")
+
+    def rename_many(self, names: Iterable[Tuple[int, str]]) -> int:
+        """Rename many to-dos with one executemany in a single transaction.
+
+        :param names: (to-do ID, new name) pairs
+        :type names: Iterable[Tuple[int, str]]
+        :return: number of to-dos changed
+        :rtype: int
+        """
+        pairs = [(name, todo_id) for todo_id, name in names]
+        with self._db_handler.transaction() as conn, metrics.QUERY_SECONDS.time("rename_many"):
+            changed = conn.executemany("UPDATE TASKS set NAME = ? where ID = ?", pairs).rowcount
+        metrics.observe_rows("rename_many", changed)
+        return changed
+
+    def redescribe_many(self, descriptions: Iterable[Tuple[int, str]]) -> int:
+        """Update many descriptions with one executemany in a single transaction.
+
+        :param descriptions: (to-do ID, new description) pairs
+        :type descriptions: Iterable[Tuple[int, str]]
+        :return: number of to-dos changed
+        :rtype: int
+        """
+        pairs = [(description, todo_id) for todo_id, description in descriptions]
+        with self._db_handler.transaction() as conn, metrics.QUERY_SECONDS.time("redescribe_many"):
+            changed = conn.executemany("UPDATE TASKS set DESCRIPTION = ? where ID = ?", pairs).rowcount
+        metrics.observe_rows("redescribe_many", changed)
+        return changed
+
+    def rebuild_summary(self) -> int:
+        """Recount the counters behind ``List.summary`` from TASKS.
+
+        The triggers keep them exact, so this only repairs drift such as
+        rows written while the triggers were dropped. Scans the table.
+
+        :return: number of counters that were wrong
+        :rtype: int
+        """
+        with self._db_handler.transaction() as conn, metrics.QUERY_SECONDS.time("rebuild_summary"):
+            before = set(conn.execute(_SUMMARY_COUNTERS))
+            for statement in SUMMARY_REBUILD:
+                conn.execute(statement)
+            after = set(conn.execute(_SUMMARY_COUNTERS))
+        return len({counter[:-1] for counter in before ^ after})
+
+
+# Every non-zero counter as (table, key..., N)
+_SUMMARY_COUNTERS = ("SELECT 'S', PRIORITY, COMPLETE, DELETED, N FROM TASKS_SUMMARY WHERE N != 0 "
+                     "UNION ALL SELECT 'D', DUE_DATE, 0, 0, N FROM TASKS_OPEN_DUE WHERE N != 0")
+
+
+def _batched(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def encode_cursor(values: tuple) -> str:
+    """Pack the sort key of the last row on a page into an opaque token."""
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token: str) -> list:
+    """Unpack a token made by ``encode_cursor``.
+
+    :raises ValueError: when the token is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError(f"invalid cursor {token!r}") from None
+    if not isinstance(values, list):
+        raise ValueError(f"invalid cursor {token!r}")
+    return values
+
+
+def encode_rows(names: Sequence[str], rows: Iterable[Sequence], state: dict,
+                ndjson: bool) -> Iterator[str]:
+    """Serialize streamed rows as the body of a list response.
+
+    :param names: column names
+    :type names: Sequence[str]
+    :param rows: the rows, e.g. from ``List.rows``
+    :type rows: Iterable[Sequence]
+    :param state: dict whose ``"next"`` holds the next page cursor once the
+        rows are exhausted
+    :type state: dict
+    :param ndjson: emit one JSON object per line, followed by a
+        ``{"next": ...}`` line when there is another page; otherwise emit
+        the ``{"data": [...], "next": ...}`` document
+    :type ndjson: bool
+    :return: chunks of the response body
+    :rtype: Iterator[str]
+    """
+    encoded = map(row_encoder(names), rows)
+    if ndjson:
+        for batch in _batched(encoded, FETCH_SIZE):
+            yield "\n".join(batch) + "\n"
+        if state.get("next") is not None:
+            yield json.dumps({"next": state["next"]}) + "\n"
+        return
+    yield '{"data":['
+    separator = ""
+    for batch in _batched(encoded, FETCH_SIZE):
+        yield separator + ",".join(batch)
+        separator = ","
+    yield '],"next":' + json.dumps(state.get("next")) + "}\n"
+
+
+def encode_events(names: Sequence[str], rows: Iterable[Sequence]) -> Iterator[str]:
+    """Serialize change feed rows as server-sent events.
+
+    Each row becomes one event whose ``id`` is its SEQ, the first column,
+    so a reconnecting ``EventSource`` resumes with ``Last-Event-ID``.
+
+    :return: chunks of the event stream
+    :rtype: Iterator[str]
+    """
+    encode = row_encoder(names)
+    for batch in _batched(rows, FETCH_SIZE):
+        yield "".join(f"id: {row[0]}\ndata: {encode(row)}\n\n" for row in batch)
+
+
+# Latest change of every task changed after SEQ ?, in commit order; a task
+# missing from TASKS was deleted (or archived)
+_CHANGES = ("SELECT C.SEQ, CASE WHEN T.ID IS NULL THEN 'delete' ELSE 'upsert' END AS OP, C.ID, "
+            "T.NAME, T.DESCRIPTION, T.START_DATE, T.DUE_DATE, T.PRIORITY, T.COMPLETE, T.DELETED "
+            "FROM TASKS_CHANGES AS C LEFT JOIN TASKS AS T ON T.ID = C.ID "
+            "WHERE C.SEQ > ? AND NOT EXISTS (SELECT 1 FROM TASKS_CHANGES AS L "
+            "WHERE L.ID = C.ID AND L.SEQ > C.SEQ) ORDER BY C.SEQ LIMIT ?")
+
+
+class List():
+    def __init__(self, db_path: Path = None) -> None:
+        if db_path is None:
+            db_path = get_database_path(config.CONFIG_FILE_PATH)
+        self._db_handler = get_handler(db_path)
+
+    @property
+    def db_path(self) -> Path:
+        return self._db_handler.db_path
+
+    def generation(self) -> int:
+        """Return the data generation of the database, see DatabaseHandler."""
+        return self._db_handler.generation()
+
+    @property
+    def changed_at(self) -> float:
+        return self._db_handler.changed_at
+
+    def version(self) -> int:
+        """Return a number that moves with every change to the to-dos.
+
+        Unlike ``generation`` it is read from the database, so every process
+        serving the file agrees on it; see ``last_change``.
+        """
+        return self.last_change()
+
+    @staticmethod
+    def preset(method: str, start: str = "none", end: str = "none") -> Query:
+        """Return the query behind one of the named to-do lists.
+
+        :param method: task_number, priority, due_date, closed_range or overdue
         :type method: str
-        :param start: optional, start date to search 
+        :param start: start date, for closed_range
         :type start: str
-        :param end: optional, end date to search 
+        :param end: end date, for closed_range
         :type end: str
-        :return: returns the database rows as a list of tuples
-        :rtype: list of tuples
-        """
-        # app = Flask(__name__)
-        # with app.app_context():
-        keys = ('ID','NAME','DESCRIPTION','TEXT','START_DATE','DUE_DATE',
-                'PRIORITY','COMPLETE','DELETED')
-        conn = sqlite3.connect("C:/Users/Connor/.Connor_todo.db")
-        print("Opened database successfully")
+        :raises ValueError: for an unknown method or bad dates
+        :return: the query, labelled with the method for metrics
+        :rtype: Query
+        """
         if method == "task_number":
-            cursor = conn.execute(f"""
-                SELECT *
-                FROM TASKS 
-                ORDER BY ID ASC
-            """)
-            if api_bool==1:
-                result = {"data": [dict(zip(tuple(keys), i))
-                    for i in cursor]}
-                return jsonify(result)
-            else:
-                result = [row for row in cursor]
-                result = iter(result)
-                return result
+            return Query(order=(("ID", "ASC"),), label=method)
         elif method == "priority":
-            cursor = conn.execute(f"""
-                SELECT *
-                FROM TASKS 
-                ORDER BY PRIORITY DESC
-            """) 
-            if api_bool==1:
-                result = {"data": [dict(zip(tuple(keys), i))
-                    for i in cursor]}
-                return jsonify(result)
-            else:
-                result = [row for row in cursor]
-                result = iter(result)
-                return result
+            return Query(order=(("PRIORITY", "DESC"), ("ID", "DESC")), label=method)
         elif method == "due_date":
-            cursor = conn.execute(f"""
-                SELECT *
-                FROM TASKS 
-                ORDER BY DUE_DATE DESC
-            """)
-            if api_bool==1:
-                result = {"data": [dict(zip(tuple(keys), i))
-                    for i in cursor]}
-                return jsonify(result)
-            else:
-                result = [row for row in cursor]
-                result = iter(result)
-                return result
+            return Query((Predicate("DELETED = 0 AND COMPLETE = 0"),),
+                         (("DUE_DATE", "DESC"), ("ID", "DESC")), label=method)
         elif method == "closed_range":
-            cursor = conn.execute(f"""
-                SELECT *
-                FROM TASKS 
-                WHERE DUE_DATE BETWEEN '{to_date(start)}' AND '{to_date(end)}'
-            """)
-            if api_bool==1:
-                result = {"data": [dict(zip(tuple(keys), i))
-                    for i in cursor]}
-                return jsonify(result)
-            else:
-                result = [row for row in cursor]
-                result = iter(result)
-                return result
+            return Query((Predicate("COMPLETE = 1 AND DUE_DATE BETWEEN ? AND ?",
+                                    (to_date(start), to_date(end))),),
+                         (("DUE_DATE", "ASC"), ("ID", "ASC")), label=method)
         elif method == "overdue":
-            cursor = conn.execute(f"""
-                SELECT *
-                FROM TASKS 
-                WHERE DATE(DUE_DATE) < {(datetime.now()).date()}
-            """)
-            if api_bool==1:
-                result = {"data": [dict(zip(tuple(keys), i))
-                    for i in cursor]}
-                return jsonify(result)
-            else:
-                result = [row for row in cursor]
-                result = iter(result)
-                return result
-        else: 
-            print('not an option')
\ No newline at end of file
+            return Query((Predicate("DELETED = 0 AND COMPLETE = 0 AND DUE_DATE < ?",
+                                    (date.today().isoformat(),)),),
+                         (("DUE_DATE", "ASC"), ("ID", "ASC")), label=method)
+        raise ValueError(f"{method!r} is not an option")
+
+    @classmethod
+    def build(cls, method: str = "task_number", start: str = "none", end: str = "none",
+              where: str = None, sort: str = None, fields: str = None, limit: int = None) -> Query:
+        """Refine a named list with a filter, a sort order and a projection.
+
+        :param where: extra filter, e.g. ``"priority=3 and due<=today+7"``
+        :type where: str, optional
+        :param sort: sort key replacing the list's own, e.g. ``"-priority,due"``
+        :type sort: str, optional
+        :param fields: columns to return, e.g. ``"id,name,due"``
+        :type fields: str, optional
+        :raises ValueError: for an unknown method, field or bad value
+        :return: the combined query
+        :rtype: Query
+        """
+        query = cls.preset(method, start, end)
+        if where:
+            query = query.filter(where)
+        if sort:
+            query = query.order_by(sort)
+        if fields:
+            query = query.select(fields)
+        return query.take(limit)
+
+    def _run(self, query: Query, after: str,
+             typed: bool = False) -> Tuple[sqlite3.Cursor, Tuple[int, ...], Tuple[str, float], Optional[int]]:
+        """Run the statement behind one page of ``query``.
+
+        Pages resume strictly after the sort key stored in ``after``, so a
+        deep page costs the same index seek as the first one.
+
+        :param query: the query to run
+        :type query: Query
+        :param after: cursor returned with the previous page
+        :type after: str
+        :param typed: fetch full rows as ``Task`` records rather than tuples
+        :type typed: bool, optional
+        :raises ValueError: for a bad cursor
+        :return: the open cursor, the positions of the sort key columns, the
+            metrics label of the query with its execution time so far, and
+            the page size
+        :rtype: Tuple[sqlite3.Cursor, Tuple[int, ...], Tuple[str, float], Optional[int]]
+        """
+        sql, params = query.compile(decode_cursor(after) if after else None)
+        started = time.perf_counter()
+        cursor = self._db_handler.connection().execute(sql, params)
+        names = [column[0] for column in cursor.description]
+        if typed and tuple(names) == TASK_COLUMNS:
+            cursor.row_factory = task_factory
+        return (cursor, tuple(names.index(column) for column, _ in query.keys),
+                (query.label, time.perf_counter() - started), query.limit)
+
+    @staticmethod
+    def _match(text: str) -> str:
+        """Turn search words into an FTS5 query, see ``search_query``."""
+        terms = []
+        for word in text.split():
+            prefix = word.endswith("*")
+            word = word.rstrip("*")
+            if word:
+                terms.append('"' + word.replace('"', '""') + '"' + ("*" if prefix else ""))
+        if not terms:
+            raise ValueError("empty search")
+        return " ".join(terms)
+
+    @classmethod
+    def search_query(cls, text: str, limit: int = None) -> Query:
+        """Build a ranked full-text search over live tasks.
+
+        Words are matched as quoted FTS5 phrases (all must appear); a word
+        ending in ``*`` matches as a prefix. Rows carry their bm25 score in a
+        trailing RANK column, best match first.
+
+        The statement joins every match to TASKS; pages of ``limit`` rows
+        are cheaper through ``search`` and ``search_rows``.
+        """
+        source = Predicate("(SELECT TASKS.*, bm25(TASKS_FTS) AS RANK FROM TASKS_FTS "
+                           "JOIN TASKS ON TASKS.ID = TASKS_FTS.rowid "
+                           "WHERE TASKS_FTS MATCH ? AND TASKS.DELETED = 0)", (cls._match(text),))
+        return Query(order=(("RANK", "ASC"), ("ID", "ASC")), source=source,
+                     label="search").take(limit)
+
+    def _search(self, text: str, limit: Optional[int],
+                after: str) -> Tuple[sqlite3.Cursor, Tuple[int, ...], Tuple[str, float], Optional[int]]:
+        """Run the statement behind one page of search results, like ``_run``.
+
+        bm25 scores every match whatever the page size, but only the rows
+        on the page need reading from TASKS. The best matches after the
+        cursor are ranked from the index alone, a window at a time; those
+        not deleted are then read by ID. A window that loses rows to
+        deleted to-dos is followed by a wider one.
+        """
+        query = self.search_query(text, limit)
+        if limit is None:
+            return self._run(query, after)
+        started = time.perf_counter()
+        ranked = Query(order=query.order, source=Predicate(
+            "(SELECT rowid AS ID, bm25(TASKS_FTS) AS RANK FROM TASKS_FTS WHERE TASKS_FTS MATCH ?)",
+            query.source.params))
+        connection = self._db_handler.connection()
+        key = decode_cursor(after) if after else None
+        # twice the page leaves room for some deleted to-dos
+        window, live = 2 * (limit + 1), []
+        while True:
+            sql, params = ranked.take(window).compile(key)
+            matches = connection.execute(
+                f"SELECT M.ID, M.RANK, TASKS.DELETED FROM ({sql}) AS M JOIN TASKS USING (ID) "
+                "ORDER BY M.RANK, M.ID", params).fetchall()
+            live.extend((id, rank) for id, rank, deleted in matches if not deleted)
+            # compile asks for one row more than the window
+            if len(live) > limit or len(matches) <= window:
+                break
+            key = [matches[-1][1], matches[-1][0]]
+            window *= 4
+        # VALUES needs a row; (NULL, NULL) joins none
+        live = live[:limit + 1] or [(None, None)]
+        cursor = connection.execute(
+            "SELECT TASKS.*, M.column2 AS RANK FROM (VALUES "
+            + ", ".join("(?, ?)" for _ in live)
+            + ") AS M JOIN TASKS ON TASKS.ID = M.column1 ORDER BY RANK, ID",
+            [value for row in live for value in row])
+        names = [column[0] for column in cursor.description]
+        return (cursor, tuple(names.index(column) for column, _ in query.keys),
+                (query.label, time.perf_counter() - started), limit)
+
+    @staticmethod
+    def _fetch(cursor: sqlite3.Cursor, positions: Tuple[int, ...], probe: Tuple[str, float],
+               limit: int, state: dict) -> Iterator[tuple]:
+        """Yield rows in ``fetchmany`` batches, stopping after ``limit``.
+
+        When more rows remain, ``state["next"]`` is set to the cursor of the
+        following page once the generator is exhausted. Only the time spent
+        inside sqlite is added to the query latency, not the time the
+        consumer takes between rows.
+        """
+        label, elapsed = probe
+        count = 0
+        row = None
+        try:
+            while True:
+                started = time.perf_counter()
+                batch = cursor.fetchmany(FETCH_SIZE)
+                elapsed += time.perf_counter() - started
+                if not batch:
+                    return
+                for next_row in batch:
+                    if limit is not None and count == limit:
+                        state["next"] = encode_cursor(tuple(row[i] for i in positions))
+                        return
+                    row = next_row
+                    count += 1
+                    yield row
+        finally:
+            if metrics.enabled:
+                metrics.QUERY_SECONDS.observe(label, elapsed)
+                metrics.QUERY_ROWS.observe(label, count)
+
+    def run(self, query: Query, after: str = None) -> Tuple[List[tuple], str]:
+        """Fetch one page of any query built with ``todo.query.Query``.
+
+        :raises ValueError: for a bad cursor
+        :return: the rows, as ``Task`` records when they hold every TASKS
+            column, and the cursor of the next page (None on the last)
+        :rtype: Tuple[List[tuple], str]
+        """
+        return self._page(*self._run(query, after, typed=True))
+
+    def rows(self, query: Query, after: str = None) -> Tuple[List[str], Iterator[tuple], dict]:
+        """Stream the rows of one page of ``query`` without materializing it.
+
+        :raises ValueError: for a bad cursor
+        :return: the column names, the lazily fetched rows and a dict whose
+            ``"next"`` holds the next page cursor once the rows are exhausted
+        :rtype: Tuple[List[str], Iterator[tuple], dict]
+        """
+        cursor, positions, probe, limit = self._run(query, after)
+        state = {}
+        names = [column[0] for column in cursor.description]
+        return names, self._fetch(cursor, positions, probe, limit, state), state
+
+    def page(self, method: str, start: str = "none", end: str = "none",
+             limit: int = None, after: str = None, where: str = None,
+             sort: str = None, fields: str = None) -> Tuple[List[tuple], str]:
+        """Fetch one page of a to-do list using keyset pagination.
+
+        ``where``, ``sort`` and ``fields`` refine the list, see ``build``.
+
+        :raises ValueError: for an unknown method, field, bad dates or a bad cursor
+        :return: the rows and the cursor of the next page (None on the last)
+        :rtype: Tuple[List[tuple], str]
+        """
+        return self.run(self.build(method, start, end, where, sort, fields, limit), after)
+
+    def search(self, text: str, limit: int = None, after: str = None) -> Tuple[List[tuple], str]:
+        """Fetch one page of full-text search results, best match first.
+
+        :param text: words to look for in task names and descriptions
+        :type text: str
+        :raises ValueError: for an empty search or a bad cursor
+        :return: the rows (with a trailing RANK) and the next page cursor
+        :rtype: Tuple[List[tuple], str]
+        """
+        return self._page(*self._search(text, limit, after))
+
+    def search_rows(self, text: str, limit: int = None,
+                    after: str = None) -> Tuple[List[str], Iterator[tuple], dict]:
+        """Stream one page of search results, like ``rows``.
+
+        :raises ValueError: for an empty search or a bad cursor
+        :return: the column names, the rows and a dict holding ``"next"``
+        :rtype: Tuple[List[str], Iterator[tuple], dict]
+        """
+        cursor, positions, probe, limit = self._search(text, limit, after)
+        state = {}
+        names = [column[0] for column in cursor.description]
+        return names, self._fetch(cursor, positions, probe, limit, state), state
+
+    def _page(self, cursor: sqlite3.Cursor, positions: Tuple[int, ...], probe: Tuple[str, float],
+              limit: int) -> Tuple[List[tuple], str]:
+        state = {}
+        rows = list(self._fetch(cursor, positions, probe, limit, state))
+        return rows, state.get("next")
+
+    def stream(self, method: str, start: str = "none", end: str = "none",
+               limit: int = None, after: str = None, ndjson: bool = False,
+               where: str = None, sort: str = None, fields: str = None) -> Iterator[str]:
+        """Serialize a to-do list incrementally.
+
+        The query runs (and is validated) before the first chunk is produced;
+        rows are then encoded ``FETCH_SIZE`` at a time, so time to first byte
+        and memory do not depend on the size of the result.
+
+        :param ndjson: emit one JSON object per line, followed by a
+            ``{"next": ...}`` line when there is another page; otherwise emit
+            the ``{"data": [...], "next": ...}`` document
+        :type ndjson: bool, optional
+        :raises ValueError: for an unknown method, field, bad dates or a bad cursor
+        :return: chunks of the response body
+        :rtype: Iterator[str]
+        """
+        query = self.build(method, start, end, where, sort, fields, limit)
+        return self._encode(*self._run(query, after), ndjson)
+
+    def stream_search(self, text: str, limit: int = None, after: str = None,
+                      ndjson: bool = False) -> Iterator[str]:
+        """Serialize one page of search results incrementally, like ``stream``."""
+        return self._encode(*self._search(text, limit, after), ndjson)
+
+    def _encode(self, cursor: sqlite3.Cursor, positions: Tuple[int, ...], probe: Tuple[str, float],
+                limit: int, ndjson: bool) -> Iterator[str]:
+        names = [column[0] for column in cursor.description]
+        state = {}
+        return encode_rows(names, self._fetch(cursor, positions, probe, limit, state), state, ndjson)
+
+    def last_change(self) -> int:
+        """Return the sequence number of the latest change, 0 before any."""
+        return self._db_handler.connection().execute(
+            "SELECT IFNULL(MAX(SEQ), 0) FROM TASKS_CHANGES").fetchone()[0]
+
+    def changes(self, since: int = 0, limit: int = None) -> Tuple[List[str], Iterator[tuple], dict]:
+        """Stream the to-dos changed after change number ``since``.
+
+        Every write to TASKS is numbered by a trigger (see migration 7).
+        Each changed to-do is returned once, in the order of its latest
+        change, as a SEQ, an OP (upsert or delete) and its current columns,
+        which are null once deleted. A mirror applies the rows in order and
+        asks again with the returned ``"next"``, so it reads work
+        proportional to what changed rather than to the list. ``since=0``
+        returns every to-do.
+
+        :param since: ``"next"`` of the previous call, defaults to 0
+        :type since: int, optional
+        :param limit: most rows to return, defaults to all
+        :type limit: int, optional
+        :raises ValueError: for a negative ``since`` or a ``limit`` below 1
+        :return: the column names, the lazily fetched rows and a dict whose
+            ``"next"`` holds the SEQ to resume from once the rows are exhausted
+        :rtype: Tuple[List[str], Iterator[tuple], dict]
+        """
+        if since < 0 or (limit is not None and limit < 1):
+            raise ValueError("since must not be negative and limit must be at least 1")
+        started = time.perf_counter()
+        cursor = self._db_handler.connection().execute(_CHANGES, (since, -1 if limit is None else limit))
+        names = [column[0] for column in cursor.description]
+        state = {"next": since}
+        return names, self._changed(cursor, ("changes", time.perf_counter() - started), state), state
+
+    @staticmethod
+    def _changed(cursor: sqlite3.Cursor, probe: Tuple[str, float], state: dict) -> Iterator[tuple]:
+        """Yield change rows, keeping ``state["next"]`` at the last SEQ."""
+        label, elapsed = probe
+        count = 0
+        try:
+            while True:
+                started = time.perf_counter()
+                batch = cursor.fetchmany(FETCH_SIZE)
+                elapsed += time.perf_counter() - started
+                if not batch:
+                    return
+                for row in batch:
+                    state["next"] = row[0]
+                    count += 1
+                    yield row
+        finally:
+            if metrics.enabled:
+                metrics.QUERY_SECONDS.observe(label, elapsed)
+                metrics.QUERY_ROWS.observe(label, count)
+
+    def stream_changes(self, since: int = 0, limit: int = None, ndjson: bool = False) -> Iterator[str]:
+        """Serialize the rows of ``changes`` incrementally, like ``stream``.
+
+        The ``"next"`` of the body is always set, to ``since`` when nothing
+        changed.
+        """
+        return encode_rows(*self.changes(since, limit), ndjson)
+
+    def wait_for_change(self, since: int, timeout: float) -> bool:
+        """Block until a change after ``since`` is committed.
+
+        Commits from any connection or process are seen, at the cost of one
+        ``PRAGMA data_version`` every CHANGES_POLL_SECONDS.
+
+        :param since: sequence number already seen
+        :type since: int
+        :param timeout: most seconds to wait
+        :type timeout: float
+        :return: whether there are changes after ``since``
+        :rtype: bool
+        """
+        deadline = time.monotonic() + timeout
+        generation = None
+        while True:
+            current = self.generation()
+            if current != generation:
+                generation = current
+                if self.last_change() > since:
+                    return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(CHANGES_POLL_SECONDS, remaining))
+
+    def summary(self) -> Dict[str, Any]:
+        """Count the to-dos by state and priority, and the overdue ones.
+
+        Reads the counters kept by the TASKS triggers (see migration 6):
+        a few rows per priority and one per date with open tasks due, so
+        the cost does not depend on the number of to-dos. Open and done
+        leave out deleted to-dos.
+
+        :return: tasks, open, done, deleted and overdue counts, and open
+            and done per priority
+        :rtype: Dict[str, Any]
+        """
+        with metrics.QUERY_SECONDS.time("summary"):
+            # one statement, so both tables are read from the same snapshot
+            rows = self._db_handler.connection().execute(
+                "SELECT PRIORITY, COMPLETE, DELETED, N FROM TASKS_SUMMARY WHERE N != 0 "
+                "UNION ALL SELECT NULL, NULL, NULL, IFNULL(SUM(N), 0) FROM TASKS_OPEN_DUE "
+                "WHERE DUE_DATE < ?", (date.today().isoformat(),)).fetchall()
+        result = {"tasks": 0, "open": 0, "done": 0, "deleted": 0, "overdue": 0}
+        priority: Dict[int, Dict[str, int]] = {}
+        for level, complete, deleted, n in rows:
+            if level is None:
+                result["overdue"] = n
+                continue
+            state = "deleted" if deleted else "done" if complete else "open"
+            result["tasks"] += n
+            result[state] += n
+            if not deleted:
+                counts = priority.setdefault(level, {"priority": level, "open": 0, "done": 0})
+                counts[state] += n
+        result["priority"] = [priority[level] for level in sorted(priority)]
+        return result
+
+    def report(self, weeks: int = 12) -> Dict[str, Any]:
+        """Compute completion, aging, throughput and burndown figures.
+
+        :param weeks: number of weeks of throughput and burndown
+        :type weeks: int, optional
+        :raises ValueError: for fewer than one week
+        :return: the report, see ``todo.report.build``
+        :rtype: Dict[str, Any]
+        """
+        from todo import report
+
+        with metrics.QUERY_SECONDS.time("report"):
+            return report.report(self._db_handler.connection(), weeks=weeks)
+
+    def get(self, method:str='priority', start:str="none", end:str="none",
+            limit: int = None, after: str = None) -> Iterator[tuple]:
+        """Get different types of to-do lists from the database
+        :param method: type of to-do list
+        :type method: str
+        :param start: optional, start date to search 
+        :type start: str
+        :param end: optional, end date to search 
+        :type end: str
+        :param limit: optional, page size
+        :type limit: int
+        :param after: optional, cursor of the next page
+        :type after: str
+        :raises ValueError: for an unknown method, bad dates or a bad cursor
+        :return: returns the database rows as Task records
+        :rtype: Iterator[Task]
+        """
+        rows, _ = self.page(method, start, end, limit, after)
+        return iter(rows)
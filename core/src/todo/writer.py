@@ -0,0 +1,165 @@
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+from todo import metrics
+from todo.database import get_handler
+
+# Most writes committed together, see ``WriteQueue``
+MAX_BATCH = 64
+# Milliseconds the first write of a batch waits for company
+MAX_DELAY_MS = 2.0
+
+
+class _Pending():
+    __slots__ = ("op", "queued", "done", "result", "error")
+
+    def __init__(self, op: Callable[[], Any]) -> None:
+        self.op = op
+        self.queued = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class WriteQueue():
+    """Group commit: run the writes of many threads in shared transactions.
+
+    ``submit`` hands a write to one committer thread and blocks until it is
+    durable. The committer takes the first waiting write, collects more for
+    up to ``max_delay_ms`` or until it has ``max_batch``, and runs them all
+    in one transaction, each in its own savepoint so a failing write is
+    rolled back alone. Its connection uses ``PRAGMA synchronous = FULL``:
+    the fsync that makes the commit survive a power cut is paid once per
+    batch instead of once per write.
+
+    A longer delay or a larger batch buys throughput under load at the cost
+    of latency for a lone writer; ``max_delay_ms = 0`` commits whatever is
+    queued at once.
+    """
+
+    def __init__(self, db_path: Path, max_batch: int = MAX_BATCH,
+                 max_delay_ms: float = MAX_DELAY_MS) -> None:
+        if max_batch < 1 or max_delay_ms < 0:
+            raise ValueError("max_batch must be at least 1 and max_delay_ms not negative")
+        self._handler = get_handler(db_path)
+        self._label = Path(db_path).name
+        self._max_batch = max_batch
+        self._max_delay = max_delay_ms / 1000
+        self._queue: "queue.Queue[Optional[_Pending]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        # why the committer thread died, if it did
+        self._failure: Optional[BaseException] = None
+
+    def submit(self, op: Callable[[], Any]) -> Any:
+        """Run ``op`` in the next group commit and wait for the commit.
+
+        :param op: function doing the write, typically a ``Todoer`` method;
+            it runs on the committer thread inside its transaction
+        :type op: Callable[[], Any]
+        :raises RuntimeError: when the queue has been closed or its
+            committer thread has died
+        :return: what ``op`` returned, once its transaction is committed
+        :rtype: Any
+        """
+        pending = _Pending(op)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("write queue is closed")
+            if self._failure is not None:
+                raise RuntimeError("write queue stopped after an error") from self._failure
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="todo-writer", daemon=True)
+                self._thread.start()
+            self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def close(self) -> None:
+        """Commit the writes already queued and stop the committer thread."""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+            if thread is not None:
+                self._queue.put(None)
+        if thread is not None:
+            thread.join()
+
+    def _run(self) -> None:
+        try:
+            self._handler.connection().execute("PRAGMA synchronous = FULL")
+            self._loop()
+        except BaseException as error:
+            # fail the writes still queued, and refuse new ones, rather than
+            # leave their threads waiting for a committer that is gone
+            with self._lock:
+                self._failure = error
+            while True:
+                try:
+                    pending = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if pending is not None:
+                    self._fail([pending], error)
+            raise
+
+    def _loop(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.perf_counter() + self._max_delay
+            while len(batch) < self._max_batch:
+                try:
+                    remaining = deadline - time.perf_counter()
+                    pending = (self._queue.get(timeout=remaining) if remaining > 0
+                               else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+                if pending is None:
+                    stopping = True
+                    break
+                batch.append(pending)
+            try:
+                self._commit(batch)
+            except BaseException as error:
+                self._fail(batch, error)
+                if not isinstance(error, Exception):
+                    raise
+
+    @staticmethod
+    def _fail(batch: List[_Pending], error: BaseException) -> None:
+        for pending in batch:
+            if not pending.done.is_set():
+                pending.error = error
+                pending.done.set()
+
+    def _commit(self, batch: List[_Pending]) -> None:
+        try:
+            with self._handler.transaction():
+                for pending in batch:
+                    try:
+                        with self._handler.transaction():
+                            pending.result = pending.op()
+                    except Exception as error:
+                        pending.error = error
+        except Exception as error:
+            # the commit itself failed, so none of the batch is durable
+            for pending in batch:
+                if pending.error is None:
+                    pending.error = error
+        finished = time.perf_counter()
+        for pending in batch:
+            pending.done.set()
+        if metrics.enabled:
+            metrics.COMMIT_BATCH.observe(self._label, len(batch))
+            for pending in batch:
+                metrics.WRITE_SECONDS.observe(self._label, finished - pending.queued)
@@ -0,0 +1,46 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# the package lives under core/src rather than the src setup.cfg names
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "core" / "src"))
+
+from todo import database  # noqa: E402
+from todo.todo import Todoer  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Path of a fresh to-do database, its pooled connections closed after the test."""
+    yield tmp_path / "todo.db"
+    database.close_all()
+
+
+def make_tasks(count, start=0):
+    """``count`` tasks for ``Todoer.add_many`` with repeating priorities and due dates."""
+    return [{"name": f"task {i}", "description": f"about {i}", "start_date": "2026-01-01",
+             "due_date": f"2026-02-{1 + i % 5:02d}", "priority": 1 + i % 3,
+             "complete": int(i % 4 == 0), "deleted": int(i % 7 == 0)}
+            for i in range(start, start + count)]
+
+
+@pytest.fixture
+def filled(db_path):
+    """A database holding the 60 tasks of ``make_tasks(60)``."""
+    Todoer(db_path).add_many(make_tasks(60))
+    return db_path
+
+
+@pytest.fixture
+def config_file(tmp_path, db_path, monkeypatch):
+    """A config file naming ``db_path`` as the [General] database, used by the CLI."""
+    from todo import cli, config
+
+    path = tmp_path / "config.ini"
+    path.write_text(f"[General]\ndatabase = {db_path}\n")
+    monkeypatch.setattr(config, "CONFIG_DIR_PATH", tmp_path)
+    monkeypatch.setattr(config, "CONFIG_FILE_PATH", path)
+    monkeypatch.setattr(cli, "_db_paths", {})
+    monkeypatch.setattr(cli, "_selected_list", None)
+    return path
@@ -0,0 +1,110 @@
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from todo import api
+from todo.cache import ResultCache
+
+URL = "/tasks/task_number/none/none"
+NEW_TASK = {"name": "new", "description": "task", "start_date": "2026-01-01",
+            "due_date": "2026-03-01"}
+
+
+@pytest.fixture
+def cache():
+    return ResultCache()
+
+
+@pytest.fixture
+def app(filled, cache):
+    app = api.create_app(filled, cache, lists={"default": filled})
+    yield app
+    app.extensions["todo_writer"].close()
+
+
+def _get(client, url, **headers):
+    response = client.get(url, headers=headers)
+    body = response.get_data(as_text=True)
+    return response, body
+
+
+def _write_elsewhere(db_path, name):
+    """Rename task 2 from a connection of its own, as another process would."""
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("UPDATE TASKS SET NAME = ? WHERE ID = 2", (name,))
+    conn.close()
+
+
+def test_etag_follows_writes_from_other_processes(app, filled):
+    first, body = _get(app.test_client(), URL)
+    etag = first.headers["ETag"]
+    # another worker, with a cache of its own, hands out the same tag
+    other = api.create_app(filled, lists={"default": filled})
+    try:
+        assert _get(other.test_client(), URL)[0].headers["ETag"] == etag
+        assert _get(other.test_client(), URL, **{"If-None-Match": etag})[0].status_code == 304
+    finally:
+        other.extensions["todo_writer"].close()
+
+    # a write by another process changes the tag this one hands out
+    _write_elsewhere(filled, "renamed elsewhere")
+    response, changed = _get(app.test_client(), URL, **{"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert "renamed elsewhere" in changed and "renamed elsewhere" not in body
+
+
+def test_repeat_get_is_not_modified_until_a_write(app):
+    client = app.test_client()
+    first, body = _get(client, URL)
+    etag = first.headers["ETag"]
+    again, empty = _get(client, URL, **{"If-None-Match": etag})
+    assert (again.status_code, empty) == (304, "")
+    assert again.headers["ETag"] == etag
+
+    assert client.post("/tasks", json=NEW_TASK).status_code == 201
+    changed, new_body = _get(client, URL, **{"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag and new_body != body
+    assert _get(client, URL, **{"If-None-Match": changed.headers["ETag"]})[0].status_code == 304
+
+
+def test_if_modified_since_sees_a_write_in_the_same_second(app, monkeypatch):
+    clock = [1767225600.2]  # 2026-01-01 00:00:00.2 UTC
+    monkeypatch.setattr(time, "time", lambda: clock[0])
+    client = app.test_client()
+    assert client.post("/tasks", json=NEW_TASK).status_code == 201
+    clock[0] += 0.1
+    first, _ = _get(client, URL)
+    # the second is not over: rounded down, so the header never validates
+    assert first.last_modified == datetime.fromtimestamp(1767225600, timezone.utc)
+
+    clock[0] += 0.4
+    assert client.post("/tasks", json=NEW_TASK).status_code == 201
+    since = {"If-Modified-Since": first.headers["Last-Modified"]}
+    response, body = _get(client, URL, **since)
+    assert response.status_code == 200 and body.count('"new"') == 2
+
+    # once the second is over the stamp rounds up and validates
+    clock[0] += 2
+    settled, _ = _get(client, URL)
+    assert settled.last_modified == datetime.fromtimestamp(1767225601, timezone.utc)
+    since = {"If-Modified-Since": settled.headers["Last-Modified"]}
+    assert _get(client, URL, **since)[0].status_code == 304
+
+
+def test_newer_generation_evicts_the_cached_body(app, cache, filled):
+    client = app.test_client()
+    _, body = _get(client, URL)
+    assert len(cache) == 1
+    assert _get(client, URL)[1] == body  # served from the cache
+
+    _write_elsewhere(filled, "renamed elsewhere")
+    _, fresh = _get(client, URL)
+    assert "renamed elsewhere" in fresh and "renamed elsewhere" not in body
+    # the stale entry was dropped and the fresh body stored in its place
+    assert len(cache) == 1
+    assert _get(client, URL)[1] == fresh
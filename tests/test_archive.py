@@ -0,0 +1,117 @@
+import sqlite3
+from datetime import date
+
+import pytest
+
+from conftest import make_tasks
+from test_database import BASELINE
+from todo import archive, database
+from todo.todo import List, Todoer
+
+TODAY = date(2026, 3, 1)
+# deleted, or completed and due by TODAY: every completed task of make_tasks
+DEAD = "DELETED = 1 OR COMPLETE = 1"
+
+
+def _query(db_path, sql, params=()):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def _consistent(db_path):
+    """Check the search index and counters of a database against its TASKS."""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("INSERT INTO TASKS_FTS (TASKS_FTS, rank) VALUES ('integrity-check', 1)")
+    finally:
+        conn.close()
+    assert Todoer(db_path).rebuild_summary() == 0
+    summary = List(db_path).summary()
+    assert summary["tasks"] == _query(db_path, "SELECT COUNT(*) FROM TASKS")[0][0]
+
+
+def _compact(db_path, **options):
+    options.setdefault("batch_rows", 4)
+    return archive.compact(db_path, archive.Policy(closed_days=0), today=TODAY, **options)
+
+
+def test_compact_moves_rows_and_keeps_both_databases_consistent(filled):
+    dead = _query(filled, f"SELECT * FROM TASKS WHERE {DEAD} ORDER BY ID")
+    live = _query(filled, f"SELECT * FROM TASKS WHERE NOT ({DEAD}) ORDER BY ID")
+    result = _compact(filled)
+    assert result.archived == len(dead) > 0
+
+    target = archive.archive_path(filled)
+    assert _query(filled, "SELECT * FROM TASKS ORDER BY ID") == live
+    assert _query(target, "SELECT * FROM TASKS ORDER BY ID") == dead
+    for db_path in (filled, target):
+        _consistent(db_path)
+    # archived tasks can still be searched, except the deleted ones as usual
+    found = {row[0] for row in List(target).search("task")[0]}
+    assert found == {row[0] for row in dead if not row[7]}
+    assert _compact(filled).archived == 0
+
+
+def test_compact_rerun_after_an_interrupted_run_leaves_no_duplicates(filled):
+    dead_ids = [row[0] for row in _query(filled, f"SELECT ID FROM TASKS WHERE {DEAD} ORDER BY ID")]
+    conn = sqlite3.connect(filled)
+    with conn:
+        conn.execute(f"CREATE TRIGGER INTERRUPT BEFORE DELETE ON TASKS WHEN old.ID = {dead_ids[-3]} "
+                     "BEGIN SELECT RAISE(ABORT, 'interrupted'); END")
+    with pytest.raises(sqlite3.IntegrityError):
+        _compact(filled)
+    with conn:
+        conn.execute("DROP TRIGGER INTERRUPT")
+    conn.close()
+    target = archive.archive_path(filled)
+    moved = len(_query(target, "SELECT ID FROM TASKS"))
+    assert 0 < moved < len(dead_ids)
+
+    # a stale copy of a task not archived yet
+    copy = sqlite3.connect(target)
+    with copy:
+        copy.execute("INSERT INTO TASKS VALUES (?, 'stale', 'copy', '2026-01-01', '2026-01-01', 1, 1, 1)",
+                     (dead_ids[-1],))
+    copy.close()
+
+    assert _compact(filled).archived == len(dead_ids) - moved
+    archived = _query(target, "SELECT ID, NAME FROM TASKS ORDER BY ID")
+    assert [row[0] for row in archived] == dead_ids
+    assert "stale" not in [row[1] for row in archived]
+    _consistent(target)
+
+
+def test_trim_changes_keeps_the_latest_change_of_each_task(filled):
+    todo = Todoer(filled)
+    todo.rename(3, "once")
+    todo.rename(3, "twice")
+    todo.set_done(4)
+    todo.remove(5)
+    latest = _query(filled, "SELECT ID, MAX(SEQ) FROM TASKS_CHANGES GROUP BY ID ORDER BY ID")
+    handler = database.get_handler(filled)
+    assert archive._trim_changes(handler, 3) == 4
+    assert _query(filled, "SELECT ID, SEQ FROM TASKS_CHANGES ORDER BY ID") == latest
+    assert archive._trim_changes(handler, 3) == 0
+
+
+def test_compact_without_full_leaves_a_non_incremental_file_alone(db_path):
+    # created before incremental auto-vacuum was enabled
+    conn = sqlite3.connect(db_path)
+    conn.execute(BASELINE)
+    conn.close()
+    Todoer(db_path).add_many(make_tasks(200))
+    assert _query(db_path, "PRAGMA auto_vacuum") == [(0,)]
+
+    result = _compact(db_path, full=False)
+    assert result.archived > 0 and result.freed_pages == 0
+    assert _query(db_path, "PRAGMA auto_vacuum") == [(0,)]
+    assert _query(db_path, "PRAGMA freelist_count")[0][0] > 0
+
+    Todoer(db_path).remove_many([(1, 200)])
+    result = _compact(db_path, full=True)
+    assert result.freed_pages > 0
+    assert _query(db_path, "PRAGMA auto_vacuum") == [(2,)]
+    assert _query(db_path, "PRAGMA freelist_count") == [(0,)]
@@ -0,0 +1,67 @@
+import sqlite3
+
+import pytest
+from typer.testing import CliRunner
+
+from todo import cli
+
+
+def _invoke(*args, **kwargs):
+    return CliRunner().invoke(cli.app, list(args), **kwargs)
+
+
+def _ids(db_path, where):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {row[0] for row in conn.execute(f"SELECT ID FROM TASKS WHERE {where}")}
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("ids", [["5-40"], ["40-5"], ["5-20", "21-40", "30"]])
+def test_complete_ranges(filled, config_file, ids):
+    done = _ids(filled, "COMPLETE = 1")
+    result = _invoke("complete", *ids)
+    assert result.exit_code == 0, result.output
+    assert f"{len(set(range(5, 41)) - done)} to-do(s) completed!" in result.output
+    assert _ids(filled, "COMPLETE = 1") == done | set(range(5, 41))
+
+
+def test_complete_one_and_by_filter(filled, config_file):
+    assert "to-do # 2 completed!" in _invoke("complete", "2").output
+    result = _invoke("complete", "--where", "priority=3 and open")
+    assert result.exit_code == 0
+    assert not _ids(filled, "PRIORITY = 3 AND COMPLETE = 0 AND DELETED = 0")
+    assert "0 to-do(s) completed!" in _invoke("complete", "1000-2000").output
+
+
+@pytest.mark.parametrize("args", [[], ["five"], ["--where", "colour=red"]])
+def test_complete_rejects_bad_selections(filled, config_file, args):
+    done = _ids(filled, "COMPLETE = 1")
+    assert _invoke("complete", *args).exit_code == 1
+    assert _ids(filled, "COMPLETE = 1") == done
+
+
+def test_remove_asks_first(filled, config_file):
+    live = _ids(filled, "DELETED = 0")
+    result = _invoke("remove", "40-30", "--where", "done", input="n\n")
+    assert "Delete to-dos 30-40 and where \"done\"?" in result.output
+    assert "Operation canceled" in result.output
+    assert _ids(filled, "DELETED = 0") == live
+
+    selected = set(range(30, 41)) | _ids(filled, "COMPLETE = 1")
+    result = _invoke("remove", "40-30", "--where", "done", "--yes")
+    assert f"{len(selected & live)} to-do(s) removed" in result.output
+    assert _ids(filled, "DELETED = 0") == live - selected
+    assert "0 to-do(s) removed" in _invoke("remove", "--where", "priority=9", "-y").output
+
+
+def test_compact_reports_database_errors(filled, config_file):
+    conn = sqlite3.connect(filled)
+    with conn:
+        conn.execute("CREATE TRIGGER INTERRUPT BEFORE DELETE ON TASKS "
+                     "BEGIN SELECT RAISE(ABORT, 'disk full'); END")
+    conn.close()
+    result = _invoke("compact", "--closed-days", "0")
+    assert result.exit_code == 1
+    assert "disk full" in result.output and not isinstance(result.exception, sqlite3.Error)
@@ -0,0 +1,27 @@
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from todo import cli, config
+
+
+def test_init_keeps_the_other_sections(tmp_path, config_file):
+    config_file.write_text("[General]\ndatabase = old.db\n\n"
+                           "[Lists]\nwork = /srv/work_todo.db\n\n"
+                           "[Server]\nport = 8080\n\n"
+                           "[Archive]\nclosed_days = never\n")
+    new_db = tmp_path / "new.db"
+    result = CliRunner().invoke(cli.app, ["init", "--db-path", str(new_db)])
+    assert result.exit_code == 0, result.output
+
+    lists = config.get_lists(config_file)
+    assert lists == {config.DEFAULT_LIST: new_db, "work": Path("/srv/work_todo.db")}
+    assert config.get_server_config(config_file).port == 8080
+    assert config.get_archive_policy(config_file).closed_days is None
+    assert cli.get_db_path() == new_db
+
+
+def test_init_writes_a_new_config_file(tmp_path, config_file):
+    config_file.unlink()
+    assert config._create_database(str(tmp_path / "todo.db")) == 0
+    assert config.get_lists(config_file) == {config.DEFAULT_LIST: tmp_path / "todo.db"}
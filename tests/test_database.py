@@ -0,0 +1,133 @@
+import sqlite3
+import threading
+
+import pytest
+
+from todo import database
+from todo.todo import List, Todoer
+
+# TASKS as created before the schema was versioned
+BASELINE = """CREATE TABLE TASKS
+         (ID INTEGER PRIMARY KEY AUTOINCREMENT,
+         NAME TEXT NOT NULL,
+         DESCRIPTION TEXT NOT NULL,
+         START_DATE DATE,
+         DUE_DATE DATE,
+         PRIORITY INT,
+         COMPLETE INT,
+         DELETED INT);"""
+
+
+@pytest.fixture
+def baseline(db_path):
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute(BASELINE)
+    conn.executemany("INSERT INTO TASKS (NAME, DESCRIPTION, START_DATE, DUE_DATE, PRIORITY, "
+                     "COMPLETE, DELETED) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     [("buy milk", "semi-skimmed", "2026-01-01 00:00:00", "2999-01-05 00:00:00", 1, 0, 0),
+                      ("file taxes", "before the deadline", "2026-01-01 00:00:00", "2026-01-31 00:00:00", 3, 1, 0),
+                      ("old idea", "never mind", "2026-01-01 00:00:00", "2999-01-05 00:00:00", 2, 0, 1)])
+    yield conn
+    conn.close()
+
+
+def test_migrate_baseline_database(db_path, baseline):
+    assert database.migrate(baseline) == 0
+    assert baseline.execute("PRAGMA user_version").fetchone()[0] == database.SCHEMA_VERSION
+    # the dates lose their time, the rows keep their IDs
+    assert baseline.execute("SELECT ID, START_DATE, DUE_DATE FROM TASKS ORDER BY ID").fetchall() == [
+        (1, "2026-01-01", "2999-01-05"), (2, "2026-01-01", "2026-01-31"), (3, "2026-01-01", "2999-01-05")]
+
+    todo_list = List(db_path)
+    assert [row[0] for row in todo_list.search("milk")[0]] == [1]
+    summary = todo_list.summary()
+    assert (summary["tasks"], summary["open"], summary["done"], summary["deleted"]) == (3, 1, 1, 1)
+    assert summary["overdue"] == 0
+    assert Todoer(db_path).rebuild_summary() == 0
+    names, rows, state = todo_list.changes()
+    assert [(row[1], row[2]) for row in rows] == [("upsert", 1), ("upsert", 2), ("upsert", 3)]
+    assert state["next"] == 3
+
+
+def test_migrate_is_a_no_op_when_current(baseline):
+    database.migrate(baseline)
+    schema = baseline.execute("SELECT sql FROM sqlite_master ORDER BY name").fetchall()
+    assert database.migrate(baseline) == database.SCHEMA_VERSION
+    assert baseline.execute("SELECT sql FROM sqlite_master ORDER BY name").fetchall() == schema
+    assert baseline.execute("SELECT COUNT(*) FROM TASKS_CHANGES").fetchone()[0] == 3
+
+
+def test_migrate_from_an_intermediate_version(baseline):
+    for version in range(3):
+        for statement in database.MIGRATIONS[version]:
+            baseline.execute(statement)
+    baseline.execute("PRAGMA user_version = 3")
+    assert database.migrate(baseline) == 3
+    assert baseline.execute("SELECT COUNT(*) FROM TASKS_FTS WHERE TASKS_FTS MATCH 'taxes'").fetchone()[0] == 1
+    assert baseline.execute("SELECT SUM(N) FROM TASKS_SUMMARY").fetchone()[0] == 3
+
+
+def test_failed_migration_leaves_the_previous_version(baseline, monkeypatch):
+    monkeypatch.setattr(database, "MIGRATIONS", database.MIGRATIONS + (("NOT SQL",),))
+    monkeypatch.setattr(database, "SCHEMA_VERSION", len(database.MIGRATIONS))
+    with pytest.raises(sqlite3.OperationalError):
+        database.migrate(baseline)
+    assert baseline.execute("PRAGMA user_version").fetchone()[0] == 0
+    assert baseline.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'TASKS_FTS'").fetchone()[0] == 0
+
+
+def _names(conn):
+    return [row[0] for row in conn.execute("SELECT NAME FROM TASKS ORDER BY ID")]
+
+
+def _insert(conn, name):
+    conn.execute("INSERT INTO TASKS (NAME, DESCRIPTION) VALUES (?, '')", (name,))
+
+
+def test_each_thread_keeps_its_own_connection(db_path):
+    handler = database.get_handler(db_path)
+    conn = handler.connection()
+    assert handler.connection() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    others = []
+    thread = threading.Thread(target=lambda: others.extend([handler.connection(), handler.connection()]))
+    thread.start()
+    thread.join()
+    assert others[0] is others[1] and others[0] is not conn
+
+
+def test_nested_transaction_rolls_back_alone(db_path):
+    handler = database.get_handler(db_path)
+    generation = handler.generation()
+    with handler.transaction() as conn:
+        _insert(conn, "outer")
+        with pytest.raises(ValueError):
+            with handler.transaction() as inner:
+                _insert(inner, "inner")
+                raise ValueError("undo the savepoint")
+        with handler.transaction() as inner:
+            _insert(inner, "kept")
+    assert _names(handler.connection()) == ["outer", "kept"]
+    # one commit, one new generation
+    assert handler.generation() == generation + 1
+
+    with pytest.raises(ValueError):
+        with handler.transaction() as conn:
+            with handler.transaction() as inner:
+                _insert(inner, "released, then rolled back")
+            raise ValueError("undo everything")
+    assert _names(handler.connection()) == ["outer", "kept"]
+    assert not handler.connection().in_transaction
+
+
+def test_close_all_releases_the_handlers(tmp_path, db_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    handler = database.get_handler(db_path)
+    assert database.get_handler(db_path.name) is handler
+    conn = handler.connection()
+    database.close_all()
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+    fresh = database.get_handler(db_path)
+    assert fresh is not handler
+    assert fresh.connection().execute("SELECT COUNT(*) FROM TASKS").fetchone() == (0,)
@@ -0,0 +1,103 @@
+import csv
+import gzip
+import io
+import json
+import lzma
+from importlib.util import find_spec
+
+import pytest
+from typer.testing import CliRunner
+
+from todo import api, cli, export
+from todo.todo import List, Todoer
+
+needs_pyarrow = pytest.mark.skipif(find_spec("pyarrow") is None, reason="needs pyarrow")
+
+FORMATS = [
+    ("csv", None, "tasks.csv"),
+    ("csv", "gzip", "tasks.csv.gz"),
+    ("jsonl", None, "tasks.jsonl"),
+    ("jsonl", "xz", "tasks.ndjson.xz"),
+    pytest.param("parquet", None, "tasks.parquet", marks=needs_pyarrow),
+    pytest.param("parquet", "zstd", "tasks.pq", marks=needs_pyarrow),
+    pytest.param("feather", None, "tasks.feather", marks=needs_pyarrow),
+    pytest.param("feather", "lz4", "tasks.arrow", marks=needs_pyarrow),
+]
+
+
+@pytest.fixture
+def tasks(filled):
+    # values the text formats have to quote or escape
+    Todoer(filled).add('comma, "quoted"', "two\nlines – ünïcode", "2026-01-01", "2026-03-01", 1)
+    return filled
+
+
+def _read(data, fmt, compression):
+    """Parse an export back into (names, rows)."""
+    if fmt in ("csv", "jsonl"):
+        data = {"gzip": gzip.decompress, "xz": lzma.decompress}.get(compression, bytes)(data)
+        text = data.decode("utf-8")
+        if fmt == "csv":
+            names, *rows = csv.reader(io.StringIO(text, newline=""))
+            return names, [tuple(row) for row in rows]
+        objects = [json.loads(line) for line in text.splitlines()]
+        return list(objects[0]), [tuple(obj.values()) for obj in objects]
+    import pyarrow.feather
+    import pyarrow.parquet
+
+    read = pyarrow.parquet.read_table if fmt == "parquet" else pyarrow.feather.read_table
+    table = read(io.BytesIO(data))
+    return table.column_names, list(zip(*(column.to_pylist() for column in table.columns)))
+
+
+def _expected(db_path, fmt, **options):
+    todo_list = List(db_path)
+    query = todo_list.build(options.get("method", "task_number"), "none", "none",
+                            options.get("where"), None, options.get("columns"))
+    names, rows, _ = todo_list.rows(query)
+    names = names[:len(query.columns)] if query.columns else names
+    rows = [tuple(row[:len(names)]) for row in rows]
+    if fmt == "csv":
+        rows = [tuple("" if value is None else str(value) for value in row) for row in rows]
+    return names, rows
+
+
+@pytest.mark.parametrize("fmt, compression, name", FORMATS)
+def test_export_round_trip(tasks, fmt, compression, name):
+    todo_list = List(tasks)
+    names, rows, _ = todo_list.rows(todo_list.build("task_number", "none", "none", None, None, None))
+    file = io.BytesIO()
+    assert export.write(rows, names, file, fmt, compression) == 61
+    assert _read(file.getvalue(), fmt, compression) == _expected(tasks, fmt)
+
+
+@pytest.mark.parametrize("fmt, compression, name", FORMATS)
+def test_export_command_guesses_the_format(tasks, config_file, tmp_path, fmt, compression, name):
+    path = tmp_path / name
+    result = CliRunner().invoke(cli.app, ["export", str(path), "--where", "open and priority=1",
+                                          "--columns", "name,due"])
+    assert result.exit_code == 0, result.output
+    expected = _expected(tasks, fmt, where="open and priority=1", columns="name,due")
+    assert 0 < len(expected[1]) == int(result.output.split()[0])
+    assert _read(path.read_bytes(), fmt, compression) == expected
+
+
+@pytest.mark.parametrize("fmt, compression, name", FORMATS)
+def test_export_endpoint_streams_the_file(tasks, fmt, compression, name):
+    app = api.create_app(tasks, lists={"default": tasks})
+    try:
+        url = f"/export?format={fmt}&method=priority" + (f"&compression={compression}" if compression else "")
+        response = app.test_client().get(url)
+        data = response.get_data()
+    finally:
+        app.extensions["todo_writer"].close()
+    assert response.status_code == 200
+    assert response.mimetype == export.MIMETYPES[fmt]
+    assert _read(data, fmt, compression) == _expected(tasks, fmt, method="priority")
+
+
+@pytest.mark.parametrize("args", [["--format", "xml"], ["--compression", "zstd"]])
+def test_export_command_rejects_bad_options(tasks, config_file, tmp_path, args):
+    result = CliRunner().invoke(cli.app, ["export", str(tmp_path / "tasks.csv"), *args])
+    assert result.exit_code == 1
+    assert "Export failed" in result.output
@@ -0,0 +1,107 @@
+import sqlite3
+from itertools import product
+
+import pytest
+
+from todo.query import Predicate, Query, _seek, parse_where
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE TASKS (ID INTEGER PRIMARY KEY, NAME TEXT, DESCRIPTION TEXT, "
+                 "START_DATE DATE, DUE_DATE DATE, PRIORITY INT, COMPLETE INT, DELETED INT)")
+    # repeated priorities and dates, so ties are broken by the next key
+    conn.executemany("INSERT INTO TASKS VALUES (?, ?, '', '2026-01-01', ?, ?, ?, 0)",
+                     [(i, f"task {i}", f"2026-02-{1 + i % 4:02d}", 1 + i % 3, i % 2)
+                      for i in range(1, 41)])
+    yield conn
+    conn.close()
+
+
+def _rows(conn, query, after=None):
+    sql, params = query.compile(after)
+    return conn.execute(sql, params).fetchall()
+
+
+@pytest.mark.parametrize("directions", list(product(["ASC", "DESC"], repeat=3)))
+def test_seek_resumes_strictly_after_the_key(conn, directions):
+    order = tuple(zip(("PRIORITY", "DUE_DATE", "ID"), directions))
+    query = Query(order=order)
+    everything = _rows(conn, query)
+    keys = [5, 4, 0]
+    for i, row in enumerate(everything):
+        assert _rows(conn, query, [row[k] for k in keys]) == everything[i + 1:]
+
+
+@pytest.mark.parametrize("directions", list(product(["ASC", "DESC"], repeat=3)))
+def test_seek_pages_through_null_keys(conn, directions):
+    # every third task has no priority and every fourth no due date
+    conn.execute("UPDATE TASKS SET PRIORITY = NULL WHERE ID % 3 = 0")
+    conn.execute("UPDATE TASKS SET DUE_DATE = NULL WHERE ID % 4 = 0")
+    order = tuple(zip(("PRIORITY", "DUE_DATE", "ID"), directions))
+    query = Query(order=order)
+    everything = _rows(conn, query)
+    assert len(everything) == 40
+    for i, row in enumerate(everything):
+        assert _rows(conn, query, [row[5], row[4], row[0]]) == everything[i + 1:]
+
+    rows, after = [], None
+    while True:
+        page = _rows(conn, query.take(6), after)
+        rows += page[:6]
+        if len(page) <= 6:
+            break
+        after = [page[5][5], page[5][4], page[5][0]]
+    assert rows == everything
+
+
+def test_seek_uses_a_row_value_when_nulls_cannot_be_skipped():
+    seek = _seek((("PRIORITY", "ASC"), ("ID", "ASC")), [2, 9])
+    assert seek == Predicate("(PRIORITY, ID) > (?, ?)", (2, 9))
+    assert _seek((("ID", "DESC"),), [9]) == Predicate("(ID) < (?)", (9,))
+    # NULLs sort last in a descending key, so they need their own branch
+    descending = _seek((("PRIORITY", "DESC"), ("ID", "DESC")), [2, 9])
+    assert descending.sql == "(((PRIORITY < ? OR PRIORITY IS NULL)) OR (PRIORITY = ? AND ID < ?))"
+    assert descending.params == (2, 2, 9)
+    after_null = _seek((("PRIORITY", "ASC"), ("ID", "ASC")), [None, 9])
+    assert after_null == Predicate("((PRIORITY IS NOT NULL) OR (PRIORITY IS NULL AND ID > ?))", (9,))
+
+
+def test_compile_appends_id_and_limit(conn):
+    query = Query().filter("priority=2").order_by("-due").select("name").take(3)
+    sql, params = query.compile()
+    assert sql == ("SELECT NAME, DUE_DATE, ID FROM TASKS WHERE PRIORITY = ? "
+                   "ORDER BY DUE_DATE DESC, ID DESC LIMIT ?")
+    assert params == (2, 4)
+    with pytest.raises(ValueError):
+        query.compile([1])
+
+
+def test_parse_where_flags_and_comparisons():
+    predicate = parse_where("open and not done and priority>=2 AND due<2026-03-01")
+    assert predicate.sql == ("(COMPLETE = 0 AND DELETED = 0) AND NOT (COMPLETE = 1) "
+                             "AND PRIORITY >= ? AND DUE_DATE < ?")
+    assert predicate.params == (2, "2026-03-01")
+
+
+@pytest.mark.parametrize("text", ["colour=red", "priority=high", "due<soon", "priority~2", "and"])
+def test_parse_where_rejects(text):
+    with pytest.raises(ValueError):
+        parse_where(text)
+
+
+def test_contains_keeps_quoted_and(conn):
+    conn.execute("INSERT INTO TASKS (ID, NAME, COMPLETE, DELETED) VALUES (100, 'salt and pepper', 0, 0)")
+    predicate = parse_where('name~"salt and pepper" and open')
+    assert predicate.params == ("%salt and pepper%",)
+    assert _rows(conn, Query().filter(predicate).select("id")) == [(100,)]
+
+
+@pytest.mark.parametrize("value, expected", [("100%", ["100% done"]), ("a_b", ["a_b"]),
+                                             ("c:\\x", ["c:\\x"])])
+def test_contains_matches_wildcards_literally(conn, value, expected):
+    conn.executemany("INSERT INTO TASKS (NAME) VALUES (?)",
+                     [("100% done",), ("1000 done",), ("a_b",), ("axb",), ("c:\\x",)])
+    rows = _rows(conn, Query().filter(f"name~{value}").select("name"))
+    assert [row[0] for row in rows] == expected
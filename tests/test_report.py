@@ -0,0 +1,104 @@
+import json
+import sqlite3
+from datetime import date
+
+import pytest
+from typer.testing import CliRunner
+
+from todo import api, cli, database, report
+from todo.todo import List
+
+TODAY = date(2026, 3, 4)  # a Wednesday; its week starts on 2026-03-02
+
+# (due date, priority, complete, deleted)
+TASKS = [
+    ("2026-03-03", 1, 0, 0),  # 1 day overdue
+    ("2026-02-01", 2, 0, 0),  # 31 days overdue
+    ("2026-02-20", 1, 1, 0),
+    ("2026-03-10", 3, 0, 0),  # due next week
+    ("2025-10-01", 2, 0, 0),  # 154 days overdue
+    ("2026-03-01", 1, 0, 1),  # deleted: left out
+    ("2026-03-02", 2, 1, 0),
+    (None, None, 0, 0),       # no due date, no priority
+]
+
+
+@pytest.fixture
+def small(db_path):
+    database.init_database(db_path)
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.executemany("INSERT INTO TASKS (NAME, DESCRIPTION, START_DATE, DUE_DATE, PRIORITY, "
+                         "COMPLETE, DELETED) VALUES ('t', 'd', '2025-01-01', ?, ?, ?, ?)", TASKS)
+    conn.close()
+    return db_path
+
+
+def _report(db_path, **options):
+    conn = sqlite3.connect(db_path)
+    try:
+        return report.report(conn, **options)
+    finally:
+        conn.close()
+
+
+def test_report_figures(small):
+    result = _report(small, today=TODAY, weeks=2)
+    assert result["date"] == "2026-03-04"
+    assert result["summary"] == {"tasks": 7, "complete": 2, "open": 5,
+                                 "completion_rate": 0.2857, "overdue": 3}
+    assert result["priority"] == [
+        {"priority": 0, "tasks": 1, "complete": 0, "completion_rate": 0.0},
+        {"priority": 1, "tasks": 2, "complete": 1, "completion_rate": 0.5},
+        {"priority": 2, "tasks": 3, "complete": 1, "completion_rate": 0.3333},
+        {"priority": 3, "tasks": 1, "complete": 0, "completion_rate": 0.0},
+    ]
+    assert result["aging"] == [{"days": "1-7", "tasks": 1}, {"days": "8-30", "tasks": 0},
+                               {"days": "31-90", "tasks": 1}, {"days": "90+", "tasks": 1}]
+    # by the week of the due date, the older completed task falls outside
+    assert result["throughput"] == [{"week": "2026-02-23", "1": 0, "2": 0, "3": 0},
+                                    {"week": "2026-03-02", "1": 0, "2": 1, "3": 0}]
+    assert result["burndown"] == [
+        {"week": "2026-02-23", "scope": 3, "completed": 1, "remaining": 2},
+        {"week": "2026-03-02", "scope": 5, "completed": 2, "remaining": 3},
+    ]
+
+
+def test_report_of_an_empty_database(db_path):
+    database.init_database(db_path)
+    result = _report(db_path, today=TODAY, weeks=3)
+    assert result["summary"] == {"tasks": 0, "complete": 0, "open": 0,
+                                 "completion_rate": 0.0, "overdue": 0}
+    assert result["priority"] == []
+    assert [row["tasks"] for row in result["aging"]] == [0, 0, 0, 0]
+    assert result["throughput"] == [{"week": week} for week in ("2026-02-16", "2026-02-23", "2026-03-02")]
+    assert {(row["scope"], row["completed"]) for row in result["burndown"]} == {(0, 0)}
+    for title, names, rows in report.tables(result):
+        assert all(len(row) == len(names) for row in rows)
+
+
+def test_report_rejects_no_weeks(small):
+    with pytest.raises(ValueError):
+        List(small).report(0)
+
+
+@pytest.mark.parametrize("tasks", ["small", "empty"])
+def test_report_command_and_endpoint(request, db_path, config_file, tasks):
+    if tasks == "small":
+        request.getfixturevalue("small")
+    else:
+        database.init_database(db_path)
+    expected = _report(db_path, weeks=4)
+    result = CliRunner().invoke(cli.app, ["report", "--weeks", "4", "--json"])
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.output) == expected
+    result = CliRunner().invoke(cli.app, ["report", "--weeks", "4"])
+    assert result.exit_code == 0 and "Burndown" in result.output
+
+    app = api.create_app(db_path, lists={"default": db_path})
+    try:
+        response = app.test_client().get("/tasks/report?weeks=4")
+        assert response.status_code == 200
+        assert response.get_json() == expected
+    finally:
+        app.extensions["todo_writer"].close()
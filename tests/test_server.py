@@ -0,0 +1,54 @@
+import os
+import sqlite3
+
+import pytest
+
+from todo import database, server
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+
+
+def _child(write_lock, release: bool) -> int:
+    """Fork a process that takes the lock and exits, returning its pid once it has."""
+    pid = os.fork()
+    if pid == 0:
+        write_lock.acquire()
+        if release:
+            write_lock.release()
+        os._exit(0)
+    os.waitpid(pid, 0)
+    return pid
+
+
+def test_lock_of_a_dead_process_is_replaced(db_path, monkeypatch):
+    lock = server._WriteLock()
+    state = {"write_lock": lock, "reload": False}
+    pid = _child(lock, release=False)
+    assert lock.owner == pid
+    assert not lock.acquire(timeout=0.05)
+
+    # writers waiting on the orphaned lock give up instead of hanging
+    monkeypatch.setattr(database, "BUSY_TIMEOUT_MS", 50)
+    database.set_write_lock(lock)
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            with database.write_locked():
+                pass
+    finally:
+        database.set_write_lock(None)
+
+    assert server._replace_orphaned_lock(state, pid)
+    assert state["reload"] and state["write_lock"] is not lock
+    assert state["write_lock"].owner == 0
+    assert state["write_lock"].acquire(timeout=0.05)
+    state["write_lock"].release()
+
+
+def test_lock_released_before_exit_is_kept():
+    lock = server._WriteLock()
+    state = {"write_lock": lock, "reload": False}
+    pid = _child(lock, release=True)
+    assert lock.owner == 0
+    assert not server._replace_orphaned_lock(state, pid)
+    assert not server._replace_orphaned_lock(state, 0)
+    assert state == {"write_lock": lock, "reload": False}
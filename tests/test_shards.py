@@ -0,0 +1,52 @@
+import pytest
+
+from conftest import make_tasks
+from todo.shards import Shards
+from todo.todo import List, Todoer
+
+
+@pytest.fixture
+def shards(tmp_path, db_path):
+    lists = {"home": db_path, "work": tmp_path / "work.db", "empty": tmp_path / "empty.db"}
+    Todoer(lists["home"]).add_many(make_tasks(45))
+    Todoer(lists["work"]).add_many(make_tasks(30, start=100))
+    Todoer(lists["empty"])
+    return lists
+
+
+def _merged(shards, query, after=None):
+    names, rows, state = Shards(shards).rows(query, after)
+    return names, list(rows), state.get("next")
+
+
+@pytest.mark.parametrize("sort", [None, "-priority", "due,-priority", "-done,name"])
+@pytest.mark.parametrize("limit", [1, 8, 75, 200])
+def test_merged_pages_cover_every_list_once_in_order(shards, sort, limit):
+    query = List.build("task_number", sort=sort)
+    names, everything, following = _merged(shards, query)
+    assert names[0] == "LIST" and following is None
+    assert len(everything) == 75
+    assert {(row[0], row[1]) for row in everything} == (
+        {("home", i) for i in range(1, 46)} | {("work", i) for i in range(1, 31)})
+    for name, path in shards.items():
+        # each list keeps its own order within the merge
+        own = [row[1:] for row in everything if row[0] == name]
+        assert own == [tuple(row) for row in List(path).run(query)[0]]
+
+    rows, after = [], None
+    while True:
+        _, page, after = _merged(shards, query.take(limit), after)
+        assert len(page) <= limit
+        rows += page
+        if after is None:
+            break
+    assert rows == everything
+
+
+def test_cursor_must_match_the_lists(shards):
+    query = List.build("task_number", limit=5)
+    _, _, after = _merged(shards, query)
+    with pytest.raises(ValueError):
+        _merged({"home": shards["home"]}, query, after)
+    with pytest.raises(ValueError):
+        Shards({})
@@ -0,0 +1,104 @@
+import sqlite3
+
+import pytest
+from typer.testing import CliRunner
+
+from todo import cli, database, shell
+
+
+def _done(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in conn.execute("SELECT ID FROM TASKS WHERE COMPLETE = 1 ORDER BY ID")]
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def script(tmp_path):
+    def write(*lines):
+        path = tmp_path / "script.todo"
+        path.write_text("\n".join(lines) + "\n")
+        return str(path)
+    return write
+
+
+def test_rollback_undoes_the_commands_since_begin(filled, config_file):
+    session = shell.Session()
+    before = _done(filled)
+    assert session.execute("begin") == 0
+    assert session.execute("complete 2 3") == 0
+    assert session.execute("rollback") == 0
+    assert _done(filled) == before
+    assert session.execute("rollback") == 1
+    assert session.execute("begin") == 0
+    assert session.execute("complete 2") == 0
+    assert session.execute("commit") == 0
+    assert _done(filled) == sorted(before + [2])
+    assert not session.close()
+
+
+def test_failing_command_in_a_transaction_keeps_the_others(filled, config_file):
+    session = shell.Session()
+    session.execute("begin")
+    assert session.execute("complete 2") == 0
+    assert session.execute("complete --where colour=red") != 0
+    assert session.execute("# a comment") == 0
+    assert session.execute("shell") == 2
+    assert session.close()
+    session.execute("begin")
+    session.execute("complete 2")
+    session.execute("complete --where colour=red")
+    session.execute("commit")
+    assert 2 in _done(filled)
+
+
+@pytest.mark.parametrize("atomic, keep_going, status, done", [
+    (False, False, 1, [2]),
+    (False, True, 1, [2, 3]),
+    (True, False, 1, []),
+    (True, True, 1, []),
+])
+def test_run_stops_or_keeps_going(filled, config_file, script, atomic, keep_going, status, done):
+    before = _done(filled)
+    args = ["run", script("complete 2", "complete --where colour=red", "complete 3")]
+    args += ["--atomic"] * atomic + ["--keep-going"] * keep_going
+    result = CliRunner().invoke(cli.app, args)
+    assert result.exit_code == status
+    assert _done(filled) == sorted(before + done)
+
+
+def test_atomic_run_commits_when_every_line_succeeds(filled, config_file, script):
+    before = _done(filled)
+    result = CliRunner().invoke(cli.app, ["run", script("complete 2", "complete 3"), "--atomic"])
+    assert result.exit_code == 0
+    assert _done(filled) == sorted(before + [2, 3])
+
+
+def test_run_rolls_back_a_transaction_left_open(filled, config_file, script):
+    before = _done(filled)
+    result = CliRunner().invoke(cli.app, ["run", script("begin", "complete 2")])
+    assert result.exit_code == 1
+    assert _done(filled) == before
+
+
+def test_db_path_cache_follows_the_config_file(tmp_path, filled, config_file):
+    assert cli.get_db_path() == filled
+    # another process points the config file at a different database
+    other = tmp_path / "other.db"
+    database.init_database(other)
+    config_file.write_text(f"[General]\ndatabase = {other}\n\n")
+    assert cli.get_db_path() == other
+
+    # a removed database is noticed even though the config did not change
+    other.unlink()
+    with pytest.raises(cli.typer.Exit):
+        cli.get_db_path()
+
+
+def test_lists_add_makes_the_new_list_visible_to_the_session(tmp_path, filled, config_file):
+    session = shell.Session()
+    assert session.execute("list task_number") == 0
+    assert session.execute(f"lists add work --db-path {tmp_path / 'work.db'}") == 0
+    assert shell.Session("work").execute("add chores weekly --duedate 2026-03-01") == 0
+    assert cli._db_paths["work"][1] == tmp_path / "work.db"
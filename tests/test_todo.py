@@ -0,0 +1,259 @@
+import sqlite3
+from datetime import date
+
+import pytest
+
+from conftest import make_tasks
+from todo import archive
+from todo.query import parse_ids, parse_where
+from todo.todo import List, Todoer
+
+
+def _all_pages(todo_list, limit, **options):
+    rows, after, pages = [], None, 0
+    while True:
+        page, after = todo_list.page(limit=limit, after=after, **options)
+        rows += page
+        pages += 1
+        if after is None:
+            return rows, pages
+
+
+@pytest.mark.parametrize("method", ["task_number", "priority", "due_date"])
+@pytest.mark.parametrize("limit", [1, 7, 60, 100])
+def test_pages_resume_after_cursor(filled, method, limit):
+    todo_list = List(filled)
+    everything, _ = todo_list.page(method)
+    rows, pages = _all_pages(todo_list, limit, method=method)
+    assert rows == everything
+    assert pages == max(1, -(-len(everything) // limit))
+
+
+@pytest.mark.parametrize("sort", ["-priority,due", "due,-priority", "-done,name"])
+def test_pages_with_mixed_sort_directions(filled, sort):
+    todo_list = List(filled)
+    everything, _ = todo_list.page("task_number", sort=sort)
+    rows, _ = _all_pages(todo_list, 4, method="task_number", sort=sort)
+    assert rows == everything
+    assert len({row.id for row in rows}) == len(rows) == 60
+
+
+def test_page_skips_nothing_after_writes_behind_the_cursor(filled):
+    todo_list = List(filled)
+    first, after = todo_list.page("task_number", limit=10)
+    # a change to a row already returned does not move the following page
+    Todoer(filled).rename(first[0].id, "renamed")
+    second, _ = todo_list.page("task_number", limit=10, after=after)
+    assert [row.id for row in second] == list(range(11, 21))
+
+
+def test_bad_cursor(filled):
+    with pytest.raises(ValueError):
+        List(filled).page("task_number", limit=5, after="not a cursor")
+
+
+# every open/closed/deleted state against a past, a February and a future due date
+MIXED = [{"name": f"{state} {due}", "description": "d", "start_date": "2000-01-01",
+          "due_date": due, "priority": 1 + i % 3, "complete": complete, "deleted": deleted}
+         for i, (due, (state, complete, deleted)) in enumerate(
+             (due, state) for due in ("2000-01-05", "2026-02-10", "2026-02-20", "2999-01-01")
+             for state in (("open", 0, 0), ("done", 1, 0), ("deleted", 0, 1), ("deleted done", 1, 1)))]
+
+
+@pytest.mark.parametrize("method, start, end, keep, order", [
+    ("due_date", "none", "none", lambda t: not t["complete"] and not t["deleted"], "desc"),
+    ("overdue", "none", "none",
+     lambda t: not t["complete"] and not t["deleted"] and t["due_date"] < date.today().isoformat(),
+     "asc"),
+    ("closed_range", "2026-02-01", "2026-02-28",
+     lambda t: t["complete"] and "2026-02-01" <= t["due_date"] <= "2026-02-28", "asc"),
+    ("closed_range", "2026-02-15", "2026-02-20", lambda t: t["complete"] and t["due_date"] == "2026-02-20",
+     "asc"),
+])
+def test_presets_select_by_state_and_due_date(db_path, method, start, end, keep, order):
+    Todoer(db_path).add_many(MIXED)
+    # IDs follow the order of MIXED
+    expected = [(i + 1, task["due_date"]) for i, task in enumerate(MIXED) if keep(task)]
+    expected.sort(key=lambda row: (row[1], row[0]), reverse=order == "desc")
+    rows, _ = List(db_path).page(method, start, end)
+    assert [(row.id, row.due_date) for row in rows] == expected
+    assert expected
+
+
+def test_closed_range_needs_dates(db_path):
+    with pytest.raises(ValueError):
+        List(db_path).page("closed_range", "none", "none")
+
+
+def _ids(db_path, where):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {row[0] for row in conn.execute(f"SELECT ID FROM TASKS WHERE {where}")}
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("ids", [["5-40"], ["40-5"], ["5-20", "21-40"], ["5-30", "20-40"]])
+def test_set_done_many_over_ranges(filled, ids):
+    done = _ids(filled, "COMPLETE = 1")
+    assert Todoer(filled).set_done_many(parse_ids(ids)) == len(set(range(5, 41)) - done)
+    assert _ids(filled, "COMPLETE = 1") == done | set(range(5, 41))
+
+
+def test_update_many_with_a_filter_and_ranges(filled):
+    todo = Todoer(filled)
+    live = _ids(filled, "DELETED = 0")
+    selected = set(range(1, 11)) | _ids(filled, "PRIORITY = 3 AND COMPLETE = 0 AND DELETED = 0")
+    # a to-do picked by both the range and the filter counts once
+    assert todo.remove_many([(1, 10)], parse_where("priority=3 and open")) == len(selected & live)
+    assert _ids(filled, "DELETED = 0") == live - selected
+
+
+def test_update_many_with_nothing_to_change(filled):
+    todo = Todoer(filled)
+    assert todo.set_done_many([(1000, 2000)]) == 0
+    assert todo.remove_many(where=parse_where("priority=9")) == 0
+    # already done: matched, but not changed
+    assert todo.set_done_many(where=parse_where("done")) == 0
+    with pytest.raises(ValueError):
+        todo.set_done_many()
+
+
+WRITES = {
+    "add": lambda todo: todo.add("new", "task", "2026-01-01", "2026-03-01", 3),
+    "add_many": lambda todo: todo.add_many(make_tasks(25, start=500), chunk_size=10),
+    "set_done": lambda todo: todo.set_done(2),
+    "rename": lambda todo: todo.rename(3, "renamed"),
+    "redescribe": lambda todo: todo.redescribe(3, "described"),
+    "remove": lambda todo: todo.remove(5),
+    "update": lambda todo: todo.update(6, {"PRIORITY": 3, "DUE_DATE": "2026-04-01", "COMPLETE": 0}),
+    "set_done_many": lambda todo: todo.set_done_many([(10, 20)], parse_where("priority=2")),
+    "remove_many": lambda todo: todo.remove_many([(30, 35)], parse_where("done")),
+    "rename_many": lambda todo: todo.rename_many([(40, "a"), (41, "b")]),
+    "redescribe_many": lambda todo: todo.redescribe_many([(40, "a"), (41, "b")]),
+    "compact": lambda todo: archive.compact(todo._db_handler.db_path, archive.Policy(closed_days=0),
+                                            batch_rows=4, today=date(2026, 3, 1)),
+}
+
+
+@pytest.mark.parametrize("write", list(WRITES))
+def test_counters_do_not_drift(filled, write):
+    todo = Todoer(filled)
+    WRITES[write](todo)
+    assert todo.rebuild_summary() == 0
+    summary = List(filled).summary()
+    conn = sqlite3.connect(filled)
+    total, done, deleted = conn.execute(
+        "SELECT COUNT(*), SUM(COMPLETE = 1 AND DELETED = 0), SUM(DELETED) FROM TASKS").fetchone()
+    conn.close()
+    assert (summary["tasks"], summary["done"], summary["deleted"]) == (total, done, deleted)
+
+
+def _derived(db_path):
+    """Everything the insert triggers maintain, as comparable lists."""
+    conn = sqlite3.connect(db_path)
+    try:
+        # fails unless the search index matches TASKS exactly
+        conn.execute("INSERT INTO TASKS_FTS (TASKS_FTS, rank) VALUES ('integrity-check', 1)")
+        return {
+            "tasks": conn.execute("SELECT * FROM TASKS ORDER BY ID").fetchall(),
+            "fts": [conn.execute("SELECT rowid FROM TASKS_FTS WHERE TASKS_FTS MATCH ? ORDER BY rowid",
+                                 (term,)).fetchall() for term in ("task", "about", "7", "42")],
+            "summary": conn.execute("SELECT * FROM TASKS_SUMMARY ORDER BY 1, 2, 3").fetchall(),
+            "open_due": conn.execute("SELECT * FROM TASKS_OPEN_DUE ORDER BY 1").fetchall(),
+            "changes": conn.execute("SELECT SEQ, ID FROM TASKS_CHANGES ORDER BY SEQ").fetchall(),
+            "bulk_load": conn.execute("SELECT COUNT(*) FROM TASKS_BULK_LOAD").fetchone()[0],
+            "schema": conn.execute("SELECT name, sql FROM sqlite_master ORDER BY name").fetchall(),
+        }
+    finally:
+        conn.close()
+
+
+def test_add_many_derives_the_same_rows_as_add(tmp_path, db_path):
+    one_by_one, bulk = Todoer(db_path), Todoer(tmp_path / "bulk.db")
+    tasks = make_tasks(60)
+    for todo in (one_by_one, bulk):
+        todo.add("first", "before the load", "2026-01-01", "2026-01-02")
+    for task in tasks:
+        one_by_one.add(task["name"], task["description"], task["start_date"], task["due_date"],
+                       task["priority"], task["complete"], task["deleted"])
+    # several chunks, the later ones on top of rows loaded earlier
+    assert bulk.add_many(iter(tasks), chunk_size=25) == 60
+    expected = _derived(db_path)
+    assert _derived(tmp_path / "bulk.db") == expected
+    assert len(expected["changes"]) == 61 and expected["bulk_load"] == 0
+
+    # the triggers are back for the writes that follow
+    for todo in (one_by_one, bulk):
+        todo.add("after", "the load", "2026-01-01", "2026-01-02")
+    assert _derived(tmp_path / "bulk.db") == _derived(db_path)
+
+
+def test_failed_bulk_load_leaves_nothing_behind(filled):
+    todo, before = Todoer(filled), _derived(filled)
+    # NAME is NOT NULL, so the copy out of the staging table fails
+    tasks = make_tasks(3, start=100) + [dict(make_tasks(1)[0], name=None)]
+    with pytest.raises(sqlite3.IntegrityError):
+        todo.add_many(tasks, chunk_size=10)
+    assert _derived(filled) == before
+    assert todo.add_many(tasks[:3]) == 3
+    assert len(_derived(filled)["tasks"]) == 63
+
+
+def _changes(todo_list, since=0, limit=None):
+    names, rows, state = todo_list.changes(since, limit)
+    return [(row[1], row[2]) for row in rows], state["next"]
+
+
+def test_change_feed_resumes_and_reports_deletes(filled):
+    todo_list, todo = List(filled), Todoer(filled)
+    everything, last = _changes(todo_list)
+    assert everything == [("upsert", i) for i in range(1, 61)]
+    assert last == todo_list.last_change()
+
+    # resuming page by page sees the same changes
+    seen, since = [], 0
+    while True:
+        page, since = _changes(todo_list, since, limit=7)
+        if not page:
+            break
+        seen += page
+    assert seen == everything and since == last
+
+    todo.rename(10, "renamed")
+    todo.set_done(9)  # already done: no change
+    todo.add("new", "task", "2026-01-01", "2026-03-01")
+    archive.compact(filled, archive.Policy(closed_days=None), batch_rows=4)
+    changes, following = _changes(todo_list, last)
+    # each task once, in the order of its latest change
+    assert changes == [("upsert", 10), ("upsert", 61)] + [("delete", i) for i in range(1, 61, 7)]
+    assert _changes(todo_list, following) == ([], following)
+    assert not todo_list.wait_for_change(following, 0)
+    assert todo_list.wait_for_change(last, 0)
+
+
+def test_change_feed_rejects_bad_arguments(filled):
+    with pytest.raises(ValueError):
+        List(filled).changes(-1)
+    with pytest.raises(ValueError):
+        List(filled).changes(0, limit=0)
+
+
+@pytest.mark.parametrize("limit", [1, 3, 20])
+def test_search_pages_skip_deleted_best_matches(db_path, limit):
+    # the best matches (most mentions of "pear") are all removed
+    Todoer(db_path).add_many(
+        {"name": "pear " * (5 if i < 30 else 1) + str(i), "description": "d",
+         "start_date": "2026-01-01", "due_date": "2026-02-01", "deleted": int(i < 30 or i % 10 == 0)}
+        for i in range(200))
+    todo_list = List(db_path)
+    expected, _ = todo_list.run(List.search_query("pear"))
+    rows, after = [], None
+    while True:
+        page, after = todo_list.search("pear", limit, after)
+        assert len(page) == limit or after is None
+        rows += page
+        if after is None:
+            break
+    assert rows == expected
+    assert len(rows) == 153 and not any(row[7] for row in rows)
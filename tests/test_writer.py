@@ -0,0 +1,101 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+from todo import database, writer
+from todo.todo import Todoer
+
+DATES = ("2026-01-01", "2026-02-01")
+
+def _names(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return sorted(row[0] for row in conn.execute("SELECT NAME FROM TASKS"))
+    finally:
+        conn.close()
+
+
+def _submit_together(queue, ops):
+    """Submit every op from its own thread, returning results or errors."""
+    results = [None] * len(ops)
+
+    def run(i):
+        try:
+            results[i] = queue.submit(ops[i])
+        except Exception as error:
+            results[i] = error
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(ops))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    return results
+
+
+@pytest.fixture
+def queue(db_path):
+    # a long delay gathers the concurrent submits into one batch
+    queue = writer.WriteQueue(db_path, max_batch=8, max_delay_ms=300)
+    yield queue
+    queue.close()
+
+
+def test_failing_write_is_rolled_back_alone(db_path, queue):
+    todo = Todoer(db_path)
+
+    def half_then_fail():
+        todo.add("half", "written", *DATES)
+        raise ValueError("bad write")
+
+    ops = [lambda i=i: todo.add(f"task {i}", "d", *DATES)["ID"] for i in range(3)] + [half_then_fail]
+    results = _submit_together(queue, ops)
+    assert sorted(results[:3]) == [1, 2, 3]
+    assert isinstance(results[3], ValueError)
+    assert _names(db_path) == ["task 0", "task 1", "task 2"]
+    assert todo.rebuild_summary() == 0
+
+
+def test_failed_commit_fails_the_whole_batch(db_path, queue, monkeypatch):
+    todo = Todoer(db_path)
+    todo.add("before", "d", *DATES)
+    handler = database.get_handler(db_path)
+    transaction = handler.transaction
+
+    @contextmanager
+    def commit_fails():
+        outermost = getattr(handler._local, "depth", 0) == 0
+        with transaction() as conn:
+            yield conn
+            if outermost:
+                raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(handler, "transaction", commit_fails)
+    results = _submit_together(queue, [lambda i=i: todo.add(f"lost {i}", "d", *DATES) for i in range(3)])
+    assert all(isinstance(result, sqlite3.OperationalError) for result in results)
+    monkeypatch.undo()
+    assert _names(db_path) == ["before"]
+    assert todo.rebuild_summary() == 0
+
+
+# the committer thread ends with the SystemExit, which pytest reports
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_queue_refuses_writes_once_the_committer_died(db_path, queue):
+    def stop_the_thread():
+        raise SystemExit
+
+    with pytest.raises(SystemExit):
+        queue.submit(stop_the_thread)
+    with pytest.raises(RuntimeError) as error:
+        queue.submit(lambda: None)
+    assert isinstance(error.value.__cause__, SystemExit)
+
+
+def test_closed_queue_refuses_writes(db_path):
+    queue = writer.WriteQueue(db_path, max_delay_ms=0)
+    assert queue.submit(lambda: Todoer(db_path).add("one", "d", *DATES)["ID"]) == 1
+    queue.close()
+    with pytest.raises(RuntimeError):
+        queue.submit(lambda: None)